@@ -1,8 +1,10 @@
+from typing import Dict, Optional, Union
 import numpy as np
 import objective
 import utilisation
 import optimisation
 import argparse
+import concurrent.futures
 import pathlib
 
 if __name__ == "__main__":
@@ -74,20 +76,93 @@ if __name__ == "__main__":
         help="Identifier used to save the results file.",
     )
     parser.add_argument("num_workers", type=int, help="The number of cores to use.")
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="The seed of the random numbers, whatever the number of cores.",
+    )
     parser.add_argument(
         "--progress_bar", help="Use a progress bar or not.", action="store_true"
     )
+    parser.add_argument(
+        "--use_jacobian",
+        help="Give the utilisation solver the analytic Jacobian.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--warm_start",
+        help="Start each utilisation solve from the solution of its parent.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--incremental",
+        help="Evaluate every child by updating the evaluation of its parent, only re-solving the utilisations of a vehicle type whose residuals at its parent's demand rates are not within 1e-7 of the total demand.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--float32",
+        help="Rank the populations in float32, re-ranking the last in float64.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--vectorised_mutation",
+        help="Create the children of every generation with batched mutations.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--primary_cache",
+        help="Reuse the primary utilisations of repeated primary allocations.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cache_size",
+        type=int,
+        default=None,
+        help="The maximum number of objective values, and of primary utilisations, to cache.",
+    )
+    parser.add_argument(
+        "--scheduler",
+        choices=["serial", "threads", "processes", "thread_pool", "process_pool"],
+        default="threads",
+        help="Evaluate the population in turn, with a dask scheduler or a pool.",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=None,
+        help="The number of allocations evaluated by every task.",
+    )
+    parser.add_argument(
+        "--objective_archive",
+        type=str,
+        default=None,
+        help="SQLite file of objective values to reuse between runs.",
+    )
+    parser.add_argument(
+        "--tensor_cache",
+        type=str,
+        default=None,
+        help="Directory in which to cache beta and R between runs.",
+    )
     args = parser.parse_args()
+    is_process_based = args.scheduler in ("processes", "process_pool")
+    if args.objective_archive is not None and is_process_based:
+        parser.error("--objective_archive requires a thread based scheduler")
+    if args.incremental and is_process_based:
+        parser.error("--incremental requires a thread based scheduler")
 
     ## Read in all data (time units in minutes)
     raw_travel_times = np.genfromtxt("./data/travel_times_matrix.csv", delimiter=",")
-    beta = objective.get_beta(travel_times=raw_travel_times)
+    beta, R = objective.get_beta_and_R(
+        travel_times=raw_travel_times,
+        primary_vehicle_speed_factor=0.75,
+        secondary_vehicle_speed_factor=1.215,
+        cache_directory=args.tensor_cache,
+        dtype=bool,
+    )
     primary_vehicle_travel_times = raw_travel_times / 0.75
     secondary_vehicle_travel_times = raw_travel_times / 1.215
-    R = objective.get_R(
-        primary_vehicle_travel_times=primary_vehicle_travel_times,
-        secondary_vehicle_travel_times=secondary_vehicle_travel_times,
-    )
     survival_functions = (
         lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
         lambda t: np.heaviside(15 - t, 1),
@@ -137,6 +212,75 @@ if __name__ == "__main__":
     ]
 
     # Carry out the optimisation
+    scenario = objective.Scenario(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+    )
+    run_statistics: Dict[str, float] = {}
+    scenario_arguments = dict(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        scenario=scenario,
+    )
+    shared_arrays = None
+    scheduler: Union[str, concurrent.futures.Executor]
+    if args.scheduler == "thread_pool":
+        scheduler = concurrent.futures.ThreadPoolExecutor(max_workers=args.num_workers)
+    elif args.scheduler == "process_pool":
+        scheduler = concurrent.futures.ProcessPoolExecutor(max_workers=args.num_workers)
+    else:
+        scheduler = args.scheduler
+    if is_process_based:
+        # The workers attach to one copy of the scenario data.
+        shared_arrays = optimisation.SharedArrays(**scenario_arguments)
+        scenario_arguments = shared_arrays.arrays
+    manager: Optional[objective.ObjectiveCacheManager]
+    cache: Union[objective.ObjectiveCache, objective.SharedObjectiveCache]
+    primary_cache: Optional[
+        Union[objective.ObjectiveCache, objective.SharedObjectiveCache]
+    ]
+    archive: Optional[objective.ObjectiveArchive] = None
+    if is_process_based:
+        manager = objective.ObjectiveCacheManager()
+        manager.start()
+        cache = objective.SharedObjectiveCache(manager, maximum_size=args.cache_size)
+        primary_cache = (
+            objective.SharedObjectiveCache(manager, maximum_size=args.cache_size)
+            if args.primary_cache
+            else None
+        )
+    elif args.objective_archive is not None:
+        manager = None
+        archive = objective.ObjectiveArchive(
+            args.objective_archive,
+            scenario=scenario.get_fingerprint(),
+        )
+        cache = archive
+        primary_cache = (
+            objective.ObjectiveCache(maximum_size=args.cache_size)
+            if args.primary_cache
+            else None
+        )
+    else:
+        manager = None
+        cache = objective.ObjectiveCache(maximum_size=args.cache_size)
+        primary_cache = (
+            objective.ObjectiveCache(maximum_size=args.cache_size)
+            if args.primary_cache
+            else None
+        )
     (
         best_primary,
         best_secondary,
@@ -153,20 +297,33 @@ if __name__ == "__main__":
         mutation_function=optimisation.mutate_retain_vehicle_numbers,
         initial_number_of_mutatation_repetitions=args.initial_number_of_mutatation_repetitions,
         cooling_rate=args.cooling_rate,
-        demand_rates=demand_rates,
-        primary_survivals=primary_survivals,
-        secondary_survivals=secondary_survivals,
-        weights_single_vehicle=weights_single_vehicle,
-        weights_multiple_vehicles=weights_multiple_vehicles,
-        beta=beta,
-        R=R,
         vehicle_station_utilisation_function=utilisation.solve_utilisations,
-        seed=0,
+        seed=args.seed,
         num_workers=args.num_workers,
         progress_bar=args.progress_bar,
         service_rate_primary=service_rate_primary,
         service_rate_secondary=service_rate_secondary,
+        use_jacobian=args.use_jacobian,
+        warm_start=args.warm_start,
+        run_statistics=run_statistics,
+        primary_cache=primary_cache,
+        cache=cache,
+        scheduler=scheduler,
+        incremental=args.incremental,
+        dtype=np.float32 if args.float32 else float,
+        vectorised_mutation=args.vectorised_mutation,
+        chunk_size=args.chunk_size,
+        **scenario_arguments,
     )
+    run_statistics.update(scenario.get_sparsity_statistics())
+    if manager is not None:
+        manager.shutdown()
+    if shared_arrays is not None:
+        shared_arrays.close()
+    if isinstance(scheduler, concurrent.futures.Executor):
+        scheduler.shutdown()
+    if archive is not None:
+        archive.close()
 
     best_primary_with_hyperparams = np.append(hyperparams_row, best_primary)
     best_secondary_with_hyperparams = np.append(hyperparams_row, best_secondary)
@@ -214,3 +371,11 @@ if __name__ == "__main__":
         header=",".join(population_titles),
         comments="",
     )
+
+    np.savetxt(
+        f"./results/run_statistics_{args.scenario_id}.csv",
+        [list(run_statistics.values())],
+        delimiter=",",
+        header=",".join(run_statistics),
+        comments="",
+    )
@@ -3,10 +3,20 @@ This modules contains code to calculate the objective function (expected
 survival) for a given set of input parameters and a given allocation of
 emergency vehicles.
 """
+import collections
+import copy
+import hashlib
+import multiprocessing.managers
+import os
+import pathlib
+import sqlite3
+import tempfile
+import threading
+
 import numpy as np
 
 
-def get_beta(travel_times):
+def get_beta(travel_times, dtype=float):
     """
     Obtain beta (as described in the paper) as a function of a given travel time
     matrix.
@@ -16,28 +26,21 @@ def get_beta(travel_times):
     travel_times : np.array
         The travel time matrix rows correspond to ambulance locations and the
         columns correspond to pickup locations.
+    dtype : type
+        The type of the entries of beta. Using `bool` (or `np.uint8`) stores
+        beta in an eighth of the memory of the default `float`.
 
     Returns
     -------
     np.array
     """
-    ambulance_locations = range(travel_times.shape[0])
-    pickup_locations = range(travel_times.shape[1])
-    return np.array(
-        [
-            [
-                [
-                    0 if a2 == a1 else float(travel_times[a1][p] <= travel_times[a2][p])
-                    for a2 in ambulance_locations
-                ]
-                for a1 in ambulance_locations
-            ]
-            for p in pickup_locations
-        ]
-    )
+    times = np.asarray(travel_times).T
+    beta = times[:, :, None] <= times[:, None, :]
+    beta[:, np.arange(times.shape[1]), np.arange(times.shape[1])] = False
+    return beta.astype(dtype, order="C", copy=False)
 
 
-def get_R(primary_vehicle_travel_times, secondary_vehicle_travel_times):
+def get_R(primary_vehicle_travel_times, secondary_vehicle_travel_times, dtype=float):
     """
     Obtain R (as described in the paper) as a function of a given travel time
     matrices.
@@ -50,28 +53,702 @@ def get_R(primary_vehicle_travel_times, secondary_vehicle_travel_times):
     secondary_vehicle_travel_times : np.array
         The travel time matrix for secondary vehicles. Rows correspond to
         ambulance locations and the columns correspond to pickup locations.
+    dtype : type
+        The type of the entries of R. Using `bool` (or `np.uint8`) stores R in
+        an eighth of the memory of the default `float`.
 
     Returns
     -------
     np.array
     """
-    ambulance_locations = range(primary_vehicle_travel_times.shape[0])
-    pickup_locations = range(primary_vehicle_travel_times.shape[1])
-    return np.array(
-        [
+    primary_times = np.asarray(primary_vehicle_travel_times).T
+    secondary_times = np.asarray(secondary_vehicle_travel_times).T
+    R = primary_times[:, :, None] <= secondary_times[:, None, :]
+    return R.astype(dtype, order="C", copy=False)
+
+
+def get_beta_and_R(
+    travel_times,
+    primary_vehicle_speed_factor=0.75,
+    secondary_vehicle_speed_factor=1.215,
+    cache_directory=None,
+    dtype=float,
+):
+    """
+    Obtain beta and R from a raw travel time matrix, where the travel times of
+    primary and secondary vehicles are the raw travel times divided by their
+    speed factors.
+
+    If a cache directory is given, beta and R are read from a `.npz` file in it
+    whose name is a hash of the travel times and the speed factors, and are
+    written to it if that file does not exist yet. The cached file holds them
+    as booleans, and is moved into place once written so that concurrent runs
+    can share the directory.
+
+    Parameters
+    ----------
+    travel_times : np.array
+        The raw travel time matrix. Rows correspond to ambulance locations and
+        the columns correspond to pickup locations.
+    primary_vehicle_speed_factor : float
+        The factor the raw travel times are divided by for primary vehicles.
+    secondary_vehicle_speed_factor : float
+        The factor the raw travel times are divided by for secondary vehicles.
+    cache_directory : str or pathlib.Path
+        The directory holding previously obtained beta and R, or None to not
+        cache them.
+    dtype : type
+        The type of the entries of beta and R.
+
+    Returns
+    -------
+    tuple
+        Returns beta and R.
+    """
+    travel_times = np.ascontiguousarray(travel_times, dtype=float)
+    if cache_directory is not None:
+        key = hashlib.sha256(travel_times.tobytes())
+        key.update(repr(travel_times.shape).encode())
+        key.update(
+            repr(
+                (primary_vehicle_speed_factor, secondary_vehicle_speed_factor)
+            ).encode()
+        )
+        path = pathlib.Path(cache_directory) / f"beta_R_{key.hexdigest()[:20]}.npz"
+        if path.exists():
+            with np.load(path) as cached:
+                return (
+                    cached["beta"].astype(dtype, copy=False),
+                    cached["R"].astype(dtype, copy=False),
+                )
+
+    beta = get_beta(travel_times=travel_times, dtype=bool)
+    R = get_R(
+        primary_vehicle_travel_times=travel_times / primary_vehicle_speed_factor,
+        secondary_vehicle_travel_times=travel_times / secondary_vehicle_speed_factor,
+        dtype=bool,
+    )
+
+    if cache_directory is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # The file is written under a temporary name and then moved into place,
+        # so that runs sharing the directory never read a partly written file.
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, suffix=".npz", delete=False
+        ) as temporary_file:
+            np.savez(temporary_file, beta=beta, R=R)
+        os.replace(temporary_file.name, path)
+    return beta.astype(dtype, copy=False), R.astype(dtype, copy=False)
+
+
+def pack_preferences(preferences):
+    """
+    Bit packs beta or R, storing each entry in a single bit.
+
+    Parameters
+    ----------
+    preferences : np.array
+        A three dimensional array of zeros and ones, such as beta or R.
+
+    Returns
+    -------
+    dict
+        Returns a dictionary with the packed `bits` and the `shape` of the
+        unpacked array. This can be used in place of beta or R.
+    """
+    preferences = np.asarray(preferences)
+    return {
+        "bits": np.packbits(preferences.astype(bool), axis=-1),
+        "shape": preferences.shape,
+    }
+
+
+def get_preference_array(preferences, dtype=None):
+    """
+    Returns beta or R as an array that the "all closer busy" functions can
+    multiply by. Bit packed preferences are unpacked and boolean preferences are
+    viewed as integers, neither of which creates a float copy.
+
+    Parameters
+    ----------
+    preferences : np.array or dict
+        Beta or R, either as an array of any type or as bit packed by
+        `pack_preferences`, or None (which is returned as it is).
+    dtype : type
+        If given, floating point preferences are cast to it so that they do
+        not raise the precision of the products they are used in. Integer
+        preferences are not cast as they do not raise it.
+
+    Returns
+    -------
+    np.array
+    """
+    if preferences is None:
+        return None
+    if isinstance(preferences, dict):
+        return np.unpackbits(
+            preferences["bits"], axis=-1, count=preferences["shape"][-1]
+        )
+    preferences = np.asarray(preferences)
+    if preferences.dtype == bool:
+        return preferences.view(np.uint8)
+    if dtype is not None and np.issubdtype(preferences.dtype, np.floating):
+        return preferences.astype(dtype, copy=False)
+    return preferences
+
+
+def get_neighbour_index(
+    travel_times, primary_vehicle_travel_times, secondary_vehicle_travel_times
+):
+    """
+    Obtain the sorted neighbour index: for every pickup location the stations
+    ordered by travel time, and for every station the number of stations (in
+    that order) that are preferred to it. This holds the same information as
+    beta and R using (pickups x stations) integers.
+
+    Stations with equal travel times form a tie group and share the same count,
+    which is the position of the end of their tie group in the ordering.
+
+    Parameters
+    ----------
+    travel_times : np.array
+        The travel time matrix used to obtain beta. Rows correspond to
+        ambulance locations and the columns correspond to pickup locations.
+    primary_vehicle_travel_times : np.array
+        The travel time matrix for primary vehicles. Rows correspond to
+        ambulance locations and the columns correspond to pickup locations.
+    secondary_vehicle_travel_times : np.array
+        The travel time matrix for secondary vehicles. Rows correspond to
+        ambulance locations and the columns correspond to pickup locations.
+
+    Returns
+    -------
+    dict
+      Returns a dictionary of (pickups x stations) integer arrays:
+          + `order[p]`, the stations ordered by travel time to p;
+          + `closer_counts[p][a]`, the number of stations no further from p
+             than a (including a itself), so that the stations preferred to
+             a are `order[p][:closer_counts[p][a]]` other than a;
+          + `primary_order[p]`, the stations ordered by primary vehicle
+             travel time to p;
+          + `primary_closer_counts[p][a]`, the number of primary vehicle
+             stations no further from p than a secondary vehicle at a;
+          + `secondary_order[p]`, the stations ordered by secondary vehicle
+             travel time to p;
+          + `secondary_closer_counts[p][a]`, the number of secondary vehicle
+             stations strictly closer to p than a primary vehicle at a.
+    """
+    times = np.asarray(travel_times, dtype=float).T
+    primary_times = np.asarray(primary_vehicle_travel_times, dtype=float).T
+    secondary_times = np.asarray(secondary_vehicle_travel_times, dtype=float).T
+
+    order = np.argsort(times, axis=1, kind="stable")
+    primary_order = np.argsort(primary_times, axis=1, kind="stable")
+    secondary_order = np.argsort(secondary_times, axis=1, kind="stable")
+    sorted_times = np.take_along_axis(times, order, axis=1)
+    sorted_primary_times = np.take_along_axis(primary_times, primary_order, axis=1)
+    sorted_secondary_times = np.take_along_axis(
+        secondary_times, secondary_order, axis=1
+    )
+    pickup_locations = range(times.shape[0])
+    return {
+        "order": order,
+        "closer_counts": np.array(
             [
-                [
-                    float(
-                        primary_vehicle_travel_times[a1][p]
-                        <= secondary_vehicle_travel_times[a2][p]
-                    )
-                    for a2 in ambulance_locations
-                ]
-                for a1 in ambulance_locations
+                np.searchsorted(sorted_times[p], times[p], side="right")
+                for p in pickup_locations
             ]
-            for p in pickup_locations
-        ]
-    )
+        ),
+        "primary_order": primary_order,
+        "primary_closer_counts": np.array(
+            [
+                np.searchsorted(
+                    sorted_primary_times[p], secondary_times[p], side="right"
+                )
+                for p in pickup_locations
+            ]
+        ),
+        "secondary_order": secondary_order,
+        "secondary_closer_counts": np.array(
+            [
+                np.searchsorted(
+                    sorted_secondary_times[p], primary_times[p], side="left"
+                )
+                for p in pickup_locations
+            ]
+        ),
+    }
+
+
+def get_allocation_key(allocation):
+    """
+    Returns a compact key identifying an allocation: the raw bytes of the
+    allocation as unsigned 8 bit integers, or as 64 bit integers if any entry
+    does not fit (the two have different lengths for the same number of
+    stations).
+
+    Parameters
+    ----------
+    allocation : np.array
+        The number of vehicles at every station
+
+    Returns
+    -------
+    bytes
+    """
+    allocation = np.asarray(allocation)
+    if allocation.size == 0 or (allocation.min() >= 0 and allocation.max() <= 255):
+        return allocation.astype(np.uint8).tobytes()
+    return allocation.astype(np.int64).tobytes()
+
+
+class ObjectiveCache:
+    """
+    A cache of objective function values, keyed by the raw bytes of the
+    allocations (see `get_allocation_key`), that holds at most `maximum_size`
+    values, evicting the least recently used.
+
+    Lookups through `get` are counted in `hits` and `misses`, and evicted
+    values in `evictions`. It can also be given as the `primary_cache` of
+    `utilisation.solve_utilisations`, to bound the number of primary
+    utilisations it holds.
+
+    Parameters
+    ----------
+    maximum_size : int
+        The maximum number of values held, or None for no limit.
+    """
+
+    def __init__(self, maximum_size=None):
+        self.maximum_size = maximum_size
+        self.values = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get_key(self, allocation_primary, allocation_secondary):
+        """
+        Returns the key of an allocation.
+
+        Parameters
+        ----------
+        allocation_primary : np.array
+            The number of primary vehicles at every station
+        allocation_secondary : np.array
+            The number of secondary vehicles at every station
+
+        Returns
+        -------
+        bytes
+        """
+        return get_allocation_key(
+            np.concatenate(
+                [np.ravel(allocation_primary), np.ravel(allocation_secondary)]
+            )
+        )
+
+    def get(self, key, default=None):
+        """
+        Returns the value for a key, marking it as recently used, or the
+        default if it is not held.
+
+        Parameters
+        ----------
+        key : bytes
+            The key given by `get_key`.
+        default : float
+            The value to return if the key is not held.
+
+        Returns
+        -------
+        float
+        """
+        with self.lock:
+            if key in self.values:
+                self.hits += 1
+                self.values.move_to_end(key)
+                return self.values[key]
+            self.misses += 1
+            return default
+
+    def get_many(self, keys):
+        """
+        Returns the values for a list of keys, marking them as recently used,
+        None for those not held.
+
+        Parameters
+        ----------
+        keys : list
+            The keys given by `get_key`.
+
+        Returns
+        -------
+        list
+        """
+        with self.lock:
+            values = []
+            for key in keys:
+                if key in self.values:
+                    self.hits += 1
+                    self.values.move_to_end(key)
+                    values.append(self.values[key])
+                else:
+                    self.misses += 1
+                    values.append(None)
+            return values
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self.values[key] = value
+            self.values.move_to_end(key)
+            while (
+                self.maximum_size is not None and len(self.values) > self.maximum_size
+            ):
+                self.values.popitem(last=False)
+                self.evictions += 1
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def __len__(self):
+        return len(self.values)
+
+    def get_statistics(self):
+        """
+        Returns the counters of the cache.
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            "objective_cache_size": len(self),
+            "objective_cache_hits": self.hits,
+            "objective_cache_misses": self.misses,
+            "objective_cache_evictions": self.evictions,
+        }
+
+
+class ObjectiveCacheManager(multiprocessing.managers.BaseManager):
+    """
+    A manager that holds `ObjectiveCache`s in its own process, made with its
+    `ObjectiveCache` method, for `SharedObjectiveCache`.
+    """
+
+
+ObjectiveCacheManager.register(
+    "ObjectiveCache",
+    ObjectiveCache,
+    exposed=(
+        "get",
+        "get_many",
+        "__setitem__",
+        "__getitem__",
+        "__contains__",
+        "__len__",
+        "get_statistics",
+    ),
+)
+
+
+class SharedObjectiveCache:
+    """
+    A cache of objective function values held by an `ObjectiveCacheManager`
+    so that it can be shared by process based workers: it is pickled as a
+    proxy to an `ObjectiveCache` in the manager's process, and every process
+    reads and writes the same values. That cache holds at most `maximum_size`
+    values, evicting the least recently used, and keeps the counters.
+
+    It is keyed as `ObjectiveCache`. Every lookup is a single call to the
+    manager, and `get_many` looks up a whole batch of keys in one call.
+
+    Parameters
+    ----------
+    manager : ObjectiveCacheManager
+        A started manager that must outlive the cache.
+    maximum_size : int
+        The maximum number of values held, or None for no limit.
+    """
+
+    def __init__(self, manager, maximum_size=None):
+        self.maximum_size = maximum_size
+        self.values = manager.ObjectiveCache(maximum_size)
+
+    def get_key(self, allocation_primary, allocation_secondary):
+        """
+        Returns the key of an allocation, as `ObjectiveCache.get_key`.
+
+        Parameters
+        ----------
+        allocation_primary : np.array
+            The number of primary vehicles at every station
+        allocation_secondary : np.array
+            The number of secondary vehicles at every station
+
+        Returns
+        -------
+        bytes
+        """
+        return ObjectiveCache.get_key(self, allocation_primary, allocation_secondary)
+
+    @property
+    def hits(self):
+        return self.get_statistics()["objective_cache_hits"]
+
+    @property
+    def misses(self):
+        return self.get_statistics()["objective_cache_misses"]
+
+    @property
+    def evictions(self):
+        return self.get_statistics()["objective_cache_evictions"]
+
+    def get(self, key, default=None):
+        """
+        Returns the value for a key, marking it as recently used, or the
+        default if it is not held.
+
+        Parameters
+        ----------
+        key : bytes
+            The key given by `get_key`.
+        default : float
+            The value to return if the key is not held.
+
+        Returns
+        -------
+        float
+        """
+        return self.values.get(key, default)
+
+    def get_many(self, keys):
+        """
+        Returns the values for a list of keys, None for those not held.
+
+        Parameters
+        ----------
+        keys : list
+            The keys given by `get_key`.
+
+        Returns
+        -------
+        list
+        """
+        return self.values.get_many(keys)
+
+    def __setitem__(self, key, value):
+        self.values[key] = value
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def __len__(self):
+        return len(self.values)
+
+    def get_statistics(self):
+        """
+        Returns the counters of the cache.
+
+        Returns
+        -------
+        dict
+        """
+        return self.values.get_statistics()
+
+
+def get_scenario_fingerprint(*arrays):
+    """
+    Returns a fingerprint of the data of a scenario: the sha256 digest of the
+    shapes, types and values of the given arrays (or scalars).
+
+    Parameters
+    ----------
+    *arrays : np.array
+        The data of the scenario, for example the travel times, demand rates,
+        survivals, weights and service rates.
+
+    Returns
+    -------
+    str
+    """
+    fingerprint = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        fingerprint.update(str((array.dtype.str, array.shape)).encode())
+        fingerprint.update(array.tobytes())
+    return fingerprint.hexdigest()
+
+
+class ObjectiveArchive(ObjectiveCache):
+    """
+    A persistent cache of objective function values held in an SQLite
+    database, so that runs on the same scenario can reuse the values computed
+    by earlier runs. Values are stored against the scenario fingerprint (see
+    `get_scenario_fingerprint`) and the key of the allocation (as in
+    `ObjectiveCache`).
+
+    New values are held in memory and written in batches of `batch_size`, and
+    `get_many` reads a batch of keys with a single query. Call `close` (or use
+    the archive as a context manager) to write the remaining values.
+
+    The connection is shared by the threads of the threaded dask scheduler
+    but can not be sent to other processes.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        The path of the database, created if it does not exist.
+    scenario : str
+        The fingerprint of the scenario.
+    batch_size : int
+        The number of new values held in memory before they are written.
+    """
+
+    def __init__(self, path, scenario, batch_size=1000):
+        self.maximum_size = None
+        self.scenario = scenario
+        self.batch_size = batch_size
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS objectives "
+            "(scenario TEXT, allocation BLOB, value REAL, "
+            "PRIMARY KEY (scenario, allocation))"
+        )
+        self.connection.commit()
+
+    def get_many(self, keys):
+        """
+        Returns the values for a list of keys, None for those not held.
+
+        Parameters
+        ----------
+        keys : list
+            The keys given by `get_key`.
+
+        Returns
+        -------
+        list
+        """
+        with self.lock:
+            values = {key: self.pending[key] for key in keys if key in self.pending}
+            to_read = list({key for key in keys if key not in values})
+            for start in range(0, len(to_read), 500):
+                chunk = to_read[start : start + 500]
+                values.update(
+                    self.connection.execute(
+                        "SELECT allocation, value FROM objectives WHERE scenario = ? "
+                        f"AND allocation IN ({', '.join('?' * len(chunk))})",
+                        [self.scenario, *chunk],
+                    ).fetchall()
+                )
+            found = [values.get(key) for key in keys]
+            self.hits += sum(value is not None for value in found)
+            self.misses += sum(value is None for value in found)
+        return found
+
+    def get(self, key, default=None):
+        """
+        Returns the value for a key, or the default if it is not held.
+
+        Parameters
+        ----------
+        key : bytes
+            The key given by `get_key`.
+        default : float
+            The value to return if the key is not held.
+
+        Returns
+        -------
+        float
+        """
+        (value,) = self.get_many([key])
+        return default if value is None else value
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self.pending[key] = value
+            if len(self.pending) >= self.batch_size:
+                self.write_pending()
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        with self.lock:
+            self.write_pending()
+            (size,) = self.connection.execute(
+                "SELECT COUNT(*) FROM objectives WHERE scenario = ?", [self.scenario]
+            ).fetchone()
+        return size
+
+    def write_pending(self):
+        """
+        Writes the values held in memory to the database. The lock must be
+        held.
+        """
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO objectives VALUES (?, ?, ?)",
+            [(self.scenario, key, float(value)) for key, value in self.pending.items()],
+        )
+        self.connection.commit()
+        self.pending = {}
+
+    def close(self):
+        """
+        Writes the remaining values and closes the database.
+        """
+        with self.lock:
+            self.write_pending()
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def get_cache_key(cache, allocation_primary, allocation_secondary):
+    """
+    Returns the key of an allocation in a cache of objective function values:
+    the one given by the cache's `get_key` method if it has one (as
+    `ObjectiveCache` does), otherwise the str representations of the
+    allocations (for a plain dictionary).
+
+    Parameters
+    ----------
+    cache : ObjectiveCache or dict
+        The cache.
+    allocation_primary : np.array
+        The number of primary vehicles at every station
+    allocation_secondary : np.array
+        The number of secondary vehicles at every station
+
+    Returns
+    -------
+    bytes or tuple
+    """
+    if hasattr(cache, "get_key"):
+        return cache.get_key(allocation_primary, allocation_secondary)
+    return (str(allocation_primary), str(allocation_secondary))
 
 
 def get_survival_time_vectors(
@@ -111,12 +788,520 @@ def get_survival_time_vectors(
     return primary_survivals, secondary_survivals
 
 
-def get_is_not_busy_vector(
-    vehicle_station_utilisation,
-    allocation,
+class Scenario:
+    """
+    The data of a scenario, with the aggregates used by every evaluation
+    computed once, so that it can be passed to (or pickled for) workers as one
+    unit and given to `get_objective`, `get_objective_batch` and the
+    utilisation solvers in place of the separate arrays.
+
+    Parameters
+    ----------
+    demand_rates : np.array
+        The demand rates of given patient classes from given pickup locations.
+    primary_survivals : np.array
+        The survival probability due to primary vehicles.
+    secondary_survivals : np.array
+        The survival probability due to secondary vehicles.
+    weights_single_vehicle : np.array
+        The weighting given to each class of patients
+    weights_multiple_vehicles : np.array
+        The weighting given to each class of patients
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `pack_preferences`.
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `pack_preferences`.
+    service_rate_primary : float
+        The service rates of primary vehicles
+    service_rate_secondary : float
+        The service rates of secondary vehicles
+    closer_busy_engine : str
+        The engine used to compute the "all closer busy" probabilities, a key
+        of `CLOSER_BUSY_ENGINES`.
+    neighbour_index : dict
+        The sorted neighbour index, required by the "sorted" engine.
+    """
+
+    def __init__(
+        self,
+        demand_rates,
+        primary_survivals,
+        secondary_survivals,
+        weights_single_vehicle,
+        weights_multiple_vehicles,
+        beta,
+        R,
+        service_rate_primary=None,
+        service_rate_secondary=None,
+        closer_busy_engine="power",
+        neighbour_index=None,
+    ):
+        self.demand_rates = np.asarray(demand_rates)
+        self.primary_survivals = primary_survivals
+        self.secondary_survivals = secondary_survivals
+        self.weights_single_vehicle = np.asarray(weights_single_vehicle)
+        self.weights_multiple_vehicles = np.asarray(weights_multiple_vehicles)
+        self.beta = beta
+        self.R = R
+        self.service_rate_primary = service_rate_primary
+        self.service_rate_secondary = service_rate_secondary
+        self.closer_busy_engine = closer_busy_engine
+        self.neighbour_index = neighbour_index
+        self.float_preferences = None
+
+        # The demand for primary vehicles (all classes) and for secondary
+        # vehicles (all but the last class) at every pickup location.
+        self.primary_pickup_demand_rates = self.demand_rates.sum(axis=0)
+        self.secondary_pickup_demand_rates = self.demand_rates[:-1].sum(axis=0)
+
+        # The pickup locations at which every class has demand.
+        self.active_pickups = get_active_pickups(self.demand_rates)
+
+        # The survivals weighted by class and demand, summed over the classes
+        # with a non zero weight, indexed [p][a]. Each class only contributes
+        # at its active pickup locations.
+        self.primary_single_survivals = self.get_weighted_survivals(
+            self.weights_single_vehicle, primary_survivals
+        )
+        self.primary_multiple_survivals = self.get_weighted_survivals(
+            self.weights_multiple_vehicles, primary_survivals
+        )
+        self.secondary_multiple_survivals = self.get_weighted_survivals(
+            self.weights_multiple_vehicles, secondary_survivals
+        )
+
+    def __getstate__(self):
+        state = dict(vars(self))
+        state["float_preferences"] = None
+        return state
+
+    def get_float_preferences(self):
+        """
+        Returns beta and R as float arrays. They are converted the first time
+        and then kept, so that every `IncrementalObjective` of the scenario
+        shares them. They are not pickled or copied with the scenario.
+
+        Returns
+        -------
+        tuple
+            Returns beta and R.
+        """
+        if self.float_preferences is None:
+            self.float_preferences = tuple(
+                get_preference_array(preferences).astype(float, copy=False)
+                for preferences in (self.beta, self.R)
+            )
+        return self.float_preferences
+
+    def get_weighted_survivals(self, weights, survivals):
+        """
+        Returns the survivals weighted by class and demand and summed over the
+        classes, computed only over the active pickup locations of the classes
+        with a non zero weight.
+
+        Parameters
+        ----------
+        weights : np.array
+            The weighting given to each class of patients
+        survivals : np.array
+            The survival probability of every class, pickup location and
+            station.
+
+        Returns
+        -------
+        np.array
+            Returns the weighted survivals indexed [p][a].
+        """
+        survivals = np.asarray(survivals)
+        weighted_survivals = np.zeros(survivals.shape[1:])
+        for k in get_contributing_classes(weights):
+            pickups = self.active_pickups[k]
+            weighted_survivals[pickups] += (
+                weights[k] * self.demand_rates[k, pickups, None] * survivals[k, pickups]
+            )
+        return weighted_survivals
+
+    def get_sparsity_statistics(self):
+        """
+        Returns the number of active pickup locations of every class and the
+        number of (class, pickup location, station) elements of the psi terms
+        of `get_objective` computed with and without restricting every class
+        to its active pickup locations.
+
+        Returns
+        -------
+        dict
+        """
+        number_of_pickups = self.demand_rates.shape[1]
+        number_of_stations = np.shape(self.primary_survivals)[2]
+        statistics = {
+            f"class_{k}_active_pickups": len(pickups)
+            for k, pickups in enumerate(self.active_pickups)
+        }
+        # psi uses the primary survivals and psi tilde uses both survivals.
+        terms = [
+            (k, 1) for k in get_contributing_classes(self.weights_single_vehicle)
+        ] + [(k, 2) for k in get_contributing_classes(self.weights_multiple_vehicles)]
+        dense_elements = sum(
+            number_of_arrays * number_of_pickups * number_of_stations
+            for _, number_of_arrays in terms
+        )
+        sparse_elements = sum(
+            number_of_arrays * len(self.active_pickups[k]) * number_of_stations
+            for k, number_of_arrays in terms
+        )
+        statistics["psi_dense_elements"] = dense_elements
+        statistics["psi_sparse_elements"] = sparse_elements
+        statistics["psi_bytes_saved"] = (dense_elements - sparse_elements) * np.dtype(
+            float
+        ).itemsize
+        return statistics
+
+    def get_arguments(self):
+        """
+        Returns the data of the scenario as the keyword arguments of
+        `get_objective`.
+
+        Returns
+        -------
+        dict
+        """
+        arguments = {
+            "demand_rates": self.demand_rates,
+            "primary_survivals": self.primary_survivals,
+            "secondary_survivals": self.secondary_survivals,
+            "weights_single_vehicle": self.weights_single_vehicle,
+            "weights_multiple_vehicles": self.weights_multiple_vehicles,
+            "beta": self.beta,
+            "R": self.R,
+            "closer_busy_engine": self.closer_busy_engine,
+            "neighbour_index": self.neighbour_index,
+        }
+        if self.service_rate_primary is not None:
+            arguments["service_rate_primary"] = self.service_rate_primary
+        if self.service_rate_secondary is not None:
+            arguments["service_rate_secondary"] = self.service_rate_secondary
+        return arguments
+
+    def get_fingerprint(self, overall_utilisation_limit=0.99):
+        """
+        Returns the fingerprint of the scenario, as given by
+        `get_scenario_fingerprint`, for example to key an `ObjectiveArchive`.
+
+        Beta and R are fingerprinted as booleans, so that the same scenario
+        has the same fingerprint however they are stored, and the neighbour
+        index is fingerprinted too as it replaces them for the "sorted"
+        engine.
+
+        Parameters
+        ----------
+        overall_utilisation_limit : float
+            The overall utilisation limit given to the vehicle station
+            utilisation function, which changes the objective function values.
+
+        Returns
+        -------
+        str
+        """
+        preferences = [
+            np.zeros(0, dtype=bool)
+            if preferences is None
+            else get_preference_array(preferences).astype(bool)
+            for preferences in (self.beta, self.R)
+        ]
+        neighbour_index = (
+            []
+            if self.neighbour_index is None
+            else [self.neighbour_index[key] for key in sorted(self.neighbour_index)]
+        )
+        return get_scenario_fingerprint(
+            self.demand_rates,
+            self.primary_survivals,
+            self.secondary_survivals,
+            self.weights_single_vehicle,
+            self.weights_multiple_vehicles,
+            *preferences,
+            len(neighbour_index),
+            *neighbour_index,
+            np.nan if self.service_rate_primary is None else self.service_rate_primary,
+            np.nan
+            if self.service_rate_secondary is None
+            else self.service_rate_secondary,
+            overall_utilisation_limit,
+        )
+
+
+def get_is_not_busy_vector(
+    vehicle_station_utilisation,
+    allocation,
+):
+    """
+    Returns the probability vector of given stations not being busy.
+
+    Parameters
+    ----------
+    vehicle_station_utilisation : np.array
+        The utilisation of vehicles at every station
+    allocation : np.array
+        The number of vehicles at every station
+
+    Returns
+    -------
+    np.array
+        Returns a vector:
+          + `is_not_busy[a]` indicating the probability of a vehicle
+             at location a not being busy.
+    """
+    is_not_busy = 1 - np.power(vehicle_station_utilisation, allocation)
+    return is_not_busy
+
+
+def get_all_same_closer_busy_vector(vehicle_station_utilisation, allocation, beta):
+    """
+    Returns the probability of all vehicles of the same type that are preferred
+    being busy.
+
+    Parameters
+    ----------
+    vehicle_station_utilisation : np.array
+        The utilisation of vehicles at every station
+    allocation : np.array
+        The number of vehicles at every station
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `pack_preferences`.
+
+    Returns
+    -------
+    np.array
+        Returns a vector:
+          + `all_same_closer_busy[a][p]` indicating the probability
+          of all vehicles of the same type and closer to p than
+          a being busy.
+    """
+    beta = get_preference_array(beta)
+    all_same_closer_busy = np.prod(
+        np.power(
+            vehicle_station_utilisation,
+            np.multiply(beta.transpose(0, 2, 1), allocation),
+        ),
+        axis=2,
+    ).T
+    return all_same_closer_busy
+
+
+def get_all_primary_closer_busy_vector(vehicle_station_utilisation, allocation, R):
+    """
+    Returns the probability of all primary vehicles that are preferred
+    being busy.
+
+    Parameters
+    ----------
+    vehicle_station_utilisation : np.array
+        The utilisation of vehicles at every station
+    allocation : np.array
+        The number of vehicles at every station
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `pack_preferences`.
+
+    Returns
+    -------
+    np.array
+        Returns a vector:
+          + `all_primary_closer_busy_vector[a][p]` indicating
+          the probability of all primary vehicles closer to p
+          than a secondary vehicle at a being busy.
+    """
+    R = get_preference_array(R)
+    all_primary_closer_busy_vector = np.prod(
+        np.power(
+            vehicle_station_utilisation, np.multiply(R.transpose(0, 2, 1), allocation)
+        ),
+        axis=2,
+    )
+    return all_primary_closer_busy_vector
+
+
+def get_all_secondary_closer_busy_vector(vehicle_station_utilisation, allocation, R):
+    """
+    Returns the probability of all secondary vehicles that are preferred
+    being busy.
+
+    Parameters
+    ----------
+    vehicle_station_utilisation : np.array
+        The utilisation of vehicles at every station
+    allocation : np.array
+        The number of vehicles at every station
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `pack_preferences`.
+
+    Returns
+    -------
+    np.array
+        Returns a vector:
+          + `all_secondary_closer_busy_vector[a][p]` indicating
+          the probability of all secondary vehicles closer to p
+          than a primary vehicle at a being busy.
+    """
+    R = get_preference_array(R)
+    all_secondary_closer_busy_vector = np.prod(
+        np.power(
+            vehicle_station_utilisation,
+            np.multiply(1 - R, allocation),
+        ),
+        axis=2,
+    )
+    return all_secondary_closer_busy_vector
+
+
+def get_log_utilisation_terms(vehicle_station_utilisation, allocation):
+    """
+    Splits the factors `u[a] ** allocation[a]` into the parts used by the
+    log-space engine so that products of them can be taken as matrix products.
+
+    Parameters
+    ----------
+    vehicle_station_utilisation : np.array
+        The utilisation of vehicles at every station
+    allocation : np.array
+        The number of vehicles at every station
+
+    Returns
+    -------
+    tuple
+      Returns three vectors:
+          + `log_terms[a]`, `allocation[a] * log(|u[a]|)` for stations with
+             vehicles and a non zero utilisation, 0 otherwise;
+          + `zero_terms[a]`, 1 for stations with vehicles and a utilisation
+             of exactly 0, 0 otherwise;
+          + `negative_terms[a]`, the allocation for stations with a negative
+             utilisation, 0 otherwise.
+    """
+    # The terms keep the precision of float32 utilisations, anything else is
+    # taken as float64.
+    utilisation = np.asarray(vehicle_station_utilisation)
+    dtype = np.result_type(utilisation.dtype, np.float32)
+    utilisation = utilisation.astype(dtype, copy=False)
+    allocation = np.asarray(allocation, dtype=dtype)
+    has_vehicles = allocation != 0
+    is_zero = has_vehicles & (utilisation == 0)
+    log_terms = allocation * np.log(
+        np.where(has_vehicles & ~is_zero, np.abs(utilisation), 1.0)
+    )
+    zero_terms = is_zero.astype(dtype)
+    negative_terms = np.where(utilisation < 0, allocation, 0.0)
+    return log_terms, zero_terms, negative_terms
+
+
+def get_product_from_log_sums(log_sums, zero_counts, negative_counts):
+    """
+    Recovers products of powers from the matrix products of the terms given by
+    `get_log_utilisation_terms`.
+
+    Parameters
+    ----------
+    log_sums : np.array
+        The summed log terms.
+    zero_counts : np.array
+        The number of factors in each product that are exactly zero.
+    negative_counts : np.array
+        The summed powers of negative factors in each product.
+
+    Returns
+    -------
+    np.array
+    """
+    sign = 1 - 2 * (np.rint(negative_counts) % 2)
+    return np.where(zero_counts > 0, 0.0, sign * np.exp(log_sums))
+
+
+def get_all_same_closer_busy_vector_log(vehicle_station_utilisation, allocation, beta):
+    """
+    Returns the probability of all vehicles of the same type that are preferred
+    being busy, computed in log space as a single matrix product.
+
+    This is equal to `get_all_same_closer_busy_vector` but avoids creating the
+    (pickups x stations x stations) array of powers.
+
+    Parameters
+    ----------
+    vehicle_station_utilisation : np.array
+        The utilisation of vehicles at every station
+    allocation : np.array
+        The number of vehicles at every station
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `pack_preferences`.
+
+    Returns
+    -------
+    np.array
+        Returns a vector:
+          + `all_same_closer_busy[a][p]` indicating the probability
+          of all vehicles of the same type and closer to p than
+          a being busy.
+    """
+    beta = get_preference_array(beta)
+    log_terms, zero_terms, negative_terms = get_log_utilisation_terms(
+        vehicle_station_utilisation, allocation
+    )
+    all_same_closer_busy = get_product_from_log_sums(
+        log_terms @ beta, zero_terms @ beta, negative_terms @ beta
+    ).T
+    return all_same_closer_busy
+
+
+def get_all_primary_closer_busy_vector_log(vehicle_station_utilisation, allocation, R):
+    """
+    Returns the probability of all primary vehicles that are preferred
+    being busy, computed in log space as a single matrix product.
+
+    This is equal to `get_all_primary_closer_busy_vector` but avoids creating
+    the (pickups x stations x stations) array of powers.
+
+    Parameters
+    ----------
+    vehicle_station_utilisation : np.array
+        The utilisation of vehicles at every station
+    allocation : np.array
+        The number of vehicles at every station
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `pack_preferences`.
+
+    Returns
+    -------
+    np.array
+        Returns a vector:
+          + `all_primary_closer_busy_vector[a][p]` indicating
+          the probability of all primary vehicles closer to p
+          than a secondary vehicle at a being busy.
+    """
+    R = get_preference_array(R)
+    log_terms, zero_terms, negative_terms = get_log_utilisation_terms(
+        vehicle_station_utilisation, allocation
+    )
+    all_primary_closer_busy_vector = get_product_from_log_sums(
+        log_terms @ R, zero_terms @ R, negative_terms @ R
+    )
+    return all_primary_closer_busy_vector
+
+
+def get_all_secondary_closer_busy_vector_log(
+    vehicle_station_utilisation, allocation, R
 ):
     """
-    Returns the probability vector of given stations not being busy.
+    Returns the probability of all secondary vehicles that are preferred
+    being busy, computed in log space as a single matrix product.
+
+    This is equal to `get_all_secondary_closer_busy_vector` but avoids creating
+    the (pickups x stations x stations) array of powers. The sums over `1 - R`
+    are taken as the total minus the sum over `R`.
 
     Parameters
     ----------
@@ -124,22 +1309,64 @@ def get_is_not_busy_vector(
         The utilisation of vehicles at every station
     allocation : np.array
         The number of vehicles at every station
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `pack_preferences`.
 
     Returns
     -------
     np.array
         Returns a vector:
-          + `is_not_busy[a]` indicating the probability of a vehicle
-             at location a not being busy.
+          + `all_secondary_closer_busy_vector[a][p]` indicating
+          the probability of all secondary vehicles closer to p
+          than a primary vehicle at a being busy.
     """
-    is_not_busy = 1 - np.power(vehicle_station_utilisation, allocation)
-    return is_not_busy
+    R = get_preference_array(R)
+    log_terms, zero_terms, negative_terms = get_log_utilisation_terms(
+        vehicle_station_utilisation, allocation
+    )
+    all_secondary_closer_busy_vector = get_product_from_log_sums(
+        log_terms.sum() - R @ log_terms,
+        zero_terms.sum() - R @ zero_terms,
+        negative_terms.sum() - R @ negative_terms,
+    )
+    return all_secondary_closer_busy_vector
 
 
-def get_all_same_closer_busy_vector(vehicle_station_utilisation, allocation, beta):
+def get_prefix_sums(terms, order, counts):
+    """
+    Returns the sums of the first `counts[p][a]` of the given station terms
+    when taken in the order `order[p]`.
+
+    Parameters
+    ----------
+    terms : np.array
+        A value for every station.
+    order : np.array
+        The ordering of the stations for every pickup location.
+    counts : np.array
+        The number of stations to sum over for every pickup location and
+        station.
+
+    Returns
+    -------
+    np.array
+    """
+    prefix_sums = np.zeros((order.shape[0], order.shape[1] + 1))
+    np.cumsum(terms[order], axis=1, out=prefix_sums[:, 1:])
+    return np.take_along_axis(prefix_sums, counts, axis=1)
+
+
+def get_all_same_closer_busy_vector_sorted(
+    vehicle_station_utilisation, allocation, neighbour_index
+):
     """
     Returns the probability of all vehicles of the same type that are preferred
-    being busy.
+    being busy, computed as cumulative sums of log terms along the sorted
+    neighbour index.
+
+    This is equal to `get_all_same_closer_busy_vector` using
+    O(pickups x stations) operations and memory.
 
     Parameters
     ----------
@@ -147,8 +1374,8 @@ def get_all_same_closer_busy_vector(vehicle_station_utilisation, allocation, bet
         The utilisation of vehicles at every station
     allocation : np.array
         The number of vehicles at every station
-    beta : np.array
-        A three dimensional array denoting which vehicles are preferred.
+    neighbour_index : dict
+        The sorted neighbour index given by `get_neighbour_index`.
 
     Returns
     -------
@@ -158,20 +1385,30 @@ def get_all_same_closer_busy_vector(vehicle_station_utilisation, allocation, bet
           of all vehicles of the same type and closer to p than
           a being busy.
     """
-    all_same_closer_busy = np.prod(
-        np.power(
-            vehicle_station_utilisation,
-            np.multiply(beta.transpose(0, 2, 1), allocation),
-        ),
-        axis=2,
+    all_same_closer_busy = get_product_from_log_sums(
+        *(
+            get_prefix_sums(
+                terms, neighbour_index["order"], neighbour_index["closer_counts"]
+            )
+            - terms
+            for terms in get_log_utilisation_terms(
+                vehicle_station_utilisation, allocation
+            )
+        )
     ).T
     return all_same_closer_busy
 
 
-def get_all_primary_closer_busy_vector(vehicle_station_utilisation, allocation, R):
+def get_all_primary_closer_busy_vector_sorted(
+    vehicle_station_utilisation, allocation, neighbour_index
+):
     """
     Returns the probability of all primary vehicles that are preferred
-    being busy.
+    being busy, computed as cumulative sums of log terms along the sorted
+    neighbour index.
+
+    This is equal to `get_all_primary_closer_busy_vector` using
+    O(pickups x stations) operations and memory.
 
     Parameters
     ----------
@@ -179,8 +1416,8 @@ def get_all_primary_closer_busy_vector(vehicle_station_utilisation, allocation,
         The utilisation of vehicles at every station
     allocation : np.array
         The number of vehicles at every station
-    R : np.array
-        A three dimensional array denoting which primary vehicles are preferred.
+    neighbour_index : dict
+        The sorted neighbour index given by `get_neighbour_index`.
 
     Returns
     -------
@@ -190,19 +1427,31 @@ def get_all_primary_closer_busy_vector(vehicle_station_utilisation, allocation,
           the probability of all primary vehicles closer to p
           than a secondary vehicle at a being busy.
     """
-    all_primary_closer_busy_vector = np.prod(
-        np.power(
-            vehicle_station_utilisation, np.multiply(R.transpose(0, 2, 1), allocation)
-        ),
-        axis=2,
+    all_primary_closer_busy_vector = get_product_from_log_sums(
+        *(
+            get_prefix_sums(
+                terms,
+                neighbour_index["primary_order"],
+                neighbour_index["primary_closer_counts"],
+            )
+            for terms in get_log_utilisation_terms(
+                vehicle_station_utilisation, allocation
+            )
+        )
     )
     return all_primary_closer_busy_vector
 
 
-def get_all_secondary_closer_busy_vector(vehicle_station_utilisation, allocation, R):
+def get_all_secondary_closer_busy_vector_sorted(
+    vehicle_station_utilisation, allocation, neighbour_index
+):
     """
     Returns the probability of all secondary vehicles that are preferred
-    being busy.
+    being busy, computed as cumulative sums of log terms along the sorted
+    neighbour index.
+
+    This is equal to `get_all_secondary_closer_busy_vector` using
+    O(pickups x stations) operations and memory.
 
     Parameters
     ----------
@@ -210,8 +1459,8 @@ def get_all_secondary_closer_busy_vector(vehicle_station_utilisation, allocation
         The utilisation of vehicles at every station
     allocation : np.array
         The number of vehicles at every station
-    R : np.array
-        A three dimensional array denoting which primary vehicles are preferred.
+    neighbour_index : dict
+        The sorted neighbour index given by `get_neighbour_index`.
 
     Returns
     -------
@@ -221,16 +1470,123 @@ def get_all_secondary_closer_busy_vector(vehicle_station_utilisation, allocation
           the probability of all secondary vehicles closer to p
           than a primary vehicle at a being busy.
     """
-    all_secondary_closer_busy_vector = np.prod(
-        np.power(
-            vehicle_station_utilisation,
-            np.multiply(1 - R, allocation),
-        ),
-        axis=2,
+    all_secondary_closer_busy_vector = get_product_from_log_sums(
+        *(
+            get_prefix_sums(
+                terms,
+                neighbour_index["secondary_order"],
+                neighbour_index["secondary_closer_counts"],
+            )
+            for terms in get_log_utilisation_terms(
+                vehicle_station_utilisation, allocation
+            )
+        )
     )
     return all_secondary_closer_busy_vector
 
 
+CLOSER_BUSY_ENGINES = {
+    "power": (
+        get_all_same_closer_busy_vector,
+        get_all_primary_closer_busy_vector,
+        get_all_secondary_closer_busy_vector,
+    ),
+    "log": (
+        get_all_same_closer_busy_vector_log,
+        get_all_primary_closer_busy_vector_log,
+        get_all_secondary_closer_busy_vector_log,
+    ),
+    "sorted": (
+        get_all_same_closer_busy_vector_sorted,
+        get_all_primary_closer_busy_vector_sorted,
+        get_all_secondary_closer_busy_vector_sorted,
+    ),
+}
+
+
+def get_closer_busy_preferences(
+    closer_busy_engine, beta, R, neighbour_index=None, dtype=None
+):
+    """
+    Returns the preference data to pass to the functions of the given engine
+    in place of beta and R.
+
+    Parameters
+    ----------
+    closer_busy_engine : str
+        A key of `CLOSER_BUSY_ENGINES`.
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `pack_preferences`.
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `pack_preferences`.
+    neighbour_index : dict
+        The sorted neighbour index given by `get_neighbour_index`, required by
+        the "sorted" engine.
+    dtype : type
+        If given, the precision of the products, to which floating point beta
+        and R are cast by `get_preference_array`.
+
+    Returns
+    -------
+    tuple
+        Returns the data to use in place of beta and the data to use in place
+        of R.
+
+    Raises
+    ------
+    ValueError
+        If the "sorted" engine is requested without a neighbour index.
+    """
+    if closer_busy_engine == "sorted":
+        if neighbour_index is None:
+            raise ValueError('The "sorted" engine requires a neighbour_index.')
+        return neighbour_index, neighbour_index
+    if dtype is not None:
+        return tuple(
+            None if preferences is None else get_preference_array(preferences, dtype)
+            for preferences in (beta, R)
+        )
+    return beta, R
+
+
+def get_contributing_classes(weights):
+    """
+    Returns the indices of the patient classes that contribute to a term of
+    the objective, those with a non zero weight.
+
+    Parameters
+    ----------
+    weights : np.array
+        The weighting given to each class of patients
+
+    Returns
+    -------
+    np.array
+        Returns the indices of the classes with a non zero weight.
+    """
+    return np.flatnonzero(weights)
+
+
+def get_active_pickups(demand_rates):
+    """
+    Returns the pickup locations at which each patient class has demand.
+
+    Parameters
+    ----------
+    demand_rates : np.array
+        The demand rates of given patient classes from given pickup locations.
+
+    Returns
+    -------
+    list
+        Returns the array of indices of the pickup locations with a non zero
+        demand rate for every class.
+    """
+    return [np.flatnonzero(class_demand_rates) for class_demand_rates in demand_rates]
+
+
 def get_psi(primary_survivals, primary_is_not_busy, all_closer_busy_primary):
     """
     Returns the value of psi
@@ -316,22 +1672,29 @@ def get_psi_tilde(
     return psi_tilde
 
 
-def get_objective(
-    demand_rates,
-    primary_survivals,
-    secondary_survivals,
-    weights_single_vehicle,
-    weights_multiple_vehicles,
-    beta,
-    R,
-    vehicle_station_utilisation_function,
-    allocation_primary,
-    allocation_secondary,
-    cache=None,
+def get_evaluation(
+    demand_rates=None,
+    primary_survivals=None,
+    secondary_survivals=None,
+    weights_single_vehicle=None,
+    weights_multiple_vehicles=None,
+    beta=None,
+    R=None,
+    vehicle_station_utilisation_function=None,
+    allocation_primary=None,
+    allocation_secondary=None,
+    closer_busy_engine="power",
+    neighbour_index=None,
+    dtype=float,
+    breakdown=True,
+    by_pickup=False,
+    scenario=None,
     **kwargs,
 ):
     """
-    Returns the value of psi tilde
+    Returns the evaluation of an allocation: the value of the objective
+    function together with its breakdown, all from a single call to the
+    vehicle station utilisation function.
 
     Parameters
     ----------
@@ -345,35 +1708,78 @@ def get_objective(
         The weighting given to each class of patients
     weights_multiple_vehicles : np.array
         The weighting given to each class of patients
-    beta : np.array
-        A three dimensional array denoting which vehicles are preferred.
-    R : np.array
-        A three dimensional array denoting which primary vehicles are preferred.
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `pack_preferences`.
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `pack_preferences`.
     allocation_primary : np.array
         An integer array of number of primary vehicles at every station
     allocation_secondary : np.array
         An integer array of number of secondary vehicles at every station
     vehicle_station_utilisation_function : callable
           returns two arrays of floats -- must be defined with `(**kwargs)`.
-    cache : dict
-        a dictionary mapping tuples of str representations of allocations
-        to objective function values.
+    closer_busy_engine : str
+        The engine used to compute the "all closer busy" probabilities, a key
+        of `CLOSER_BUSY_ENGINES`: "power", "log" or "sorted". This is also
+        passed to the vehicle station utilisation function.
+    neighbour_index : dict
+        The sorted neighbour index given by `get_neighbour_index`, required by
+        the "sorted" engine (in which case beta and R are not used). This is
+        also passed to the vehicle station utilisation function.
+    dtype : type
+        The precision of the "all closer busy" probabilities, for example
+        np.float32 to halve the memory traffic of their (pickups x stations x
+        stations) temporaries. The sums over classes and pickup locations are
+        taken in float64. Floating point beta and R are cast to it on every
+        call, so with np.float32 pass them as booleans or bit packed. This is
+        also passed to the vehicle station utilisation function.
+    breakdown : bool
+        Whether to break the objective down by patient class and give the
+        expected number of patients of every class, and of A1 patients,
+        surviving.
+    by_pickup : bool
+        Whether to break the objective down by pickup location.
+    scenario : Scenario
+        If given, the data of the scenario (in place of the demand rates,
+        survivals, weights, beta, R, engine and neighbour index) whose
+        class weighted survivals are used. This is also passed to the vehicle
+        station utilisation function.
     **kwargs : keyword arguments
         remaining keyword arguments to be passed to the vehicle station
         utilisation function.
 
-
-
     Returns
     -------
-    float
-        Returns the value of the objective function.
+    dict
+        Returns a dictionary with:
+          + "objective", the value of the objective function;
+          + "utilisations", the primary and secondary utilisations;
+          + "class_objectives", the contribution of every patient class to
+             the objective, if `breakdown`;
+          + "class_survivals", the expected number of patients of every class
+             surviving, unweighted, if `breakdown`. This is the demand
+             weighted sum of psi for the classes only weighted in
+             `weights_single_vehicle`, and of psi tilde for the others
+             (including those with no weight);
+          + "A1_survival", the expected number of A1 patients surviving, if
+             `breakdown`;
+          + "pickup_objectives", the contribution of every pickup location to
+             the objective, if `by_pickup`.
     """
+    if scenario is not None:
+        kwargs["scenario"] = scenario
+        demand_rates = scenario.demand_rates
+        primary_survivals = scenario.primary_survivals
+        secondary_survivals = scenario.secondary_survivals
+        weights_single_vehicle = scenario.weights_single_vehicle
+        weights_multiple_vehicles = scenario.weights_multiple_vehicles
+        beta = scenario.beta
+        R = scenario.R
+        closer_busy_engine = scenario.closer_busy_engine
+        neighbour_index = scenario.neighbour_index
 
-    if (cache is not None) and (
-        (keyname := (str(allocation_primary), str(allocation_secondary))) in cache
-    ):
-        return cache[keyname]
     (
         primary_vehicle_station_utilisation,
         secondary_vehicle_station_utilisation,
@@ -387,47 +1793,256 @@ def get_objective(
         R=R,
         allocation_primary=allocation_primary,
         allocation_secondary=allocation_secondary,
+        closer_busy_engine=closer_busy_engine,
+        neighbour_index=neighbour_index,
+        dtype=dtype,
         **kwargs,
     )
+    primary_vehicle_station_utilisation = np.asarray(
+        primary_vehicle_station_utilisation, dtype=dtype
+    )
+    secondary_vehicle_station_utilisation = np.asarray(
+        secondary_vehicle_station_utilisation, dtype=dtype
+    )
+    # Integer allocations would raise float32 powers to float64.
+    allocation_primary = np.asarray(allocation_primary, dtype=dtype)
+    allocation_secondary = np.asarray(allocation_secondary, dtype=dtype)
 
     primary_is_not_busy = get_is_not_busy_vector(
         primary_vehicle_station_utilisation, allocation_primary
     )
-    secondary_is_not_busy = get_is_not_busy_vector(
-        secondary_vehicle_station_utilisation, allocation_secondary
+    (
+        get_all_same_closer_busy,
+        get_all_primary_closer_busy,
+        get_all_secondary_closer_busy,
+    ) = CLOSER_BUSY_ENGINES[closer_busy_engine]
+    same_type_preferences, mixed_type_preferences = get_closer_busy_preferences(
+        closer_busy_engine, beta, R, neighbour_index, dtype=dtype
     )
 
-    all_closer_busy_primary = get_all_same_closer_busy_vector(
-        primary_vehicle_station_utilisation, allocation_primary, beta
+    all_closer_busy_primary = get_all_same_closer_busy(
+        primary_vehicle_station_utilisation, allocation_primary, same_type_preferences
     )
 
-    all_closer_busy_secondary = get_all_same_closer_busy_vector(
-        secondary_vehicle_station_utilisation, allocation_secondary, beta
-    )
+    # With no secondary vehicles none is ever free and all of them are always
+    # busy, so only the primary vehicles reach patients and psi tilde reduces
+    # to psi: none of the secondary terms are needed.
+    is_single_fleet = not np.any(allocation_secondary)
+    if not is_single_fleet:
+        secondary_is_not_busy = get_is_not_busy_vector(
+            secondary_vehicle_station_utilisation, allocation_secondary
+        )
+        all_closer_busy_secondary = get_all_same_closer_busy(
+            secondary_vehicle_station_utilisation,
+            allocation_secondary,
+            same_type_preferences,
+        )
+        all_primary_closer_than_secondary_busy = get_all_primary_closer_busy(
+            primary_vehicle_station_utilisation,
+            allocation_primary,
+            mixed_type_preferences,
+        )
+        all_secondary_closer_than_primary_busy = get_all_secondary_closer_busy(
+            secondary_vehicle_station_utilisation,
+            allocation_secondary,
+            mixed_type_preferences,
+        )
+
+    evaluation = {
+        "utilisations": (
+            primary_vehicle_station_utilisation,
+            secondary_vehicle_station_utilisation,
+        )
+    }
+    if scenario is not None and not (breakdown or by_pickup) and is_single_fleet:
+        g = (
+            primary_is_not_busy
+            * all_closer_busy_primary.T
+            * (scenario.primary_single_survivals + scenario.primary_multiple_survivals)
+        ).sum()
+    elif scenario is not None and not (breakdown or by_pickup):
+        # The classes are summed out of the survivals before the busy
+        # probabilities (which do not depend on the class) are applied.
+        g = (
+            primary_is_not_busy
+            * all_closer_busy_primary.T
+            * (
+                scenario.primary_single_survivals
+                + scenario.primary_multiple_survivals
+                * all_secondary_closer_than_primary_busy
+            )
+            + secondary_is_not_busy
+            * all_closer_busy_secondary.T
+            * scenario.secondary_multiple_survivals
+            * all_primary_closer_than_secondary_busy
+        ).sum()
+    else:
+        # Only the classes with a non zero weight contribute to each term (and
+        # the A1 class to its survival, and every class to its survivals in a
+        # breakdown), and only at the pickup locations where they have demand.
+        demand_rates = np.asarray(demand_rates)
+        primary_survivals = np.asarray(primary_survivals)
+        secondary_survivals = np.asarray(secondary_survivals)
+        weights_single_vehicle = np.asarray(weights_single_vehicle)
+        weights_multiple_vehicles = np.asarray(weights_multiple_vehicles)
+        class_objectives = np.zeros(len(demand_rates))
+        class_survivals = np.zeros(len(demand_rates))
+        pickup_objectives = np.zeros(demand_rates.shape[1])
+        for k, pickups in enumerate(get_active_pickups(demand_rates)):
+            contributions = np.zeros(len(pickups))
+            is_single_vehicle_class = (
+                weights_single_vehicle[k] != 0 and weights_multiple_vehicles[k] == 0
+            )
+            if weights_single_vehicle[k] != 0:
+                psi = get_psi(
+                    primary_survivals[k, pickups],
+                    primary_is_not_busy,
+                    all_closer_busy_primary[:, pickups],
+                )
+                single_survivals = (psi.T * demand_rates[k, pickups]).sum(axis=0)
+                contributions += weights_single_vehicle[k] * single_survivals
+                if is_single_vehicle_class:
+                    class_survivals[k] = single_survivals.sum()
+            if weights_multiple_vehicles[k] != 0 or (
+                breakdown and (k == 0 or not is_single_vehicle_class)
+            ):
+                if is_single_fleet:
+                    # psi tilde is psi.
+                    psi_tilde = get_psi(
+                        primary_survivals[k, pickups],
+                        primary_is_not_busy,
+                        all_closer_busy_primary[:, pickups],
+                    )
+                else:
+                    psi_tilde = get_psi_tilde(
+                        primary_survivals[k, pickups],
+                        secondary_survivals[k, pickups],
+                        primary_is_not_busy,
+                        secondary_is_not_busy,
+                        all_closer_busy_primary[:, pickups],
+                        all_closer_busy_secondary[:, pickups],
+                        all_secondary_closer_than_primary_busy[pickups],
+                        all_primary_closer_than_secondary_busy[pickups],
+                    )
+                survivals = (psi_tilde.T * demand_rates[k, pickups]).sum(axis=0)
+                if k == 0:
+                    evaluation["A1_survival"] = survivals.sum()
+                if not is_single_vehicle_class:
+                    class_survivals[k] = survivals.sum()
+                contributions += weights_multiple_vehicles[k] * survivals
+            class_objectives[k] = contributions.sum()
+            pickup_objectives[pickups] += contributions
+        g = class_objectives.sum()
+        if breakdown:
+            evaluation["class_objectives"] = class_objectives
+            evaluation["class_survivals"] = class_survivals
+        else:
+            evaluation.pop("A1_survival", None)
+        if by_pickup:
+            evaluation["pickup_objectives"] = pickup_objectives
+
+    evaluation["objective"] = g
+    return evaluation
 
-    all_primary_closer_than_secondary_busy = get_all_primary_closer_busy_vector(
-        primary_vehicle_station_utilisation, allocation_primary, R
-    )
-    all_secondary_closer_than_primary_busy = get_all_secondary_closer_busy_vector(
-        secondary_vehicle_station_utilisation, allocation_secondary, R
-    )
 
-    psi = get_psi(primary_survivals, primary_is_not_busy, all_closer_busy_primary)
-    psi_tilde = get_psi_tilde(
-        primary_survivals,
-        secondary_survivals,
-        primary_is_not_busy,
-        secondary_is_not_busy,
-        all_closer_busy_primary,
-        all_closer_busy_secondary,
-        all_secondary_closer_than_primary_busy,
-        all_primary_closer_than_secondary_busy,
-    )
+def get_objective(
+    demand_rates=None,
+    primary_survivals=None,
+    secondary_survivals=None,
+    weights_single_vehicle=None,
+    weights_multiple_vehicles=None,
+    beta=None,
+    R=None,
+    vehicle_station_utilisation_function=None,
+    allocation_primary=None,
+    allocation_secondary=None,
+    cache=None,
+    closer_busy_engine="power",
+    neighbour_index=None,
+    dtype=float,
+    scenario=None,
+    **kwargs,
+):
+    """
+    Returns the value of the objective function, as given by `get_evaluation`.
+
+    Parameters
+    ----------
+    demand_rates : np.array
+        The demand rates of given patient classes from given pickup locations.
+    primary_survivals : np.array
+        The survival probability due to primary vehicles.
+    secondary_survivals : np.array
+        The survival probability due to secondary vehicles.
+    weights_single_vehicle : np.array
+        The weighting given to each class of patients
+    weights_multiple_vehicles : np.array
+        The weighting given to each class of patients
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `pack_preferences`.
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `pack_preferences`.
+    allocation_primary : np.array
+        An integer array of number of primary vehicles at every station
+    allocation_secondary : np.array
+        An integer array of number of secondary vehicles at every station
+    vehicle_station_utilisation_function : callable
+          returns two arrays of floats -- must be defined with `(**kwargs)`.
+    cache : ObjectiveCache or dict
+        a cache of objective function values, or a dictionary mapping tuples
+        of str representations of allocations to objective function values.
+    closer_busy_engine : str
+        The engine used to compute the "all closer busy" probabilities, a key
+        of `CLOSER_BUSY_ENGINES`: "power", "log" or "sorted". This is also
+        passed to the vehicle station utilisation function.
+    neighbour_index : dict
+        The sorted neighbour index given by `get_neighbour_index`, required by
+        the "sorted" engine (in which case beta and R are not used). This is
+        also passed to the vehicle station utilisation function.
+    dtype : type
+        The precision of the "all closer busy" probabilities, as in
+        `get_evaluation`. The values are cached whatever their precision, so
+        use a separate cache for reduced precision values.
+    scenario : Scenario
+        If given, the data of the scenario (in place of the demand rates,
+        survivals, weights, beta, R, engine and neighbour index) whose
+        class weighted survivals are used. This is also passed to the vehicle
+        station utilisation function.
+    **kwargs : keyword arguments
+        remaining keyword arguments to be passed to the vehicle station
+        utilisation function.
+
 
-    g = (
-        ((psi.T * weights_single_vehicle) * demand_rates.T).sum(axis=2)
-        + ((psi_tilde.T * weights_multiple_vehicles) * demand_rates.T).sum(axis=2)
-    ).sum()
+
+    Returns
+    -------
+    float
+        Returns the value of the objective function.
+    """
+    if cache is not None:
+        keyname = get_cache_key(cache, allocation_primary, allocation_secondary)
+        if (cached_value := cache.get(keyname)) is not None:
+            return cached_value
+    g = get_evaluation(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=vehicle_station_utilisation_function,
+        allocation_primary=allocation_primary,
+        allocation_secondary=allocation_secondary,
+        closer_busy_engine=closer_busy_engine,
+        neighbour_index=neighbour_index,
+        dtype=dtype,
+        breakdown=False,
+        scenario=scenario,
+        **kwargs,
+    )["objective"]
 
     if cache is not None:
         cache[keyname] = g
@@ -446,10 +2061,13 @@ def get_survival_A1_only(
     vehicle_station_utilisation_function,
     allocation_primary,
     allocation_secondary,
+    closer_busy_engine="power",
+    neighbour_index=None,
     **kwargs,
 ):
     """
-    Returns the expected number of A1 patients surviving
+    Returns the expected number of A1 patients surviving, as given by
+    `get_evaluation`.
 
     Parameters
     ----------
@@ -463,16 +2081,26 @@ def get_survival_A1_only(
         The weighting given to each class of patients
     weights_multiple_vehicles : np.array
         The weighting given to each class of patients
-    beta : np.array
-        A three dimensional array denoting which vehicles are preferred.
-    R : np.array
-        A three dimensional array denoting which primary vehicles are preferred.
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `pack_preferences`.
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `pack_preferences`.
     allocation_primary : np.array
         An integer array of number of primary vehicles at every station
     allocation_secondary : np.array
         An integer array of number of secondary vehicles at every station
     vehicle_station_utilisation_function : callable
           returns two arrays of floats -- must be defined with `(**kwargs)`.
+    closer_busy_engine : str
+        The engine used to compute the "all closer busy" probabilities, a key
+        of `CLOSER_BUSY_ENGINES`: "power", "log" or "sorted". This is also
+        passed to the vehicle station utilisation function.
+    neighbour_index : dict
+        The sorted neighbour index given by `get_neighbour_index`, required by
+        the "sorted" engine (in which case beta and R are not used). This is
+        also passed to the vehicle station utilisation function.
     **kwargs : keyword arguments
         remaining keyword arguments to be passed to the vehicle station
         utilisation function.
@@ -484,10 +2112,7 @@ def get_survival_A1_only(
     float
         Returns the value of the expected number of A1 patients surviving
     """
-    (
-        primary_vehicle_station_utilisation,
-        secondary_vehicle_station_utilisation,
-    ) = vehicle_station_utilisation_function(
+    return get_evaluation(
         demand_rates=demand_rates,
         primary_survivals=primary_survivals,
         secondary_survivals=secondary_survivals,
@@ -495,42 +2120,686 @@ def get_survival_A1_only(
         weights_multiple_vehicles=weights_multiple_vehicles,
         beta=beta,
         R=R,
+        vehicle_station_utilisation_function=vehicle_station_utilisation_function,
         allocation_primary=allocation_primary,
         allocation_secondary=allocation_secondary,
+        closer_busy_engine=closer_busy_engine,
+        neighbour_index=neighbour_index,
         **kwargs,
-    )
+    )["A1_survival"]
+
+
+def get_objective_batch(
+    population,
+    demand_rates=None,
+    primary_survivals=None,
+    secondary_survivals=None,
+    weights_single_vehicle=None,
+    weights_multiple_vehicles=None,
+    beta=None,
+    R=None,
+    vehicle_station_utilisation_function=None,
+    cache=None,
+    starting_lambdas=None,
+    solver_infos=None,
+    vectorised_utilisation_function=False,
+    dtype=float,
+    scenario=None,
+    **kwargs,
+):
+    """
+    Returns the values of the objective function for a whole population of
+    allocations.
 
-    primary_is_not_busy = get_is_not_busy_vector(
-        primary_vehicle_station_utilisation, allocation_primary
+    The "all closer busy" probabilities of every allocation are obtained in log
+    space (as in `get_all_same_closer_busy_vector_log`) with one tensor product
+    over the population, and the patient classes are summed out of the
+    survivals before the busy probabilities are applied.
+
+    Parameters
+    ----------
+    population : np.array
+        A (N, 2, number_of_locations) array of N allocations, each consisting of
+        a primary allocation and a secondary allocation.
+    demand_rates : np.array
+        The demand rates of given patient classes from given pickup locations.
+    primary_survivals : np.array
+        The survival probability due to primary vehicles.
+    secondary_survivals : np.array
+        The survival probability due to secondary vehicles.
+    weights_single_vehicle : np.array
+        The weighting given to each class of patients
+    weights_multiple_vehicles : np.array
+        The weighting given to each class of patients
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `pack_preferences`.
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `pack_preferences`.
+    vehicle_station_utilisation_function : callable
+          returns two arrays of floats -- must be defined with `(**kwargs)`.
+    cache : ObjectiveCache or dict
+        a cache of objective function values, or a dictionary mapping tuples
+        of str representations of allocations to objective function values.
+    starting_lambdas : list
+        The demand rates to start the utilisation solve of each allocation
+        from, passed to the vehicle station utilisation function as
+        `starting_lambdas`.
+    solver_infos : list
+        A dictionary for each allocation, passed to the vehicle station
+        utilisation function as `solver_info`.
+    vectorised_utilisation_function : bool
+        Whether the vehicle station utilisation function takes the allocations
+        still to be evaluated as two dimensional arrays (with the starting
+        demand rates and solver information as lists `starting_lambdas` and
+        `solver_infos`) and returns two dimensional utilisations, as
+        `utilisation.solve_utilisations_batch` does. If not it is called once
+        per allocation.
+    dtype : type
+        The precision of the "all closer busy" probabilities, as in
+        `get_evaluation`. This is also passed to the vehicle station
+        utilisation function.
+    scenario : Scenario
+        If given, the data of the scenario (in place of the demand rates,
+        survivals, weights, beta and R) whose class weighted survivals are
+        used. This is also passed to the vehicle station utilisation function.
+    **kwargs : keyword arguments
+        remaining keyword arguments to be passed to the vehicle station
+        utilisation function.
+
+    Returns
+    -------
+    np.array
+        Returns the value of the objective function for every allocation.
+    """
+    if scenario is not None:
+        kwargs["scenario"] = scenario
+        demand_rates = scenario.demand_rates
+        primary_survivals = scenario.primary_survivals
+        secondary_survivals = scenario.secondary_survivals
+        weights_single_vehicle = scenario.weights_single_vehicle
+        weights_multiple_vehicles = scenario.weights_multiple_vehicles
+        beta = scenario.beta
+        R = scenario.R
+    population = np.asarray(population)
+    objective_values = np.zeros(len(population))
+    if cache is not None:
+        keynames = [
+            get_cache_key(cache, allocation_primary, allocation_secondary)
+            for allocation_primary, allocation_secondary in population
+        ]
+        if hasattr(cache, "get_many"):
+            cached_values = cache.get_many(keynames)
+        else:
+            cached_values = [cache.get(keyname) for keyname in keynames]
+        to_evaluate = np.array([value is None for value in cached_values])
+        for index, value in enumerate(cached_values):
+            if value is not None:
+                objective_values[index] = value
+    else:
+        to_evaluate = np.ones(len(population), dtype=bool)
+    if not to_evaluate.any():
+        return objective_values
+
+    allocations_primary = population[to_evaluate, 0]
+    allocations_secondary = population[to_evaluate, 1]
+    evaluated_indices = np.where(to_evaluate)[0]
+    evaluated_starting_lambdas = (
+        None
+        if starting_lambdas is None
+        else [starting_lambdas[index] for index in evaluated_indices]
     )
-    secondary_is_not_busy = get_is_not_busy_vector(
-        secondary_vehicle_station_utilisation, allocation_secondary
+    evaluated_solver_infos = (
+        None
+        if solver_infos is None
+        else [solver_infos[index] for index in evaluated_indices]
     )
+    if vectorised_utilisation_function:
+        primary_utilisations, secondary_utilisations = (
+            np.asarray(utilisations, dtype=dtype)
+            for utilisations in vehicle_station_utilisation_function(
+                demand_rates=demand_rates,
+                primary_survivals=primary_survivals,
+                secondary_survivals=secondary_survivals,
+                weights_single_vehicle=weights_single_vehicle,
+                weights_multiple_vehicles=weights_multiple_vehicles,
+                beta=beta,
+                R=R,
+                allocation_primary=allocations_primary,
+                allocation_secondary=allocations_secondary,
+                starting_lambdas=evaluated_starting_lambdas,
+                solver_infos=evaluated_solver_infos,
+                dtype=dtype,
+                **kwargs,
+            )
+        )
+    else:
+        utilisations = [
+            vehicle_station_utilisation_function(
+                demand_rates=demand_rates,
+                primary_survivals=primary_survivals,
+                secondary_survivals=secondary_survivals,
+                weights_single_vehicle=weights_single_vehicle,
+                weights_multiple_vehicles=weights_multiple_vehicles,
+                beta=beta,
+                R=R,
+                allocation_primary=allocation_primary,
+                allocation_secondary=allocation_secondary,
+                starting_lambdas=(
+                    None
+                    if evaluated_starting_lambdas is None
+                    else evaluated_starting_lambdas[index]
+                ),
+                solver_info=(
+                    None
+                    if evaluated_solver_infos is None
+                    else evaluated_solver_infos[index]
+                ),
+                dtype=dtype,
+                **kwargs,
+            )
+            for index, (allocation_primary, allocation_secondary) in enumerate(
+                zip(allocations_primary, allocations_secondary)
+            )
+        ]
+        primary_utilisations = np.array([pair[0] for pair in utilisations], dtype=dtype)
+        secondary_utilisations = np.array(
+            [pair[1] for pair in utilisations], dtype=dtype
+        )
+
+    beta = get_preference_array(beta, dtype)
+    R = get_preference_array(R, dtype)
+    # Integer allocations would raise float32 powers to float64.
+    allocations_primary = allocations_primary.astype(dtype)
+    allocations_secondary = allocations_secondary.astype(dtype)
+    primary_is_not_busy = get_is_not_busy_vector(
+        primary_utilisations, allocations_primary
+    )
+    primary_terms = get_log_utilisation_terms(primary_utilisations, allocations_primary)
 
-    all_closer_busy_primary = get_all_same_closer_busy_vector(
-        primary_vehicle_station_utilisation, allocation_primary, beta
+    # Each of these is indexed [n][p][a], with a the station being dispatched.
+    all_closer_busy_primary = get_product_from_log_sums(
+        *(np.tensordot(terms, beta, axes=([1], [1])) for terms in primary_terms)
     )
 
-    all_closer_busy_secondary = get_all_same_closer_busy_vector(
-        secondary_vehicle_station_utilisation, allocation_secondary, beta
+    # The secondary terms are only computed for the members with secondary
+    # vehicles: for the others all secondary vehicles are always busy and none
+    # of them reach patients.
+    has_secondary = allocations_secondary.any(axis=1)
+    all_secondary_closer_than_primary_busy = np.ones(
+        all_closer_busy_primary.shape, dtype=dtype
     )
+    secondary_reached = np.zeros(all_closer_busy_primary.shape, dtype=dtype)
+    if has_secondary.any():
+        secondary_is_not_busy = get_is_not_busy_vector(
+            secondary_utilisations[has_secondary], allocations_secondary[has_secondary]
+        )
+        secondary_terms = get_log_utilisation_terms(
+            secondary_utilisations[has_secondary], allocations_secondary[has_secondary]
+        )
+        all_closer_busy_secondary = get_product_from_log_sums(
+            *(np.tensordot(terms, beta, axes=([1], [1])) for terms in secondary_terms)
+        )
+        all_primary_closer_than_secondary_busy = get_product_from_log_sums(
+            *(
+                np.tensordot(terms[has_secondary], R, axes=([1], [1]))
+                for terms in primary_terms
+            )
+        )
+        all_secondary_closer_than_primary_busy[
+            has_secondary
+        ] = get_product_from_log_sums(
+            *(
+                terms.sum(axis=1)[:, None, None]
+                - np.tensordot(terms, R, axes=([1], [2]))
+                for terms in secondary_terms
+            )
+        )
+
+    if scenario is None:
+        scenario = Scenario(
+            demand_rates=demand_rates,
+            primary_survivals=primary_survivals,
+            secondary_survivals=secondary_survivals,
+            weights_single_vehicle=weights_single_vehicle,
+            weights_multiple_vehicles=weights_multiple_vehicles,
+            beta=beta,
+            R=R,
+        )
+    primary_single_survivals = scenario.primary_single_survivals.astype(dtype)
+    primary_multiple_survivals = scenario.primary_multiple_survivals.astype(dtype)
+    secondary_multiple_survivals = scenario.secondary_multiple_survivals.astype(dtype)
 
-    all_primary_closer_than_secondary_busy = get_all_primary_closer_busy_vector(
-        primary_vehicle_station_utilisation, allocation_primary, R
+    primary_reached = (
+        primary_is_not_busy[:, None, :]
+        * all_closer_busy_primary
+        * (
+            primary_single_survivals
+            + primary_multiple_survivals * all_secondary_closer_than_primary_busy
+        )
     )
-    all_secondary_closer_than_primary_busy = get_all_secondary_closer_busy_vector(
-        secondary_vehicle_station_utilisation, allocation_secondary, R
+    if has_secondary.any():
+        secondary_reached[has_secondary] = (
+            secondary_is_not_busy[:, None, :]
+            * all_closer_busy_secondary
+            * secondary_multiple_survivals
+            * all_primary_closer_than_secondary_busy
+        )
+    evaluated_values = (primary_reached + secondary_reached).sum(
+        axis=(1, 2), dtype=float
     )
+    objective_values[to_evaluate] = evaluated_values
 
-    psi_tilde = get_psi_tilde(
-        primary_survivals,
-        secondary_survivals,
-        primary_is_not_busy,
-        secondary_is_not_busy,
-        all_closer_busy_primary,
-        all_closer_busy_secondary,
-        all_secondary_closer_than_primary_busy,
-        all_primary_closer_than_secondary_busy,
+    if cache is not None:
+        for index, value in zip(np.where(to_evaluate)[0], evaluated_values):
+            cache[keynames[index]] = value
+
+    return objective_values
+
+
+def get_marginal_gains(
+    allocation_primary,
+    allocation_secondary,
+    vehicle_station_utilisation_function,
+    max_primary=None,
+    max_secondary=None,
+    cache=None,
+    vectorised_utilisation_function=False,
+    **kwargs,
+):
+    """
+    Returns the change in the value of the objective function from adding or
+    removing a single primary or secondary vehicle at every station.
+
+    All of the neighbouring allocations are evaluated as one population by
+    `get_objective_batch`, with the utilisation solve of each of them warm
+    started from the demand rates solved for the given allocation.
+
+    Parameters
+    ----------
+    allocation_primary : np.array
+        An integer array of number of primary vehicles at every station
+    allocation_secondary : np.array
+        An integer array of number of secondary vehicles at every station
+    vehicle_station_utilisation_function : callable
+          returns two arrays of floats -- must be defined with `(**kwargs)`.
+    max_primary : int
+        The maximum number of primary vehicles at a station. If None there is
+        no maximum.
+    max_secondary : int
+        The maximum number of secondary vehicles at a station. If None there
+        is no maximum.
+    cache : ObjectiveCache or dict
+        a cache of objective function values, or a dictionary mapping tuples
+        of str representations of allocations to objective function values.
+    vectorised_utilisation_function : bool
+        Whether the vehicle station utilisation function is vectorised, as
+        for `get_objective_batch`.
+    **kwargs : keyword arguments
+        remaining keyword arguments to be passed to `get_objective_batch`:
+        the data of the scenario (or a `scenario`) and the keyword arguments
+        of the vehicle station utilisation function.
+
+    Returns
+    -------
+    dict
+        Returns a dictionary with:
+          + "objective", the value of the objective function for the given
+             allocation;
+          + "add_primary", "remove_primary", "add_secondary" and
+             "remove_secondary", the change in the value of the objective
+             function from making that change at every station, which is
+             nan where it is not possible.
+    """
+    allocation = np.array([allocation_primary, allocation_secondary])
+    number_of_stations = allocation.shape[1]
+    limits = [
+        np.inf if maximum is None else maximum
+        for maximum in (max_primary, max_secondary)
+    ]
+    moves = {}
+    for vehicle_type, name in enumerate(("primary", "secondary")):
+        moves[f"add_{name}"] = (
+            vehicle_type,
+            1,
+            np.flatnonzero(allocation[vehicle_type] < limits[vehicle_type]),
+        )
+        moves[f"remove_{name}"] = (
+            vehicle_type,
+            -1,
+            np.flatnonzero(allocation[vehicle_type] > 0),
+        )
+
+    population = [allocation]
+    for vehicle_type, change, stations in moves.values():
+        neighbours = np.repeat(allocation[None], len(stations), axis=0)
+        neighbours[np.arange(len(stations)), vehicle_type, stations] += change
+        population.extend(neighbours)
+    population = np.array(population)
+
+    batch_kwargs = dict(
+        vehicle_station_utilisation_function=vehicle_station_utilisation_function,
+        cache=cache,
+        vectorised_utilisation_function=vectorised_utilisation_function,
+        **kwargs,
+    )
+    base_solver_info = {}
+    base_value = get_objective_batch(
+        population=population[:1], solver_infos=[base_solver_info], **batch_kwargs
+    )[0]
+    starting_lambdas = base_solver_info.get("lambdas")
+    neighbour_values = get_objective_batch(
+        population=population[1:],
+        starting_lambdas=[starting_lambdas] * (len(population) - 1),
+        **batch_kwargs,
     )
 
-    return (psi_tilde[0].T * demand_rates[0].T).sum()
+    marginal_gains = {"objective": base_value}
+    start = 0
+    for name, (vehicle_type, change, stations) in moves.items():
+        gains = np.full(number_of_stations, np.nan)
+        gains[stations] = neighbour_values[start : start + len(stations)] - base_value
+        marginal_gains[name] = gains
+        start += len(stations)
+    return marginal_gains
+
+
+class IncrementalObjective:
+    """
+    The objective function value of an allocation, held with the utilisations
+    and the log sums of the "all closer busy" products it is built from, so
+    that the value of an allocation differing from it at a few stations (for
+    example after `optimisation.move_vehicle_of_same_type` or a chain of
+    such moves) is found by updating them instead of evaluating from scratch.
+
+    The utilisations are found again for an updated allocation by calling
+    the vehicle station utilisation function with the demand rates solved for
+    this allocation as `starting_lambdas` and with `residual_tolerance`. With
+    `utilisation.solve_utilisations` this is the policy for when the solve is
+    redone:
+
+      + a vehicle type whose residuals at those demand rates are within the
+        tolerance (as a fraction of the total demand) keeps them without
+        solving, so its utilisations only change at the stations its vehicles
+        moved between. This is always the case for the primary vehicles
+        after a move of secondary vehicles;
+      + otherwise it is solved again, warm started from them, which refines
+        them in a few steps. This is the case for the secondary vehicles
+        after any move, as their residuals depend on the primary
+        utilisations;
+      + a cold solve only happens for the first allocation or if no demand
+        rates were solved for this one (for example because its utilisation
+        was above the limit).
+
+    The log sums are then only updated for the stations whose allocation or
+    utilisation changed, so for a vehicle type whose demand rates were kept
+    (or with utilisations that do not depend on the allocation) the cost
+    scales with the number of moves rather than the number of stations. If
+    more than `maximum_updated_stations` stations changed, as they do for a
+    vehicle type that was solved again, the log sums of that vehicle type are
+    recomputed in full, which is then cheaper.
+
+    Beta and R are used as floats, converted once by the scenario (see
+    `Scenario.get_float_preferences`), so the states of a scenario share them
+    and do not pickle them.
+
+    Parameters
+    ----------
+    scenario : Scenario
+        The data of the scenario.
+    vehicle_station_utilisation_function : callable
+        returns two arrays of floats -- must be defined with `(**kwargs)`.
+    allocation_primary : np.array
+        An integer array of number of primary vehicles at every station
+    allocation_secondary : np.array
+        An integer array of number of secondary vehicles at every station
+    maximum_updated_stations : int
+        The number of changed stations above which the log sums are
+        recomputed rather than updated. If None, a quarter of the stations.
+    residual_tolerance : float
+        The largest residual, as a fraction of the total demand, at which the
+        demand rates of a vehicle type are kept for an updated allocation. If
+        None they are always solved again.
+    **kwargs : keyword arguments
+        remaining keyword arguments to be passed to the vehicle station
+        utilisation function.
+    """
+
+    def __init__(
+        self,
+        scenario,
+        vehicle_station_utilisation_function,
+        allocation_primary,
+        allocation_secondary,
+        maximum_updated_stations=None,
+        residual_tolerance=1e-7,
+        **kwargs,
+    ):
+        self.scenario = scenario
+        self.residual_tolerance = residual_tolerance
+        self.vehicle_station_utilisation_function = vehicle_station_utilisation_function
+        self.kwargs = kwargs
+        if maximum_updated_stations is None:
+            maximum_updated_stations = len(allocation_primary) // 4
+        self.maximum_updated_stations = maximum_updated_stations
+        self.allocation_primary = np.array(allocation_primary)
+        self.allocation_secondary = np.array(allocation_secondary)
+        self.solver_info = {}
+        self.utilisations = self.get_utilisations(starting_lambdas=None)
+        self.terms = tuple(
+            get_log_utilisation_terms(utilisations, allocation)
+            for utilisations, allocation in zip(
+                self.utilisations, (self.allocation_primary, self.allocation_secondary)
+            )
+        )
+        self.log_sums = {
+            **self.get_primary_log_sums(self.terms[0]),
+            **self.get_secondary_log_sums(self.terms[1]),
+        }
+        self.value = self.get_value()
+
+    def get_utilisations(self, starting_lambdas):
+        """
+        Calls the vehicle station utilisation function for the allocation,
+        filling `solver_info`.
+
+        Parameters
+        ----------
+        starting_lambdas : tuple
+            The primary and secondary demand rates to start the solves from.
+
+        Returns
+        -------
+        tuple
+            Returns the primary and the secondary utilisations.
+        """
+        arguments = {**self.scenario.get_arguments(), **self.kwargs}
+        return tuple(
+            np.asarray(utilisations, dtype=float)
+            for utilisations in self.vehicle_station_utilisation_function(
+                allocation_primary=self.allocation_primary,
+                allocation_secondary=self.allocation_secondary,
+                starting_lambdas=starting_lambdas,
+                residual_tolerance=self.residual_tolerance,
+                solver_info=self.solver_info,
+                scenario=self.scenario,
+                **arguments,
+            )
+        )
+
+    def get_primary_log_sums(self, terms, stations=None):
+        """
+        Returns the log sums of the products over primary vehicles, over all
+        stations or the contribution of some of them.
+
+        Parameters
+        ----------
+        terms : tuple
+            The log utilisation terms of the primary vehicles, as given by
+            `get_log_utilisation_terms`.
+        stations : np.array
+            The stations to sum over. If None, all of them.
+
+        Returns
+        -------
+        dict
+            Returns the log sums, indexed [p][a], of the probability of all
+            preferred primary vehicles being busy ("closer_busy_primary") and
+            of all primary vehicles preferred to a secondary vehicle being busy
+            ("primary_closer_than_secondary_busy").
+        """
+        if stations is None:
+            stations = slice(None)
+        beta, R = self.scenario.get_float_preferences()
+        return {
+            "closer_busy_primary": [
+                np.tensordot(term[stations], beta[:, stations], axes=([0], [1]))
+                for term in terms
+            ],
+            "primary_closer_than_secondary_busy": [
+                np.tensordot(term[stations], R[:, stations], axes=([0], [1]))
+                for term in terms
+            ],
+        }
+
+    def get_secondary_log_sums(self, terms, stations=None):
+        """
+        Returns the log sums of the products over secondary vehicles, over all
+        stations or the contribution of some of them.
+
+        Parameters
+        ----------
+        terms : tuple
+            The log utilisation terms of the secondary vehicles, as given by
+            `get_log_utilisation_terms`.
+        stations : np.array
+            The stations to sum over. If None, all of them.
+
+        Returns
+        -------
+        dict
+            Returns the log sums, indexed [p][a], of the probability of all
+            preferred secondary vehicles being busy ("closer_busy_secondary")
+            and of all secondary vehicles preferred to a primary vehicle being
+            busy ("secondary_closer_than_primary_busy").
+        """
+        if stations is None:
+            stations = slice(None)
+        beta, R = self.scenario.get_float_preferences()
+        return {
+            "closer_busy_secondary": [
+                np.tensordot(term[stations], beta[:, stations], axes=([0], [1]))
+                for term in terms
+            ],
+            "secondary_closer_than_primary_busy": [
+                term[stations].sum()
+                - np.tensordot(term[stations], R[:, :, stations], axes=([0], [2]))
+                for term in terms
+            ],
+        }
+
+    def get_value(self):
+        """
+        Returns the objective function value from the utilisations and the
+        log sums.
+
+        Returns
+        -------
+        float
+        """
+        (
+            closer_busy_primary,
+            closer_busy_secondary,
+            primary_closer_than_secondary_busy,
+            secondary_closer_than_primary_busy,
+        ) = (
+            get_product_from_log_sums(*self.log_sums[name])
+            for name in (
+                "closer_busy_primary",
+                "closer_busy_secondary",
+                "primary_closer_than_secondary_busy",
+                "secondary_closer_than_primary_busy",
+            )
+        )
+        primary_is_not_busy = get_is_not_busy_vector(
+            self.utilisations[0], self.allocation_primary
+        )
+        secondary_is_not_busy = get_is_not_busy_vector(
+            self.utilisations[1], self.allocation_secondary
+        )
+        return (
+            primary_is_not_busy
+            * closer_busy_primary
+            * (
+                self.scenario.primary_single_survivals
+                + self.scenario.primary_multiple_survivals
+                * secondary_closer_than_primary_busy
+            )
+            + secondary_is_not_busy
+            * closer_busy_secondary
+            * self.scenario.secondary_multiple_survivals
+            * primary_closer_than_secondary_busy
+        ).sum()
+
+    def get_updated(self, allocation_primary, allocation_secondary):
+        """
+        Returns the state of another allocation, found by updating this one.
+        This state is not changed.
+
+        Parameters
+        ----------
+        allocation_primary : np.array
+            An integer array of number of primary vehicles at every station
+        allocation_secondary : np.array
+            An integer array of number of secondary vehicles at every station
+
+        Returns
+        -------
+        IncrementalObjective
+            Returns the state of the given allocation.
+        """
+        if np.array_equal(allocation_primary, self.allocation_primary) and (
+            np.array_equal(allocation_secondary, self.allocation_secondary)
+        ):
+            return self
+        updated = copy.copy(self)
+        updated.allocation_primary = np.array(allocation_primary)
+        updated.allocation_secondary = np.array(allocation_secondary)
+        updated.solver_info = {}
+        updated.utilisations = updated.get_utilisations(
+            starting_lambdas=self.solver_info.get("lambdas")
+        )
+        updated.terms = tuple(
+            get_log_utilisation_terms(utilisations, allocation)
+            for utilisations, allocation in zip(
+                updated.utilisations,
+                (updated.allocation_primary, updated.allocation_secondary),
+            )
+        )
+        updated.log_sums = dict(self.log_sums)
+        for get_log_sums, terms, new_terms in (
+            (updated.get_primary_log_sums, self.terms[0], updated.terms[0]),
+            (updated.get_secondary_log_sums, self.terms[1], updated.terms[1]),
+        ):
+            changed_stations = np.flatnonzero(
+                np.any(
+                    [term != new_term for term, new_term in zip(terms, new_terms)],
+                    axis=0,
+                )
+            )
+            if len(changed_stations) > self.maximum_updated_stations:
+                updated.log_sums.update(get_log_sums(new_terms))
+            elif len(changed_stations) > 0:
+                differences = tuple(
+                    new_term - term for term, new_term in zip(terms, new_terms)
+                )
+                for name, changes in get_log_sums(
+                    differences, stations=changed_stations
+                ).items():
+                    updated.log_sums[name] = [
+                        log_sum + change
+                        for log_sum, change in zip(self.log_sums[name], changes)
+                    ]
+        updated.value = updated.get_value()
+        return updated
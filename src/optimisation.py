@@ -1,4 +1,11 @@
-from typing import Tuple
+from typing import Any, Dict, Optional, Tuple
+import collections
+import concurrent.futures
+import copy
+import multiprocessing.shared_memory
+import os
+import threading
+import time
 import numpy as np
 import numpy.typing as npt
 import objective
@@ -6,19 +13,64 @@ import tqdm  # type: ignore
 import dask  # type: ignore
 
 
+def get_generator(rng: Optional[np.random.Generator] = None) -> Any:
+    """
+    Returns what to draw random numbers from: the given
+    `numpy.random.Generator`, or the `numpy.random` module (and so the global
+    numpy random state) if None.
+    """
+    return np.random if rng is None else rng
+
+
+def get_seed_sequence(seed=None):
+    """
+    Returns a `numpy.random.SeedSequence` for a seed: the seed itself if it is
+    one, one seeded by entropy drawn from it if it is a
+    `numpy.random.Generator`, and `numpy.random.SeedSequence(seed)` otherwise.
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return np.random.SeedSequence(seed.integers(2**63, size=4).tolist())
+    return np.random.SeedSequence(seed)
+
+
+def spawn_generators(seed_sequence, number_of_generators):
+    """
+    Returns independent `numpy.random.Generator`s spawned from a
+    `numpy.random.SeedSequence`. Every call spawns new children, so repeated
+    calls give different streams.
+    """
+    return [
+        np.random.default_rng(child_seed_sequence)
+        for child_seed_sequence in seed_sequence.spawn(number_of_generators)
+    ]
+
+
+def get_generators(seed, number_of_generators):
+    """
+    Returns independent `numpy.random.Generator`s spawned from a seed (an
+    int, a `numpy.random.SeedSequence` or a `numpy.random.Generator`), for
+    example one per replicate of an experiment.
+    """
+    return spawn_generators(get_seed_sequence(seed), number_of_generators)
+
+
 def move_vehicle_of_same_type(
     allocation_for_moving: npt.NDArray[np.int64],
     allocation_not_for_moving: npt.NDArray[np.int64],
     max_allocation: int,
+    rng: Optional[np.random.Generator] = None,
 ) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
     """
     Randomly moves on primary from one primary location to another.
     """
+    generator = get_generator(rng)
     locations_with_vehicle = np.where(allocation_for_moving)[0]
     locations_to_move_to = np.where(allocation_for_moving < max_allocation)[0]
-    from_location = np.random.choice(locations_with_vehicle)
+    from_location = generator.choice(locations_with_vehicle)
     is_not_from_location = locations_to_move_to != from_location
-    to_location = np.random.choice(
+    to_location = generator.choice(
         locations_to_move_to, p=is_not_from_location / np.sum(is_not_from_location)
     )
     new_allocation_for_moving = np.array(allocation_for_moving)
@@ -33,14 +85,16 @@ def switch_primary_to_secondary(
     secondary_allocation: npt.NDArray[np.int64],
     max_allocation: int,
     primary_to_secondary_ratio: int = 3,
+    rng: Optional[np.random.Generator] = None,
 ) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
     """
     Randomly remove a primary vehicle and create `primary_to_secondary_ratio` secondary vehicles.
     """
+    generator = get_generator(rng)
     locations_with_primary = np.where(primary_allocation)[0]
     locations_to_move_to = np.where(secondary_allocation < max_allocation)[0]
-    from_location = np.random.choice(locations_with_primary)
-    to_locations = np.random.choice(
+    from_location = generator.choice(locations_with_primary)
+    to_locations = generator.choice(
         locations_to_move_to, size=primary_to_secondary_ratio
     )
     new_primary_allocation = np.array(primary_allocation)
@@ -56,20 +110,22 @@ def switch_secondary_to_primary(
     secondary_allocation,
     max_allocation,
     primary_to_secondary_ratio=3,
+    rng=None,
 ):
     """
     Randomly add a primary vehicle and remove `primary_to_secondary_ratio` secondary vehicles.
     """
+    rng = get_generator(rng)
     locations_with_secondary = np.repeat(
         np.arange(len(secondary_allocation)), secondary_allocation
     )
     locations_to_move_to = np.where(primary_allocation < max_allocation)[0]
-    from_locations = np.random.choice(
+    from_locations = rng.choice(
         locations_with_secondary,
         size=primary_to_secondary_ratio,
         replace=False,
     )
-    to_location = np.random.choice(locations_to_move_to)
+    to_location = rng.choice(locations_to_move_to)
     new_primary_allocation = np.array(primary_allocation)
     new_secondary_allocation = np.array(secondary_allocation)
     new_primary_allocation[to_location] += 1
@@ -84,7 +140,9 @@ def mutate_full(
     max_primary,
     max_secondary,
     primary_to_secondary_ratio=3,
+    rng=None,
 ):
+    rng = get_generator(rng)
     number_primary_vehicles = sum(primary_allocation)
     number_secondary_vehicles = sum(secondary_allocation)
     possible_mutations = [
@@ -92,6 +150,7 @@ def mutate_full(
             allocation_for_moving=x,
             allocation_not_for_moving=y,
             max_allocation=max_primary,
+            rng=rng,
         )
     ]
     if number_secondary_vehicles > 0:
@@ -100,6 +159,7 @@ def mutate_full(
                 allocation_for_moving=y,
                 allocation_not_for_moving=x,
                 max_allocation=max_secondary,
+                rng=rng,
             )[::-1]
         )
     if (
@@ -111,15 +171,19 @@ def mutate_full(
                 primary_allocation=x,
                 secondary_allocation=y,
                 max_allocation=max_secondary,
+                rng=rng,
             )
         )
     if number_secondary_vehicles > primary_to_secondary_ratio:
         possible_mutations.append(
             lambda x, y, max_primary, max_secondary: switch_secondary_to_primary(
-                primary_allocation=x, secondary_allocation=y, max_allocation=max_primary
+                primary_allocation=x,
+                secondary_allocation=y,
+                max_allocation=max_primary,
+                rng=rng,
             )
         )
-    mutation_function = np.random.choice(possible_mutations)
+    mutation_function = rng.choice(possible_mutations)
     return mutation_function(
         primary_allocation, secondary_allocation, max_primary, max_secondary
     )
@@ -130,13 +194,16 @@ def mutate_retain_vehicle_numbers(
     secondary_allocation,
     max_primary,
     max_secondary,
+    rng=None,
 ):
+    rng = get_generator(rng)
     number_secondary_vehicles = sum(secondary_allocation)
     possible_mutations = [
         lambda x, y, max_primary, max_secondary: move_vehicle_of_same_type(
             allocation_for_moving=x,
             allocation_not_for_moving=y,
             max_allocation=max_primary,
+            rng=rng,
         )
     ]
     if number_secondary_vehicles > 0:
@@ -145,14 +212,193 @@ def mutate_retain_vehicle_numbers(
                 allocation_for_moving=y,
                 allocation_not_for_moving=x,
                 max_allocation=max_secondary,
+                rng=rng,
             )[::-1]
         )
-    mutation_function = np.random.choice(possible_mutations)
+    mutation_function = rng.choice(possible_mutations)
     return mutation_function(
         primary_allocation, secondary_allocation, max_primary, max_secondary
     )
 
 
+def choose_locations(
+    weights: npt.NDArray, rng: Optional[np.random.Generator] = None
+) -> npt.NDArray[np.int64]:
+    """
+    Randomly chooses a location for every row of a (N, number_of_locations)
+    array of weights, with probabilities proportional to the weights. Rows
+    whose weights are all zero are given an arbitrary location.
+    """
+    generator = get_generator(rng)
+    cumulative_weights = np.cumsum(weights, axis=1)
+    thresholds = generator.random(len(weights)) * cumulative_weights[:, -1]
+    locations = (cumulative_weights <= thresholds[:, None]).sum(axis=1)
+    return np.minimum(locations, weights.shape[1] - 1)
+
+
+def move_vehicle_of_same_type_batch(
+    population: npt.NDArray[np.int64],
+    vehicle_type: int,
+    max_allocation: int,
+    rows: npt.NDArray[np.bool_],
+    rng: Optional[np.random.Generator] = None,
+) -> npt.NDArray[np.int64]:
+    """
+    Randomly moves one vehicle of the given type (0 for primary, 1 for
+    secondary) from one location to another in every selected row of a
+    (N, 2, number_of_locations) population, as `move_vehicle_of_same_type`.
+    Rows where no move is possible are left unchanged.
+    """
+    population = np.array(population)
+    allocations = population[:, vehicle_type]
+    has_vehicle = allocations > 0
+    from_locations = choose_locations(has_vehicle, rng)
+    can_move_to = allocations < max_allocation
+    can_move_to[np.arange(len(population)), from_locations] = False
+    to_locations = choose_locations(can_move_to, rng)
+    indices = np.flatnonzero(rows & has_vehicle.any(axis=1) & can_move_to.any(axis=1))
+    allocations[indices, from_locations[indices]] -= 1
+    allocations[indices, to_locations[indices]] += 1
+    return population
+
+
+def switch_primary_to_secondary_batch(
+    population: npt.NDArray[np.int64],
+    max_allocation: int,
+    rows: npt.NDArray[np.bool_],
+    primary_to_secondary_ratio: int = 3,
+    rng: Optional[np.random.Generator] = None,
+) -> npt.NDArray[np.int64]:
+    """
+    Randomly removes a primary vehicle and creates `primary_to_secondary_ratio`
+    secondary vehicles in every selected row of a population, as
+    `switch_primary_to_secondary`. Each secondary vehicle is placed at a
+    location still below `max_allocation`, and rows without room for all of
+    them are left unchanged.
+    """
+    population = np.array(population)
+    has_primary = population[:, 0] > 0
+    from_locations = choose_locations(has_primary, rng)
+    room = np.maximum(max_allocation - population[:, 1], 0).sum(axis=1)
+    indices = np.flatnonzero(
+        rows & has_primary.any(axis=1) & (room >= primary_to_secondary_ratio)
+    )
+    population[indices, 0, from_locations[indices]] -= 1
+    for _ in range(primary_to_secondary_ratio):
+        to_locations = choose_locations(population[:, 1] < max_allocation, rng)
+        population[indices, 1, to_locations[indices]] += 1
+    return population
+
+
+def switch_secondary_to_primary_batch(
+    population: npt.NDArray[np.int64],
+    max_allocation: int,
+    rows: npt.NDArray[np.bool_],
+    primary_to_secondary_ratio: int = 3,
+    rng: Optional[np.random.Generator] = None,
+) -> npt.NDArray[np.int64]:
+    """
+    Randomly adds a primary vehicle and removes `primary_to_secondary_ratio`
+    secondary vehicles in every selected row of a population, as
+    `switch_secondary_to_primary`.
+    """
+    population = np.array(population)
+    can_move_to = population[:, 0] < max_allocation
+    to_locations = choose_locations(can_move_to, rng)
+    indices = np.flatnonzero(
+        rows
+        & can_move_to.any(axis=1)
+        & (population[:, 1].sum(axis=1) >= primary_to_secondary_ratio)
+    )
+    population[indices, 0, to_locations[indices]] += 1
+    # Removing one vehicle at a time, with locations weighted by their number
+    # of vehicles, draws them without replacement.
+    for _ in range(primary_to_secondary_ratio):
+        from_locations = choose_locations(population[:, 1], rng)
+        population[indices, 1, from_locations[indices]] -= 1
+    return population
+
+
+def mutate_full_batch(
+    population,
+    max_primary,
+    max_secondary,
+    rows=None,
+    primary_to_secondary_ratio=3,
+    rng=None,
+):
+    """
+    Applies `mutate_full` to every selected row of a population (all of them
+    if `rows` is None), each row choosing between its possible mutations.
+    """
+    population = np.asarray(population)
+    if rows is None:
+        rows = np.ones(len(population), dtype=bool)
+    number_primary_vehicles, number_secondary_vehicles = population.sum(axis=2).T
+    possible_mutations = np.column_stack(
+        [
+            np.ones(len(population), dtype=bool),
+            number_secondary_vehicles > 0,
+            number_primary_vehicles * primary_to_secondary_ratio
+            > number_secondary_vehicles + primary_to_secondary_ratio,
+            number_secondary_vehicles > primary_to_secondary_ratio,
+        ]
+    )
+    mutations = choose_locations(possible_mutations, rng)
+    population = move_vehicle_of_same_type_batch(
+        population, 0, max_primary, rows & (mutations == 0), rng
+    )
+    population = move_vehicle_of_same_type_batch(
+        population, 1, max_secondary, rows & (mutations == 1), rng
+    )
+    population = switch_primary_to_secondary_batch(
+        population,
+        max_secondary,
+        rows & (mutations == 2),
+        primary_to_secondary_ratio,
+        rng,
+    )
+    return switch_secondary_to_primary_batch(
+        population,
+        max_primary,
+        rows & (mutations == 3),
+        primary_to_secondary_ratio,
+        rng,
+    )
+
+
+def mutate_retain_vehicle_numbers_batch(
+    population,
+    max_primary,
+    max_secondary,
+    rows=None,
+    rng=None,
+):
+    """
+    Applies `mutate_retain_vehicle_numbers` to every selected row of a
+    population (all of them if `rows` is None).
+    """
+    population = np.asarray(population)
+    if rows is None:
+        rows = np.ones(len(population), dtype=bool)
+    possible_mutations = np.column_stack(
+        [np.ones(len(population), dtype=bool), population[:, 1].any(axis=1)]
+    )
+    mutations = choose_locations(possible_mutations, rng)
+    population = move_vehicle_of_same_type_batch(
+        population, 0, max_primary, rows & (mutations == 0), rng
+    )
+    return move_vehicle_of_same_type_batch(
+        population, 1, max_secondary, rows & (mutations == 1), rng
+    )
+
+
+BATCH_MUTATION_FUNCTIONS = {
+    mutate_full: mutate_full_batch,
+    mutate_retain_vehicle_numbers: mutate_retain_vehicle_numbers_batch,
+}
+
+
 def repeat_mutation(
     mutation_function,
     times_to_repeat,
@@ -160,20 +406,49 @@ def repeat_mutation(
     secondary_allocation,
     max_primary,
     max_secondary,
+    rng=None,
 ):
     """
-    Repeats the mutation function a number of times
+    Repeats the mutation function a number of times, passing it `rng` if one
+    is given.
     """
+    generator_argument = {} if rng is None else {"rng": rng}
     for _ in range(times_to_repeat):
         primary_allocation, secondary_allocation = mutation_function(
             primary_allocation=primary_allocation,
             secondary_allocation=secondary_allocation,
             max_primary=max_primary,
             max_secondary=max_secondary,
+            **generator_argument,
         )
     return primary_allocation, secondary_allocation
 
 
+def repeat_mutation_batch(
+    mutation_function,
+    times_to_repeat,
+    population,
+    max_primary,
+    max_secondary,
+    rng=None,
+):
+    """
+    Repeats a batched mutation function (such as `mutate_full_batch`) on
+    every row of a population, the number of times given for that row (or
+    the same number for every row).
+    """
+    times_to_repeat = np.broadcast_to(times_to_repeat, (len(population),))
+    for repetition in range(times_to_repeat.max(initial=0)):
+        population = mutation_function(
+            population=population,
+            max_primary=max_primary,
+            max_secondary=max_secondary,
+            rows=times_to_repeat > repetition,
+            rng=rng,
+        )
+    return np.array(population)
+
+
 def create_initial_population(
     number_of_locations: int,
     number_of_primary_vehicles: int,
@@ -182,11 +457,13 @@ def create_initial_population(
     max_secondary: int,
     population_size: int,
     randomise_vehicle_numbers: bool = False,
+    rng: Optional[np.random.Generator] = None,
 ) -> npt.NDArray[np.int64]:
     """
     Creates a (population_size, 2, number_of_locations) array of population_size allocations.
     Each allocation is a (2, number_of_locations) array consisting of a primary allocation and a secondary allocation.
     """
+    generator = get_generator(rng)
     population = []
     n_primary = number_of_primary_vehicles
     n_secondary = number_of_secondary_vehicles
@@ -194,7 +471,7 @@ def create_initial_population(
     for entry in range(population_size):
         # If randomise_vehicle_numbers, randomise the vehicle numbers
         if randomise_vehicle_numbers:
-            n_primary = np.random.choice(
+            n_primary = generator.choice(
                 np.arange(
                     int(np.ceil(total_number_of_vehicles * 0.75)),
                     total_number_of_vehicles + 1,
@@ -203,7 +480,7 @@ def create_initial_population(
             n_secondary = (total_number_of_vehicles - n_primary) * 3
         # create primary allocation
         primary_allocation = np.zeros(number_of_locations)
-        temp = np.random.choice(
+        temp = generator.choice(
             np.arange(number_of_locations).repeat(max_primary),
             n_primary,
             replace=False,
@@ -213,7 +490,7 @@ def create_initial_population(
 
         # create secondary allocation
         secondary_allocation = np.zeros(number_of_locations)
-        temp = np.random.choice(
+        temp = generator.choice(
             np.arange(number_of_locations).repeat(max_secondary),
             n_secondary,
             replace=False,
@@ -226,6 +503,429 @@ def create_initial_population(
     return np.array(population).astype(np.int64)
 
 
+# The shared memory blocks this process holds, by name, so that every block is
+# attached to once however many tasks use it.
+ATTACHED_SHARED_MEMORY: Dict[str, multiprocessing.shared_memory.SharedMemory] = {}
+
+
+class SharedArray:
+    """
+    A numpy array held in a `multiprocessing.shared_memory` block by
+    `SharedArrays`. It is pickled as the name, shape and dtype of the block, so
+    a process based worker attaches to the block rather than receiving a copy
+    of the array.
+    """
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    def get_array(self):
+        """
+        Returns the (read only) array, attaching this process to the block the
+        first time.
+        """
+        shared_memory = ATTACHED_SHARED_MEMORY.get(self.name)
+        if shared_memory is None:
+            shared_memory = multiprocessing.shared_memory.SharedMemory(name=self.name)
+            ATTACHED_SHARED_MEMORY[self.name] = shared_memory
+        array = np.ndarray(self.shape, dtype=self.dtype, buffer=shared_memory.buf)
+        array.flags.writeable = False
+        return array
+
+
+class SharedDictionary(dict):
+    """
+    A dictionary made by `SharedArrays`, some of whose values are
+    `SharedArray`s.
+    """
+
+
+class SharedArrays:
+    """
+    Copies the data of a scenario once into `multiprocessing.shared_memory`
+    for process based workers: every given array is replaced by a
+    `SharedArray`, as are the arrays of bit packed preferences (see
+    `objective.pack_preferences`) and those held by an `objective.Scenario`.
+    Pass the values in `arrays` to `rank_population` in place of the given
+    ones. The blocks are released by `close`, or on leaving a `with` block.
+    """
+
+    def __init__(self, **arrays):
+        self.shared_memories = []
+        self.arrays = {name: self.share(value) for name, value in arrays.items()}
+
+    def share(self, value):
+        """
+        Returns the value with its arrays copied into shared memory.
+        """
+        if isinstance(value, dict):
+            return SharedDictionary(
+                {key: self.share(item) for key, item in value.items()}
+            )
+        if isinstance(value, objective.Scenario):
+            scenario = copy.copy(value)
+            vars(scenario).update(
+                {name: self.share(item) for name, item in vars(value).items()}
+            )
+            return scenario
+        if not isinstance(value, np.ndarray) or value.dtype.hasobject:
+            return value
+        shared_memory = multiprocessing.shared_memory.SharedMemory(
+            create=True, size=max(value.nbytes, 1)
+        )
+        np.ndarray(value.shape, dtype=value.dtype, buffer=shared_memory.buf)[
+            ...
+        ] = value
+        self.shared_memories.append(shared_memory)
+        ATTACHED_SHARED_MEMORY[shared_memory.name] = shared_memory
+        return SharedArray(shared_memory.name, value.shape, value.dtype)
+
+    def close(self):
+        """
+        Releases the shared memory blocks.
+        """
+        for shared_memory in self.shared_memories:
+            ATTACHED_SHARED_MEMORY.pop(shared_memory.name, None)
+            try:
+                shared_memory.close()
+            except BufferError:
+                # Arrays of this process still view the block, which is then
+                # unmapped once they are freed.
+                pass
+            shared_memory.unlink()
+        self.shared_memories = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def get_attached(value):
+    """
+    Returns the value with every `SharedArray` made by `SharedArrays` replaced
+    by its array, including those in a `SharedDictionary` (such as bit packed
+    preferences) and held by an `objective.Scenario`. A value holding none is
+    returned as it is.
+    """
+    if isinstance(value, SharedArray):
+        return value.get_array()
+    if isinstance(value, SharedDictionary):
+        return {key: get_attached(item) for key, item in value.items()}
+    if isinstance(value, objective.Scenario):
+        attached = {name: get_attached(item) for name, item in vars(value).items()}
+        if any(attached[name] is not item for name, item in vars(value).items()):
+            value = copy.copy(value)
+            vars(value).update(attached)
+    return value
+
+
+def get_value_and_run_time(function, kwargs):
+    """
+    Returns the value of the function called with the keyword arguments, the
+    worker (process and thread) it was called in and the time it took.
+    """
+    start = time.perf_counter()
+    value = function(**kwargs)
+    return value, (os.getpid(), threading.get_ident()), time.perf_counter() - start
+
+
+def compute(function, arguments, scheduler=None, num_workers=None, timings=None):
+    """
+    Returns the values of `function` called with each dictionary of keyword
+    arguments in `arguments`, run by `scheduler`: in turn in this process if
+    "serial", submitted to it if a `concurrent.futures.Executor` (such as a
+    `concurrent.futures.ProcessPoolExecutor`, whose size then sets the number
+    of workers), and otherwise as dask tasks on `num_workers` workers with that
+    dask scheduler ("threads", "processes" or the default one if None).
+
+    If `timings` is a list, the wall time of the computation and its scheduler
+    overhead are appended to it as a tuple. The overhead is the part of the
+    wall time in which the busiest worker was not running `function`: building
+    and dispatching the tasks, moving their arguments and values, and waiting.
+    """
+    if timings is not None:
+        start = time.perf_counter()
+        results = compute(
+            get_value_and_run_time,
+            [dict(function=function, kwargs=kwargs) for kwargs in arguments],
+            scheduler=scheduler,
+            num_workers=num_workers,
+        )
+        wall_time = time.perf_counter() - start
+        run_times = collections.defaultdict(float)
+        for _, worker, run_time in results:
+            run_times[worker] += run_time
+        timings.append((wall_time, wall_time - max(run_times.values(), default=0)))
+        return tuple(value for value, _, _ in results)
+    if isinstance(scheduler, concurrent.futures.Executor):
+        futures = [scheduler.submit(function, **kwargs) for kwargs in arguments]
+        return tuple(future.result() for future in futures)
+    if scheduler == "serial":
+        return tuple(function(**kwargs) for kwargs in arguments)
+    return dask.compute(
+        *(dask.delayed(function)(**kwargs) for kwargs in arguments),
+        scheduler=scheduler,
+        num_workers=num_workers,
+    )
+
+
+def get_objective_and_solver_info(solver_info, **kwargs):
+    """
+    Returns the value of `objective.get_objective` with the solver information
+    filled by the vehicle station utilisation function, so that it also comes
+    back from process based workers. Arguments made by `SharedArrays` are
+    attached to first.
+    """
+    kwargs = {key: get_attached(value) for key, value in kwargs.items()}
+    return objective.get_objective(solver_info=solver_info, **kwargs), solver_info
+
+
+def get_objective_batch_and_solver_infos(solver_infos, **kwargs):
+    """
+    Returns the values of `objective.get_objective_batch` with the solver
+    information filled by the vehicle station utilisation function, so that it
+    also comes back from process based workers. Arguments made by
+    `SharedArrays` are attached to first.
+    """
+    kwargs = {key: get_attached(value) for key, value in kwargs.items()}
+    return (
+        objective.get_objective_batch(solver_infos=solver_infos, **kwargs),
+        solver_infos,
+    )
+
+
+def get_incremental_objective(
+    state, scenario, vehicle_station_utilisation_function, allocation, **kwargs
+):
+    """
+    Returns the `objective.IncrementalObjective` of an allocation, updated from
+    the state of its parent if one is given, and whether it is a new state
+    (False if it is the parent's, as the allocation was not changed). Arguments
+    made by `SharedArrays` are attached to first.
+    """
+    scenario = get_attached(scenario)
+    kwargs = {key: get_attached(value) for key, value in kwargs.items()}
+    if state is None:
+        new_state = objective.IncrementalObjective(
+            scenario=scenario,
+            vehicle_station_utilisation_function=vehicle_station_utilisation_function,
+            allocation_primary=allocation[0],
+            allocation_secondary=allocation[1],
+            **kwargs,
+        )
+        return new_state, True
+    new_state = state.get_updated(
+        allocation_primary=allocation[0], allocation_secondary=allocation[1]
+    )
+    return new_state, new_state is not state
+
+
+def rank_population_incrementally(
+    population,
+    scenario,
+    vehicle_station_utilisation_function,
+    num_workers,
+    parent_states=None,
+    cache=None,
+    solver_infos=None,
+    scheduler=None,
+    timings=None,
+    **kwargs,
+):
+    """
+    Ranks the population according to the objective function, finding the
+    value of each allocation by updating the `objective.IncrementalObjective`
+    of its parent (aligned with the population in `parent_states`, None for
+    those to evaluate from scratch).
+
+    Returns the ranked population, objective function values and states. The
+    values are written to the `cache`, and `solver_infos` and `timings` are
+    extended as in `rank_population`. The cache is not read: every allocation
+    needs its state, to be updated for its children, even if its value is
+    known.
+    """
+    if parent_states is None:
+        parent_states = [None for _ in population]
+    results = compute(
+        get_incremental_objective,
+        [
+            dict(
+                state=state,
+                scenario=scenario,
+                vehicle_station_utilisation_function=vehicle_station_utilisation_function,
+                allocation=allocation,
+                **kwargs,
+            )
+            for state, allocation in zip(parent_states, population)
+        ],
+        scheduler=scheduler,
+        num_workers=num_workers,
+        timings=timings,
+    )
+    states = [state for state, _ in results]
+    objective_values = np.array([state.value for state in states])
+    if cache is not None:
+        for allocation, value in zip(population, objective_values):
+            cache[objective.get_cache_key(cache, *allocation)] = value
+    ordering = np.argsort(-objective_values)
+    if solver_infos is not None:
+        # A state is its parent's if the allocation was not changed, in which
+        # case its solver information was already counted.
+        solver_infos.extend(
+            states[index].solver_info if results[index][1] else {} for index in ordering
+        )
+    return (
+        np.array(population[ordering]),
+        objective_values[ordering],
+        [states[index] for index in ordering],
+    )
+
+
+def get_objectives_and_solver_infos(arguments, population, starting_lambdas, batched):
+    """
+    Returns the objective function values of a chunk of allocations with the
+    solver information of each, found with a single call to
+    `objective.get_objective_batch` if `batched` and otherwise with one call to
+    `objective.get_objective` per allocation. In that case a cache that reads
+    many keys at once (such as an `objective.ObjectiveArchive`) is read for
+    the whole chunk with a single call to its `get_many`, as
+    `objective.get_objective_batch` does.
+    """
+    if batched:
+        return get_objective_batch_and_solver_infos(
+            population=population,
+            starting_lambdas=starting_lambdas,
+            solver_infos=[{} for _ in population],
+            **arguments,
+        )
+    cache = arguments.get("cache")
+    reads_many = hasattr(cache, "get_many")
+    if reads_many:
+        keynames = [
+            objective.get_cache_key(cache, *allocation) for allocation in population
+        ]
+        cached_values = cache.get_many(keynames)
+        arguments = {**arguments, "cache": None}
+    else:
+        cached_values = [None for _ in population]
+    results = []
+    for index, (allocation, cached_value) in enumerate(zip(population, cached_values)):
+        if cached_value is not None:
+            results.append((cached_value, {}))
+            continue
+        value, solver_info = get_objective_and_solver_info(
+            allocation_primary=allocation[0],
+            allocation_secondary=allocation[1],
+            starting_lambdas=(
+                None if starting_lambdas is None else starting_lambdas[index]
+            ),
+            solver_info={},
+            **arguments,
+        )
+        if reads_many:
+            cache[keynames[index]] = value
+        results.append((value, solver_info))
+    return np.array([value for value, _ in results]), [info for _, info in results]
+
+
+class EvaluationContext:
+    """
+    What every population of a run is ranked with: the scenario data, the
+    vehicle station utilisation function with its keyword arguments and the
+    cache, gathered once so that `rank` only sends the allocations with each
+    task. With a dask scheduler they are wrapped once in a single
+    `dask.delayed`, which every task graph refers to by its key rather than
+    holding and traversing them again for every task.
+
+    The allocations are evaluated in tasks of `chunk_size` allocations. By
+    default there is one task per allocation or, if `batched`, the population
+    is split in to `num_workers` tasks. Every task of a `batched` context makes
+    a single call to `objective.get_objective_batch`.
+
+    The tasks are run by `scheduler`, which is "serial", a
+    `concurrent.futures.Executor` or a dask scheduler (the default one if None),
+    as in `compute`. With process based workers ("processes" or a
+    `concurrent.futures.ProcessPoolExecutor`) every worker gets a copy of the
+    cache, so use an `objective.SharedObjectiveCache` to keep the values the
+    workers compute, and a copy of the scenario data with every task unless it
+    is passed as made by `SharedArrays`, which the workers attach to instead.
+    """
+
+    def __init__(
+        self,
+        vehicle_station_utilisation_function,
+        num_workers,
+        scheduler=None,
+        batched=False,
+        chunk_size=None,
+        **arguments,
+    ):
+        self.num_workers = num_workers
+        self.scheduler = scheduler
+        self.batched = batched
+        self.chunk_size = chunk_size
+        self.arguments = dict(
+            vehicle_station_utilisation_function=vehicle_station_utilisation_function,
+            **arguments,
+        )
+        self.task_arguments = self.arguments
+        if scheduler != "serial" and not isinstance(
+            scheduler, concurrent.futures.Executor
+        ):
+            self.task_arguments = dask.delayed(self.arguments, traverse=False)
+
+    def get_chunks(self, number_of_allocations):
+        """
+        Returns the indices of the allocations evaluated by each task.
+        """
+        if self.chunk_size is not None:
+            sections = range(self.chunk_size, number_of_allocations, self.chunk_size)
+        elif self.batched:
+            sections = self.num_workers
+        else:
+            sections = number_of_allocations
+        return [
+            chunk
+            for chunk in np.array_split(np.arange(number_of_allocations), sections)
+            if len(chunk) > 0
+        ]
+
+    def rank(self, population, starting_lambdas=None, solver_infos=None, timings=None):
+        """
+        Ranks the population according to the objective function, as
+        `rank_population`.
+        """
+        results = compute(
+            get_objectives_and_solver_infos,
+            [
+                dict(
+                    arguments=self.task_arguments,
+                    population=population[chunk],
+                    starting_lambdas=(
+                        None
+                        if starting_lambdas is None
+                        else [starting_lambdas[index] for index in chunk]
+                    ),
+                    batched=self.batched,
+                )
+                for chunk in self.get_chunks(len(population))
+            ],
+            scheduler=self.scheduler,
+            num_workers=self.num_workers,
+            timings=timings,
+        )
+        objective_values = -np.concatenate([values for values, _ in results])
+        infos = [info for _, chunk_infos in results for info in chunk_infos]
+        ordering = np.argsort(objective_values)
+        if solver_infos is not None:
+            solver_infos.extend(infos[index] for index in ordering)
+        return np.array(population[ordering]), -objective_values[ordering]
+
+
 def rank_population(
     population,
     demand_rates,
@@ -238,31 +938,124 @@ def rank_population(
     vehicle_station_utilisation_function,
     num_workers,
     cache=None,
+    batched=False,
+    starting_lambdas=None,
+    solver_infos=None,
+    scheduler=None,
+    chunk_size=None,
+    timings=None,
     **kwargs,
 ):
     """
     Ranks the population according to the objective function
+
+    The population is evaluated as by an `EvaluationContext` with the given
+    `scheduler`, `batched` and `chunk_size`; to rank many populations with the
+    same arguments, make one and call its `rank`.
+
+    If given, `starting_lambdas` is a list (aligned with the population) of the
+    demand rates to start each utilisation solve from, and `solver_infos` is a
+    list that is extended with the solver information of each allocation, in
+    the ranked order. If `timings` is a list, the wall time and scheduler
+    overhead of the ranking are appended to it (see `compute`).
     """
-    tasks = [
-        dask.delayed(objective.get_objective)(
-            demand_rates=demand_rates,
-            primary_survivals=primary_survivals,
-            secondary_survivals=secondary_survivals,
-            weights_single_vehicle=weights_single_vehicle,
-            weights_multiple_vehicles=weights_multiple_vehicles,
-            beta=beta,
-            R=R,
-            vehicle_station_utilisation_function=vehicle_station_utilisation_function,
-            allocation_primary=allocation[0],
-            allocation_secondary=allocation[1],
-            cache=cache,
-            **kwargs,
+    context = EvaluationContext(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=vehicle_station_utilisation_function,
+        num_workers=num_workers,
+        cache=cache,
+        batched=batched,
+        scheduler=scheduler,
+        chunk_size=chunk_size,
+        **kwargs,
+    )
+    return context.rank(
+        population,
+        starting_lambdas=starting_lambdas,
+        solver_infos=solver_infos,
+        timings=timings,
+    )
+
+
+def update_solver_statistics(solver_statistics, solver_infos):
+    """
+    Adds the solver information of a ranked population to running tallies:
+    the residual evaluations of cold and warm started solves, and the primary
+    utilisation cache hits and misses.
+    """
+    for solver_info in solver_infos:
+        if solver_info.get("evaluations"):
+            solver_statistics["warm" if solver_info["warm_start"] else "cold"].append(
+                solver_info["evaluations"]
+            )
+        if "primary_cache_hit" in solver_info:
+            if solver_info["primary_cache_hit"]:
+                solver_statistics["primary_cache_hits"] += 1
+            else:
+                solver_statistics["primary_cache_misses"] += 1
+
+
+def get_run_statistics(solver_statistics):
+    """
+    Summarises the tallies kept by `update_solver_statistics`.
+    """
+    run_statistics = {}
+    for start in ("cold", "warm"):
+        run_statistics[f"{start}_start_solves"] = len(solver_statistics[start])
+        run_statistics[f"mean_{start}_start_evaluations"] = (
+            np.mean(solver_statistics[start]) if solver_statistics[start] else np.nan
         )
-        for allocation in population
-    ]
-    objective_values = -np.array(dask.compute(*tasks, num_workers=num_workers))
-    ordering = np.argsort(objective_values)
-    return np.array(population[ordering]), -np.array(objective_values)[ordering]
+    lookups = (
+        solver_statistics["primary_cache_hits"]
+        + solver_statistics["primary_cache_misses"]
+    )
+    run_statistics["primary_cache_hits"] = solver_statistics["primary_cache_hits"]
+    run_statistics["primary_cache_misses"] = solver_statistics["primary_cache_misses"]
+    run_statistics["primary_cache_hit_rate"] = (
+        solver_statistics["primary_cache_hits"] / lookups if lookups else np.nan
+    )
+    return run_statistics
+
+
+def merge_rankings(*rankings):
+    """
+    Merges rankings, each a tuple of a ranked population, its objective
+    function values and any lists aligned with them (such as solver
+    information), in to one with a stable merge sort, so that the allocations
+    of earlier rankings come first among equal values.
+    """
+    objective_values = np.concatenate([ranking[1] for ranking in rankings])
+    ordering = np.argsort(-objective_values, kind="stable")
+    merged = []
+    for items in zip(*rankings):
+        if isinstance(items[0], np.ndarray):
+            merged.append(np.concatenate(items)[ordering])
+        else:
+            items = [item for ranking_items in items for item in ranking_items]
+            merged.append([items[index] for index in ordering])
+    return tuple(merged)
+
+
+def get_scheduler_statistics(timings, generation_wall_times):
+    """
+    Summarises the timings of the rankings of a run (see `compute`), aligned
+    with the wall times of its generations, followed by that of the final
+    ranking: the total scheduler overhead, its fraction of the run time and its
+    largest fraction of the wall time of a generation.
+    """
+    wall_times = np.array([*generation_wall_times, timings[-1][0]])
+    overheads = np.array([overhead for _, overhead in timings])
+    return {
+        "scheduler_overhead": overheads.sum(),
+        "scheduler_overhead_fraction": overheads.sum() / wall_times.sum(),
+        "max_scheduler_overhead_fraction": (overheads / wall_times).max(),
+    }
 
 
 def optimise(
@@ -289,13 +1082,148 @@ def optimise(
     num_workers,
     randomise_vehicle_numbers=False,
     progress_bar=False,
+    batched=False,
+    warm_start=False,
+    run_statistics=None,
+    cache=None,
+    scheduler=None,
+    incremental=False,
+    dtype=float,
+    vectorised_mutation=False,
+    chunk_size=None,
     **kwargs,
 ):
     """
     Optimise
+
+    The objective function values of the kept population are carried forward
+    with it: only the children of a generation are evaluated and their ranking
+    is merged with that of the kept population (see `merge_rankings`). The
+    number of evaluations skipped this way is given in `run_statistics` as
+    "skipped_evaluations".
+
+    If `warm_start` then the demand rates solved for the kept population are
+    kept and the utilisation solves of each child start from those of its
+    parent.
+
+    If `run_statistics` is a dictionary, it is updated with the number of
+    utilisation solves started from the default (cold) and from a parent's
+    demand rates (warm), the mean number of residual evaluations of each, and
+    the hit rate of the primary utilisation cache (used if a `primary_cache`
+    is passed to the vehicle station utilisation function), as given by
+    `get_run_statistics`, and the counters of the objective cache.
+
+    The objective function values are kept in `cache`, by default an unbounded
+    `objective.ObjectiveCache`. The populations are ranked by an
+    `EvaluationContext` made once per run with `scheduler`, `batched` and
+    `chunk_size`; with process based workers pass an
+    `objective.SharedObjectiveCache`, and the scenario data as made by
+    `SharedArrays` so that it is copied to shared memory once per run. The
+    scheduler overhead of the rankings is measured (see `compute`) and
+    summarised in `run_statistics` by `get_scheduler_statistics`.
+
+    If `incremental` then the `objective.IncrementalObjective` of the kept
+    population is held and every child is evaluated by updating that of its
+    parent (see `rank_population_incrementally`), in which case the objective
+    cache is only written to. This is not supported with a process based
+    scheduler.
+
+    If `dtype` is a reduced precision (np.float32) the populations are ranked
+    with it (see `objective.get_evaluation`), with their values kept in a
+    separate `objective.ObjectiveCache`, and the final population (holding the
+    kept population) is ranked again in float64 with `cache` and without any
+    `primary_cache`, so the returned best allocation is the best in float64.
+    The largest difference between the two values of the kept population is
+    given in `run_statistics` as "reduced_precision_error". This is not
+    supported with `incremental`.
+
+    If `vectorised_mutation` then the children of every generation are created
+    together by the batched counterpart of the mutation function (in
+    `BATCH_MUTATION_FUNCTIONS`) with `repeat_mutation_batch`.
+
+    The random numbers are drawn from a generator seeded by the
+    `numpy.random.SeedSequence` of `seed` (see `get_seed_sequence`), so `seed`
+    can be an int, a `numpy.random.SeedSequence` or a
+    `numpy.random.Generator`, and the global numpy random state is neither
+    used nor changed. Every child of a generation is mutated with its own
+    stream, spawned from that seed sequence and passed to the mutation
+    function as `rng`, so the results for a given seed do
+    not depend on `num_workers` or on the order the children are created in.
     """
-    cache = {}
-    np.random.seed(seed)
+    if cache is None:
+        cache = objective.ObjectiveCache()
+    if vectorised_mutation:
+        if mutation_function not in BATCH_MUTATION_FUNCTIONS:
+            raise ValueError("The mutation function has no batched counterpart.")
+        batch_mutation_function = BATCH_MUTATION_FUNCTIONS[mutation_function]
+    is_reduced_precision = np.dtype(dtype) != np.float64
+    if is_reduced_precision and incremental:
+        raise ValueError("A reduced precision dtype is not supported with incremental.")
+    if incremental and (
+        scheduler == "processes"
+        or isinstance(scheduler, concurrent.futures.ProcessPoolExecutor)
+    ):
+        # Every state holds its scenario, which would be pickled to and from
+        # the workers for every allocation.
+        raise ValueError("A process based scheduler is not supported with incremental.")
+    final_kwargs = kwargs
+    final_cache = cache
+    if is_reduced_precision:
+        # The values and primary utilisations found in reduced precision are
+        # not reused by the final ranking.
+        final_kwargs = {
+            key: value for key, value in kwargs.items() if key != "primary_cache"
+        }
+        kwargs = {**kwargs, "dtype": dtype}
+        cache = objective.ObjectiveCache()
+    solved_lambdas = {}
+    solver_statistics = {
+        "cold": [],
+        "warm": [],
+        "primary_cache_hits": 0,
+        "primary_cache_misses": 0,
+    }
+    starting_lambdas = None
+    if incremental:
+        scenario = kwargs.pop("scenario", None)
+        if scenario is None:
+            scenario = objective.Scenario(
+                demand_rates=demand_rates,
+                primary_survivals=primary_survivals,
+                secondary_survivals=secondary_survivals,
+                weights_single_vehicle=weights_single_vehicle,
+                weights_multiple_vehicles=weights_multiple_vehicles,
+                beta=beta,
+                R=R,
+            )
+        states = {}
+        parent_states = None
+    else:
+        evaluation_arguments = dict(
+            demand_rates=demand_rates,
+            primary_survivals=primary_survivals,
+            secondary_survivals=secondary_survivals,
+            weights_single_vehicle=weights_single_vehicle,
+            weights_multiple_vehicles=weights_multiple_vehicles,
+            beta=beta,
+            R=R,
+            vehicle_station_utilisation_function=vehicle_station_utilisation_function,
+            num_workers=num_workers,
+            batched=batched,
+            scheduler=scheduler,
+            chunk_size=chunk_size,
+        )
+        context = EvaluationContext(cache=cache, **evaluation_arguments, **kwargs)
+        final_context = context
+        if is_reduced_precision:
+            final_context = EvaluationContext(
+                cache=final_cache, **evaluation_arguments, **final_kwargs
+            )
+    timings = []
+    generation_wall_times = []
+    skipped_evaluations = 0
+    seed_sequence = get_seed_sequence(seed)
+    rng = np.random.default_rng(seed_sequence)
     objective_by_iteration = []
     population = create_initial_population(
         number_of_locations=number_of_locations,
@@ -305,9 +1233,13 @@ def optimise(
         max_secondary=max_secondary,
         population_size=population_size,
         randomise_vehicle_numbers=randomise_vehicle_numbers,
+        rng=rng,
     )
 
     new_pop_size = population_size - keep_size
+    kept_population = population[:0]
+    kept_values = np.zeros(0)
+    kept_states = []
 
     steps_to_reach_1 = (initial_number_of_mutatation_repetitions - 1) / cooling_rate
     repetitions = np.int64(
@@ -323,53 +1255,170 @@ def optimise(
     if progress_bar:
         repetitions = tqdm.tqdm(repetitions)
     for number_of_repetitions in repetitions:
-        ranked_population, objective_values = rank_population(
-            population=population,
-            demand_rates=demand_rates,
-            primary_survivals=primary_survivals,
-            secondary_survivals=secondary_survivals,
-            weights_single_vehicle=weights_single_vehicle,
-            weights_multiple_vehicles=weights_multiple_vehicles,
-            beta=beta,
-            R=R,
-            vehicle_station_utilisation_function=vehicle_station_utilisation_function,
-            num_workers=num_workers,
-            cache=cache,
-            **kwargs,
-        )
+        generation_start = time.perf_counter()
+        number_kept = len(kept_values)
+        child_infos = []
+        if incremental:
+            (
+                ranked_children,
+                child_values,
+                ranked_child_states,
+            ) = rank_population_incrementally(
+                population=population[number_kept:],
+                scenario=scenario,
+                vehicle_station_utilisation_function=vehicle_station_utilisation_function,
+                num_workers=num_workers,
+                parent_states=(
+                    None if parent_states is None else parent_states[number_kept:]
+                ),
+                cache=cache,
+                solver_infos=child_infos,
+                scheduler=scheduler,
+                timings=timings,
+                **kwargs,
+            )
+            (
+                ranked_population,
+                objective_values,
+                solver_infos,
+                ranked_states,
+            ) = merge_rankings(
+                (kept_population, kept_values, [{}] * number_kept, kept_states),
+                (ranked_children, child_values, child_infos, ranked_child_states),
+            )
+            kept_states = ranked_states[:keep_size]
+            states = {
+                objective.get_allocation_key(allocation): state
+                for allocation, state in zip(
+                    ranked_population[:keep_size], ranked_states[:keep_size]
+                )
+            }
+        else:
+            ranked_children, child_values = context.rank(
+                population[number_kept:],
+                starting_lambdas=(
+                    None if starting_lambdas is None else starting_lambdas[number_kept:]
+                ),
+                solver_infos=child_infos,
+                timings=timings,
+            )
+            ranked_population, objective_values, solver_infos = merge_rankings(
+                (kept_population, kept_values, [{}] * number_kept),
+                (ranked_children, child_values, child_infos),
+            )
+        skipped_evaluations += number_kept
+        update_solver_statistics(solver_statistics, solver_infos)
+        if warm_start:
+            # Only the kept allocations are parents, so only their demand
+            # rates are kept. Those kept from the last generation were not
+            # solved again and keep the demand rates they had.
+            kept_lambdas = {}
+            for allocation, solver_info in zip(
+                ranked_population[:keep_size], solver_infos[:keep_size]
+            ):
+                key = objective.get_allocation_key(allocation)
+                if "lambdas" in solver_info:
+                    kept_lambdas[key] = solver_info["lambdas"]
+                elif key in solved_lambdas:
+                    kept_lambdas[key] = solved_lambdas[key]
+            solved_lambdas = kept_lambdas
         objective_by_iteration.append(objective_values)
         kept_population = ranked_population[:keep_size]
-        new_population = []
-        for new_solution in range(new_pop_size):
-            (
-                primary_allocation_to_mutate,
-                secondary_allocation_to_mutate,
-            ) = kept_population[np.random.choice(range(keep_size))]
-            mutated_solution = repeat_mutation(
-                mutation_function=mutation_function,
+        kept_values = objective_values[:keep_size]
+        parents = list(kept_population)
+        if vectorised_mutation:
+            chosen_parents = kept_population[rng.choice(keep_size, size=new_pop_size)]
+            parents.extend(chosen_parents)
+            new_population = repeat_mutation_batch(
+                mutation_function=batch_mutation_function,
                 times_to_repeat=number_of_repetitions,
-                primary_allocation=primary_allocation_to_mutate,
-                secondary_allocation=secondary_allocation_to_mutate,
+                population=chosen_parents,
                 max_primary=max_primary,
                 max_secondary=max_secondary,
+                rng=rng,
             )
-            new_population.append(mutated_solution)
+        else:
+            new_population = []
+            for child_rng in spawn_generators(seed_sequence, new_pop_size):
+                parent = kept_population[child_rng.choice(keep_size)]
+                parents.append(parent)
+                (
+                    primary_allocation_to_mutate,
+                    secondary_allocation_to_mutate,
+                ) = parent
+                mutated_solution = repeat_mutation(
+                    mutation_function=mutation_function,
+                    times_to_repeat=number_of_repetitions,
+                    primary_allocation=primary_allocation_to_mutate,
+                    secondary_allocation=secondary_allocation_to_mutate,
+                    max_primary=max_primary,
+                    max_secondary=max_secondary,
+                    rng=child_rng,
+                )
+                new_population.append(mutated_solution)
         population = np.vstack([kept_population, np.array(new_population)])
+        if warm_start:
+            starting_lambdas = [
+                solved_lambdas.get(objective.get_allocation_key(parent))
+                for parent in parents
+            ]
+        if incremental:
+            parent_states = [
+                states.get(objective.get_allocation_key(parent)) for parent in parents
+            ]
+        generation_wall_times.append(time.perf_counter() - generation_start)
 
-    ranked_population, objective_values = rank_population(
-        population=population,
-        demand_rates=demand_rates,
-        primary_survivals=primary_survivals,
-        secondary_survivals=secondary_survivals,
-        weights_single_vehicle=weights_single_vehicle,
-        weights_multiple_vehicles=weights_multiple_vehicles,
-        beta=beta,
-        R=R,
-        vehicle_station_utilisation_function=vehicle_station_utilisation_function,
-        num_workers=num_workers,
-        cache=cache,
-        **kwargs,
+    # The kept population is evaluated again if its values are not in float64.
+    number_kept = 0 if is_reduced_precision else len(kept_values)
+    child_infos = []
+    if incremental:
+        ranked_children, child_values, _ = rank_population_incrementally(
+            population=population[number_kept:],
+            scenario=scenario,
+            vehicle_station_utilisation_function=vehicle_station_utilisation_function,
+            num_workers=num_workers,
+            parent_states=(
+                None if parent_states is None else parent_states[number_kept:]
+            ),
+            cache=cache,
+            solver_infos=child_infos,
+            scheduler=scheduler,
+            timings=timings,
+            **kwargs,
+        )
+    else:
+        ranked_children, child_values = final_context.rank(
+            population[number_kept:],
+            starting_lambdas=(
+                None if starting_lambdas is None else starting_lambdas[number_kept:]
+            ),
+            solver_infos=child_infos,
+            timings=timings,
+        )
+    ranked_population, objective_values, solver_infos = merge_rankings(
+        (population[:number_kept], kept_values[:number_kept], [{}] * number_kept),
+        (ranked_children, child_values, child_infos),
     )
+    skipped_evaluations += number_kept
+    update_solver_statistics(solver_statistics, solver_infos)
+
+    if run_statistics is not None:
+        run_statistics.update(get_run_statistics(solver_statistics))
+        run_statistics.update(get_scheduler_statistics(timings, generation_wall_times))
+        run_statistics["skipped_evaluations"] = skipped_evaluations
+        if hasattr(final_cache, "get_statistics"):
+            run_statistics.update(final_cache.get_statistics())
+        if is_reduced_precision and objective_by_iteration:
+            final_values = {
+                objective.get_allocation_key(allocation): value
+                for allocation, value in zip(ranked_population, objective_values)
+            }
+            run_statistics["reduced_precision_error"] = max(
+                abs(final_values[objective.get_allocation_key(allocation)] - value)
+                for allocation, value in zip(
+                    kept_population, objective_by_iteration[-1][:keep_size]
+                )
+            )
 
     best_primary_population, best_secondary_population = ranked_population[0]
 
@@ -1,9 +1,54 @@
+import multiprocessing
 import numpy as np
+import pytest
 import types
 import objective
 import utilisation
 
 
+def get_beta_with_loops(travel_times):
+    """
+    The original list comprehension construction of beta, used as a reference.
+    """
+    ambulance_locations = range(travel_times.shape[0])
+    pickup_locations = range(travel_times.shape[1])
+    return np.array(
+        [
+            [
+                [
+                    0 if a2 == a1 else float(travel_times[a1][p] <= travel_times[a2][p])
+                    for a2 in ambulance_locations
+                ]
+                for a1 in ambulance_locations
+            ]
+            for p in pickup_locations
+        ]
+    )
+
+
+def get_R_with_loops(primary_vehicle_travel_times, secondary_vehicle_travel_times):
+    """
+    The original list comprehension construction of R, used as a reference.
+    """
+    ambulance_locations = range(primary_vehicle_travel_times.shape[0])
+    pickup_locations = range(primary_vehicle_travel_times.shape[1])
+    return np.array(
+        [
+            [
+                [
+                    float(
+                        primary_vehicle_travel_times[a1][p]
+                        <= secondary_vehicle_travel_times[a2][p]
+                    )
+                    for a2 in ambulance_locations
+                ]
+                for a1 in ambulance_locations
+            ]
+            for p in pickup_locations
+        ]
+    )
+
+
 def test_get_beta():
     travel_times = np.array(
         [[0, 5, 10, 15, 20], [5, 0, 5, 10, 15], [10, 5, 0, 5, 10], [15, 10, 5, 0, 5]]
@@ -500,6 +545,107 @@ def test_get_objective():
     assert round(g, 4) == demand_rates.sum()
 
 
+def test_get_contributing_classes():
+    assert list(objective.get_contributing_classes(np.array([0, 0, 1]))) == [2]
+    assert list(objective.get_contributing_classes(np.array([1, 1, 0]))) == [0, 1]
+    assert list(objective.get_contributing_classes([0.5, 0, 2])) == [0, 2]
+    assert list(objective.get_contributing_classes(np.zeros(3))) == []
+
+
+def test_get_objective_with_zero_weight_classes():
+    """
+    Tests that skipping the classes with a zero weight gives the same value as
+    computing psi and psi tilde for every class.
+    """
+    primary_travel_times = np.array(
+        [[0, 5, 10, 15, 20], [5, 0, 5, 10, 15], [10, 5, 0, 5, 10], [15, 10, 5, 0, 5]]
+    )
+    secondary_travel_times = 0.7 * primary_travel_times
+    beta = objective.get_beta(primary_travel_times)
+    R = objective.get_R(primary_travel_times, secondary_travel_times)
+    survival_functions = (
+        lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
+        lambda t: np.heaviside(15 - t, 1),
+        lambda t: np.heaviside(60 - t, 1),
+    )
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_travel_times, secondary_travel_times
+    )
+    given_utilisations_primary = np.array([0.2, 0.5, 0.7, 1.0])
+    given_utilisations_secondary = np.array([0.6, 0.6, 0.2, 0.2])
+    demand_rates = np.array(((2, 2, 3, 3, 7), (2, 0, 1, 2, 4), (1, 1, 1, 1, 1))) * 10
+    allocation_primary = np.array([1, 0, 0, 1])
+    allocation_secondary = np.array([0, 2, 1, 1])
+
+    primary_is_not_busy = objective.get_is_not_busy_vector(
+        given_utilisations_primary, allocation_primary
+    )
+    secondary_is_not_busy = objective.get_is_not_busy_vector(
+        given_utilisations_secondary, allocation_secondary
+    )
+    all_closer_busy_primary = objective.get_all_same_closer_busy_vector(
+        given_utilisations_primary, allocation_primary, beta
+    )
+    all_closer_busy_secondary = objective.get_all_same_closer_busy_vector(
+        given_utilisations_secondary, allocation_secondary, beta
+    )
+    psi = objective.get_psi(
+        primary_survivals, primary_is_not_busy, all_closer_busy_primary
+    )
+    psi_tilde = objective.get_psi_tilde(
+        primary_survivals,
+        secondary_survivals,
+        primary_is_not_busy,
+        secondary_is_not_busy,
+        all_closer_busy_primary,
+        all_closer_busy_secondary,
+        objective.get_all_secondary_closer_busy_vector(
+            given_utilisations_secondary, allocation_secondary, R
+        ),
+        objective.get_all_primary_closer_busy_vector(
+            given_utilisations_primary, allocation_primary, R
+        ),
+    )
+
+    for weights_single_vehicle, weights_multiple_vehicles in (
+        (np.array([0, 0, 1]), np.array([1, 1, 0])),
+        (np.array([1, 2, 3]), np.array([3, 2, 1])),
+        (np.array([0, 0.5, 0]), np.array([0, 0, 0])),
+        (np.array([0, 0, 0]), np.array([0, 0, 2])),
+    ):
+        expected_g = (
+            ((psi.T * weights_single_vehicle) * demand_rates.T).sum(axis=2)
+            + ((psi_tilde.T * weights_multiple_vehicles) * demand_rates.T).sum(axis=2)
+        ).sum()
+        arguments = dict(
+            demand_rates=demand_rates,
+            primary_survivals=primary_survivals,
+            secondary_survivals=secondary_survivals,
+            weights_single_vehicle=weights_single_vehicle,
+            weights_multiple_vehicles=weights_multiple_vehicles,
+            beta=beta,
+            R=R,
+        )
+        g = objective.get_objective(
+            **arguments,
+            vehicle_station_utilisation_function=utilisation.given_utilisations,
+            allocation_primary=allocation_primary,
+            allocation_secondary=allocation_secondary,
+            given_utilisations_primary=given_utilisations_primary,
+            given_utilisations_secondary=given_utilisations_secondary,
+        )
+        assert np.isclose(g, expected_g)
+        g = objective.get_objective(
+            scenario=objective.Scenario(**arguments),
+            vehicle_station_utilisation_function=utilisation.given_utilisations,
+            allocation_primary=allocation_primary,
+            allocation_secondary=allocation_secondary,
+            given_utilisations_primary=given_utilisations_primary,
+            given_utilisations_secondary=given_utilisations_secondary,
+        )
+        assert np.isclose(g, expected_g)
+
+
 def test_caching_of_objective():
     """
     This confirms:
@@ -609,3 +755,676 @@ def test_caching_of_objective():
         ("[0 0 0 0]", "[0 0 0 0]"),
         ("[1 0 0 1]", "[0 2 1 1]"),
     }
+
+
+def test_log_engine_matches_power_engine():
+    """
+    This confirms the log-space engine gives the same "all closer busy"
+    probabilities as the power engine, including for utilisations that are
+    exactly 0 or negative and for stations without vehicles.
+    """
+    travel_times = np.array(
+        [[0, 5, 10, 15, 20], [5, 0, 5, 10, 15], [10, 5, 0, 5, 10], [15, 10, 5, 0, 5]]
+    )
+    beta = objective.get_beta(travel_times)
+    R = objective.get_R(travel_times, travel_times * 0.7)
+    allocations = (
+        np.array([0, 0, 0, 0]),
+        np.array([0, 1, 1, 1]),
+        np.array([1, 2, 3, 4]),
+        np.array([3, 0, 1, 2]),
+    )
+    utilisations = (
+        np.array([0.2, 0.5, 0.7, 1.0]),
+        np.array([0.0, 0.5, 0.0, 0.9]),
+        np.array([0.3, -0.2, 0.7, -0.5]),
+    )
+    for power_function, log_function, preference in (
+        (
+            objective.get_all_same_closer_busy_vector,
+            objective.get_all_same_closer_busy_vector_log,
+            beta,
+        ),
+        (
+            objective.get_all_primary_closer_busy_vector,
+            objective.get_all_primary_closer_busy_vector_log,
+            R,
+        ),
+        (
+            objective.get_all_secondary_closer_busy_vector,
+            objective.get_all_secondary_closer_busy_vector_log,
+            R,
+        ),
+    ):
+        for allocation in allocations:
+            for utilisation_vector in utilisations:
+                expected = power_function(utilisation_vector, allocation, preference)
+                busy = log_function(utilisation_vector, allocation, preference)
+                assert busy.shape == expected.shape
+                assert np.allclose(busy, expected, rtol=0, atol=1e-12)
+
+
+def test_get_objective_with_log_engine():
+    primary_travel_times = np.array(
+        [[0, 5, 10, 15, 20], [5, 0, 5, 10, 15], [10, 5, 0, 5, 10], [15, 10, 5, 0, 5]]
+    )
+    secondary_travel_times = 0.7 * primary_travel_times
+    beta = objective.get_beta(primary_travel_times)
+    R = objective.get_R(primary_travel_times, secondary_travel_times)
+    survival_functions = (
+        lambda t: np.ones(t.shape),
+        lambda t: np.ones(t.shape),
+        lambda t: np.ones(t.shape),
+    )
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_travel_times, secondary_travel_times
+    )
+    demand_rates = np.array(((2, 2, 3, 3, 7), (2, 0, 1, 2, 4), (1, 1, 1, 1, 1))) * 10
+
+    g = objective.get_objective(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=np.array([0, 0, 1]),
+        weights_multiple_vehicles=np.array([1, 1, 0]),
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.given_utilisations,
+        allocation_primary=np.array([1, 0, 0, 1]),
+        allocation_secondary=np.array([0, 2, 1, 1]),
+        closer_busy_engine="log",
+        given_utilisations_primary=np.array([0.2, 0.5, 0.7, 1.0]),
+        given_utilisations_secondary=np.array([0.6, 0.6, 0.2, 0.2]),
+    )
+    assert round(g, 4) == 295.1552
+
+
+def test_get_objective_batch():
+    primary_travel_times = np.array(
+        [[0, 5, 10, 15, 20], [5, 0, 5, 10, 15], [10, 5, 0, 5, 10], [15, 10, 5, 0, 5]]
+    )
+    secondary_travel_times = 0.7 * primary_travel_times
+    beta = objective.get_beta(primary_travel_times)
+    R = objective.get_R(primary_travel_times, secondary_travel_times)
+    survival_functions = (
+        lambda t: np.ones(t.shape),
+        lambda t: np.heaviside(4 - t, 1),
+        lambda t: np.heaviside(14 - t, 1),
+    )
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_travel_times, secondary_travel_times
+    )
+    given_utilisations_primary = np.array([0.2, 0.5, 0.7, 1.0])
+    given_utilisations_secondary = np.array([0.6, 0.6, 0.2, 0.2])
+    demand_rates = np.array(((2, 2, 3, 3, 7), (2, 0, 1, 2, 4), (1, 1, 1, 1, 1))) * 10
+    population = np.array(
+        [
+            [[1, 0, 0, 1], [0, 2, 1, 1]],
+            [[0, 0, 0, 0], [0, 0, 0, 0]],
+            [[1000, 1000, 1000, 1000], [1000, 1000, 1000, 1000]],
+            [[2, 1, 0, 3], [0, 0, 0, 0]],
+            [[0, 0, 0, 0], [3, 1, 0, 2]],
+        ]
+    )
+    objective_values = objective.get_objective_batch(
+        population=population,
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=np.array([0, 0.5, 1]),
+        weights_multiple_vehicles=np.array([1, 0.5, 0]),
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.given_utilisations,
+        given_utilisations_primary=given_utilisations_primary,
+        given_utilisations_secondary=given_utilisations_secondary,
+    )
+    expected_objective_values = [
+        objective.get_objective(
+            demand_rates=demand_rates,
+            primary_survivals=primary_survivals,
+            secondary_survivals=secondary_survivals,
+            weights_single_vehicle=np.array([0, 0.5, 1]),
+            weights_multiple_vehicles=np.array([1, 0.5, 0]),
+            beta=beta,
+            R=R,
+            vehicle_station_utilisation_function=utilisation.given_utilisations,
+            allocation_primary=allocation_primary,
+            allocation_secondary=allocation_secondary,
+            given_utilisations_primary=given_utilisations_primary,
+            given_utilisations_secondary=given_utilisations_secondary,
+        )
+        for allocation_primary, allocation_secondary in population
+    ]
+    assert objective_values.shape == (5,)
+    assert np.allclose(objective_values, expected_objective_values)
+
+
+def test_get_marginal_gains():
+    primary_travel_times = np.array(
+        [[0, 5, 10, 15, 20], [5, 0, 5, 10, 15], [10, 5, 0, 5, 10], [15, 10, 5, 0, 5]]
+    )
+    secondary_travel_times = 0.7 * primary_travel_times
+    survival_functions = (
+        lambda t: np.ones(t.shape),
+        lambda t: np.heaviside(4 - t, 1),
+        lambda t: np.heaviside(14 - t, 1),
+    )
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_travel_times, secondary_travel_times
+    )
+    data = dict(
+        demand_rates=np.array(((2, 2, 3, 3, 7), (2, 0, 1, 2, 4), (1, 1, 1, 1, 1)))
+        / 100,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=np.array([0, 0.5, 1]),
+        weights_multiple_vehicles=np.array([1, 0.5, 0]),
+        beta=objective.get_beta(primary_travel_times),
+        R=objective.get_R(primary_travel_times, secondary_travel_times),
+        vehicle_station_utilisation_function=utilisation.solve_utilisations,
+        service_rate_primary=0.1,
+        service_rate_secondary=0.1,
+    )
+    allocation_primary = np.array([2, 0, 1, 3])
+    allocation_secondary = np.array([0, 1, 3, 0])
+    marginal_gains = objective.get_marginal_gains(
+        allocation_primary=allocation_primary,
+        allocation_secondary=allocation_secondary,
+        max_primary=3,
+        max_secondary=3,
+        **data,
+    )
+    assert np.isclose(
+        marginal_gains["objective"],
+        objective.get_objective(
+            allocation_primary=allocation_primary,
+            allocation_secondary=allocation_secondary,
+            **data,
+        ),
+    )
+    assert np.array_equal(
+        np.isnan(marginal_gains["add_primary"]), [False, False, False, True]
+    )
+    assert np.array_equal(
+        np.isnan(marginal_gains["remove_primary"]), [False, True, False, False]
+    )
+    assert np.array_equal(
+        np.isnan(marginal_gains["add_secondary"]), [False, False, True, False]
+    )
+    assert np.array_equal(
+        np.isnan(marginal_gains["remove_secondary"]), [True, False, False, True]
+    )
+    for vehicle_type, name in enumerate(("primary", "secondary")):
+        for change in (1, -1):
+            gains = marginal_gains[("add_" if change == 1 else "remove_") + name]
+            for station in np.flatnonzero(~np.isnan(gains)):
+                allocation = np.array([allocation_primary, allocation_secondary])
+                allocation[vehicle_type, station] += change
+                expected_gain = (
+                    objective.get_objective(
+                        allocation_primary=allocation[0],
+                        allocation_secondary=allocation[1],
+                        **data,
+                    )
+                    - marginal_gains["objective"]
+                )
+                assert np.isclose(gains[station], expected_gain, atol=1e-6)
+
+
+def test_caching_of_objective_batch():
+    """
+    This confirms the batched objective reads from and writes to the same
+    cache as `get_objective`.
+    """
+    cache = {("[1000 1000 1000 1000]", "[1000 1000 1000 1000]"): -10}
+
+    primary_travel_times = np.array(
+        [[0, 5, 10, 15, 20], [5, 0, 5, 10, 15], [10, 5, 0, 5, 10], [15, 10, 5, 0, 5]]
+    )
+    secondary_travel_times = 0.7 * primary_travel_times
+    beta = objective.get_beta(primary_travel_times)
+    R = objective.get_R(primary_travel_times, secondary_travel_times)
+    survival_functions = (
+        lambda t: np.ones(t.shape),
+        lambda t: np.ones(t.shape),
+        lambda t: np.ones(t.shape),
+    )
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_travel_times, secondary_travel_times
+    )
+    demand_rates = np.array(((2, 2, 3, 3, 7), (2, 0, 1, 2, 4), (1, 1, 1, 1, 1))) * 10
+    population = np.array(
+        [
+            [[1000, 1000, 1000, 1000], [1000, 1000, 1000, 1000]],
+            [[1, 0, 0, 1], [0, 2, 1, 1]],
+        ]
+    )
+
+    objective_values = objective.get_objective_batch(
+        population=population,
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=np.array([0, 0, 1]),
+        weights_multiple_vehicles=np.array([1, 1, 0]),
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.given_utilisations,
+        given_utilisations_primary=np.array([0.2, 0.5, 0.7, 1.0]),
+        given_utilisations_secondary=np.array([0.6, 0.6, 0.2, 0.2]),
+        cache=cache,
+    )
+    assert objective_values[0] == -10
+    assert round(objective_values[1], 4) == 295.1552
+    assert round(cache[("[1 0 0 1]", "[0 2 1 1]")], 4) == 295.1552
+
+
+def test_objective_cache():
+    cache = objective.ObjectiveCache(maximum_size=2)
+    keys = [
+        cache.get_key(np.array([1, 0, 0, 1]), np.array([0, 2, 1, 1])),
+        cache.get_key(np.array([1, 0, 0, 1]), np.array([0, 2, 1, 2])),
+        cache.get_key(np.array([2, 0, 0, 1]), np.array([0, 2, 1, 1])),
+    ]
+    assert len(set(keys)) == 3
+    assert keys[0] == bytes([1, 0, 0, 1, 0, 2, 1, 1])
+
+    cache[keys[0]] = 1.0
+    cache[keys[1]] = 2.0
+    assert cache.get(keys[0]) == 1.0
+    cache[keys[2]] = 3.0
+
+    assert len(cache) == 2
+    assert keys[1] not in cache
+    assert cache.get(keys[1]) is None
+    assert cache[keys[2]] == 3.0
+    assert cache.get_statistics() == {
+        "objective_cache_size": 2,
+        "objective_cache_hits": 1,
+        "objective_cache_misses": 1,
+        "objective_cache_evictions": 1,
+    }
+
+
+def test_shared_objective_cache():
+    with objective.ObjectiveCacheManager() as manager:
+        cache = objective.SharedObjectiveCache(manager, maximum_size=2)
+        key = cache.get_key(np.array([1, 0, 0, 1]), np.array([0, 2, 1, 1]))
+        assert cache.get(key) is None
+        cache[key] = 1.0
+
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            assert pool.apply(cache.get, (key,)) == 1.0
+            pool.apply(cache.__setitem__, (b"other", 2.0))
+
+        assert cache.get(b"other") == 2.0
+        assert len(cache) == 2
+        assert cache.get_many([key, b"missing", b"other"]) == [1.0, None, 2.0]
+
+        # The least recently used value is evicted.
+        cache[b"third"] = 3.0
+        assert key not in cache
+        assert cache.get_many([b"other", b"third"]) == [2.0, 3.0]
+        assert cache.get_statistics() == {
+            "objective_cache_size": 2,
+            "objective_cache_hits": 6,
+            "objective_cache_misses": 2,
+            "objective_cache_evictions": 1,
+        }
+
+
+def test_get_objective_with_objective_cache():
+    """
+    This confirms `get_objective` and `get_objective_batch` read from and write
+    to an `ObjectiveCache`.
+    """
+    primary_travel_times = np.array(
+        [[0, 5, 10, 15, 20], [5, 0, 5, 10, 15], [10, 5, 0, 5, 10], [15, 10, 5, 0, 5]]
+    )
+    secondary_travel_times = 0.7 * primary_travel_times
+    beta = objective.get_beta(primary_travel_times)
+    R = objective.get_R(primary_travel_times, secondary_travel_times)
+    survival_functions = (
+        lambda t: np.ones(t.shape),
+        lambda t: np.ones(t.shape),
+        lambda t: np.ones(t.shape),
+    )
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_travel_times, secondary_travel_times
+    )
+    demand_rates = np.array(((2, 2, 3, 3, 7), (2, 0, 1, 2, 4), (1, 1, 1, 1, 1))) * 10
+    allocation_primary = np.array([1, 0, 0, 1])
+    allocation_secondary = np.array([0, 2, 1, 1])
+    cache = objective.ObjectiveCache()
+    arguments = dict(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=np.array([0, 0, 1]),
+        weights_multiple_vehicles=np.array([1, 1, 0]),
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.given_utilisations,
+        given_utilisations_primary=np.array([0.2, 0.5, 0.7, 1.0]),
+        given_utilisations_secondary=np.array([0.6, 0.6, 0.2, 0.2]),
+        cache=cache,
+    )
+
+    g = objective.get_objective(
+        allocation_primary=allocation_primary,
+        allocation_secondary=allocation_secondary,
+        **arguments,
+    )
+    assert round(g, 4) == 295.1552
+    key = cache.get_key(allocation_primary, allocation_secondary)
+    assert cache[key] == g
+
+    cache[key] = -10
+    objective_values = objective.get_objective_batch(
+        population=np.array(
+            [
+                [allocation_primary, allocation_secondary],
+                [allocation_secondary, allocation_primary],
+            ]
+        ),
+        **arguments,
+    )
+    assert objective_values[0] == -10
+    assert len(cache) == 2
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+
+def test_objective_archive(tmp_path):
+    """
+    This confirms values written to an `ObjectiveArchive` are read back by a
+    later archive of the same scenario only.
+    """
+    primary_travel_times = np.array(
+        [[0, 5, 10, 15, 20], [5, 0, 5, 10, 15], [10, 5, 0, 5, 10], [15, 10, 5, 0, 5]]
+    )
+    secondary_travel_times = 0.7 * primary_travel_times
+    beta = objective.get_beta(primary_travel_times)
+    R = objective.get_R(primary_travel_times, secondary_travel_times)
+    survival_functions = (
+        lambda t: np.ones(t.shape),
+        lambda t: np.ones(t.shape),
+        lambda t: np.ones(t.shape),
+    )
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_travel_times, secondary_travel_times
+    )
+    demand_rates = np.array(((2, 2, 3, 3, 7), (2, 0, 1, 2, 4), (1, 1, 1, 1, 1))) * 10
+    population = np.array(
+        [
+            [[1, 0, 0, 1], [0, 2, 1, 1]],
+            [[0, 2, 1, 1], [1, 0, 0, 1]],
+            [[1, 1, 1, 1], [1, 1, 1, 1]],
+        ]
+    )
+    arguments = dict(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=np.array([0, 0, 1]),
+        weights_multiple_vehicles=np.array([1, 1, 0]),
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.given_utilisations,
+        given_utilisations_primary=np.array([0.2, 0.5, 0.7, 1.0]),
+        given_utilisations_secondary=np.array([0.6, 0.6, 0.2, 0.2]),
+    )
+    scenario = objective.get_scenario_fingerprint(primary_travel_times, demand_rates)
+    assert scenario == objective.get_scenario_fingerprint(
+        primary_travel_times, demand_rates
+    )
+    other_scenario = objective.get_scenario_fingerprint(
+        primary_travel_times, demand_rates * 2
+    )
+    assert scenario != other_scenario
+
+    path = tmp_path / "objectives.sqlite"
+    with objective.ObjectiveArchive(path, scenario, batch_size=2) as archive:
+        objective_values = objective.get_objective_batch(
+            population=population[:2], cache=archive, **arguments
+        )
+        g = objective.get_objective(
+            allocation_primary=population[2, 0],
+            allocation_secondary=population[2, 1],
+            cache=archive,
+            **arguments,
+        )
+        assert len(archive.pending) == 1
+        assert len(archive) == 3
+        assert archive.misses == 3
+    assert round(objective_values[0], 4) == 295.1552
+
+    with objective.ObjectiveArchive(path, scenario) as archive:
+        assert archive.get_many(
+            [archive.get_key(*allocation) for allocation in population]
+        ) == [*objective_values, g]
+        assert archive.hits == 3
+        key = archive.get_key(*population[0])
+        archive[key] = -10
+        assert archive[key] == -10
+        assert (
+            objective.get_objective_batch(
+                population=population, cache=archive, **arguments
+            )[0]
+            == -10
+        )
+
+    with objective.ObjectiveArchive(path, other_scenario) as archive:
+        assert len(archive) == 0
+        assert key not in archive
+
+
+def test_get_neighbour_index():
+    primary_travel_times = np.array(
+        [[0, 5, 10, 15, 20], [5, 0, 5, 10, 15], [10, 5, 0, 5, 10], [15, 10, 5, 0, 5]]
+    )
+    neighbour_index = objective.get_neighbour_index(
+        primary_travel_times, primary_travel_times, primary_travel_times * 0.7
+    )
+    expected_order = np.array(
+        [[0, 1, 2, 3], [1, 0, 2, 3], [2, 1, 3, 0], [3, 2, 1, 0], [3, 2, 1, 0]]
+    )
+    assert np.array_equal(neighbour_index["order"], expected_order)
+    assert np.array_equal(neighbour_index["primary_order"], expected_order)
+    assert np.array_equal(neighbour_index["secondary_order"], expected_order)
+    assert np.array_equal(
+        neighbour_index["closer_counts"],
+        np.array(
+            [[1, 2, 3, 4], [3, 1, 3, 4], [4, 3, 1, 3], [4, 3, 2, 1], [4, 3, 2, 1]]
+        ),
+    )
+    assert np.array_equal(
+        neighbour_index["primary_closer_counts"],
+        np.array(
+            [[1, 1, 2, 3], [1, 1, 1, 3], [3, 1, 1, 1], [3, 2, 1, 1], [2, 2, 1, 0]]
+        ),
+    )
+    assert np.array_equal(
+        neighbour_index["secondary_closer_counts"],
+        np.array(
+            [[0, 2, 3, 4], [3, 0, 3, 4], [4, 3, 0, 3], [4, 3, 2, 0], [4, 4, 2, 1]]
+        ),
+    )
+
+
+def test_sorted_engine_matches_power_engine():
+    """
+    This confirms the sorted neighbour engine gives the same "all closer busy"
+    probabilities as the power engine on random travel times with many ties.
+    """
+    np.random.seed(0)
+    for _ in range(20):
+        number_of_stations = np.random.randint(2, 9)
+        number_of_pickups = np.random.randint(1, 7)
+        travel_times = np.random.randint(0, 5, (number_of_stations, number_of_pickups))
+        secondary_travel_times = travel_times * np.random.choice([0.5, 0.7, 1.0])
+        beta = objective.get_beta(travel_times)
+        R = objective.get_R(travel_times, secondary_travel_times)
+        neighbour_index = objective.get_neighbour_index(
+            travel_times, travel_times, secondary_travel_times
+        )
+        utilisations = np.random.random(number_of_stations)
+        utilisations[np.random.random(number_of_stations) < 0.2] = 0
+        allocation = np.random.randint(0, 3, number_of_stations)
+        for power_function, sorted_function, preference in zip(
+            objective.CLOSER_BUSY_ENGINES["power"],
+            objective.CLOSER_BUSY_ENGINES["sorted"],
+            (beta, R, R),
+        ):
+            assert np.allclose(
+                sorted_function(utilisations, allocation, neighbour_index),
+                power_function(utilisations, allocation, preference),
+                rtol=0,
+                atol=1e-12,
+            )
+
+
+def test_get_allocation_key():
+    allocation = np.array([0, 3, 1, 255])
+    assert objective.get_allocation_key(allocation) == bytes([0, 3, 1, 255])
+    assert objective.get_allocation_key(allocation) == objective.get_allocation_key(
+        allocation.astype(float)
+    )
+    assert objective.get_allocation_key(allocation) != objective.get_allocation_key(
+        np.array([0, 3, 255, 1])
+    )
+    assert (
+        objective.get_allocation_key(np.array([0, 256]))
+        == np.array([0, 256], dtype=np.int64).tobytes()
+    )
+
+
+def test_get_beta_and_R_match_loops():
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times)
+    assert np.array_equal(beta, get_beta_with_loops(raw_travel_times))
+    assert np.array_equal(
+        R, get_R_with_loops(raw_travel_times / 0.75, raw_travel_times / 1.215)
+    )
+
+
+def test_get_beta_and_R_with_cache_directory(tmp_path):
+    """
+    This confirms:
+
+    - beta and R are written to the cache directory.
+    - They are read back when the function is called again. This is done by
+      replacing the cached file with nonsensical values.
+    - Different speed factors use a different file.
+    """
+    travel_times = np.array(
+        [[0, 5, 10, 15, 20], [5, 0, 5, 10, 15], [10, 5, 0, 5, 10], [15, 10, 5, 0, 5]]
+    )
+    beta, R = objective.get_beta_and_R(
+        travel_times,
+        primary_vehicle_speed_factor=1,
+        secondary_vehicle_speed_factor=1 / 0.7,
+        cache_directory=tmp_path,
+    )
+    assert np.array_equal(beta, objective.get_beta(travel_times))
+    assert np.allclose(R, objective.get_R(travel_times, travel_times * 0.7))
+    (cached_file,) = tmp_path.iterdir()
+    assert cached_file.suffix == ".npz"
+
+    np.savez(cached_file, beta=-np.ones(1), R=-np.ones(1))
+    beta, R = objective.get_beta_and_R(
+        travel_times,
+        primary_vehicle_speed_factor=1,
+        secondary_vehicle_speed_factor=1 / 0.7,
+        cache_directory=tmp_path,
+    )
+    assert np.array_equal(beta, -np.ones(1))
+    assert np.array_equal(R, -np.ones(1))
+
+    objective.get_beta_and_R(travel_times, cache_directory=tmp_path)
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+@pytest.mark.parametrize("number_of_stations", [67, 200])
+@pytest.mark.parametrize(
+    "get_beta, get_R",
+    [
+        (get_beta_with_loops, get_R_with_loops),
+        (objective.get_beta, objective.get_R),
+    ],
+    ids=["loops", "broadcast"],
+)
+def test_benchmark_beta_and_R_construction(
+    benchmark, number_of_stations, get_beta, get_R
+):
+    """
+    Benchmarks the construction of beta and R. The number of pickup locations
+    is kept at 26 (a tenth of the Jakarta data); the cost of both constructions
+    is linear in it. Larger networks are left out as the loop construction is
+    run even with the benchmarks disabled, and takes seconds at 500 stations.
+    """
+    np.random.seed(0)
+    travel_times = np.random.randint(0, 60, (number_of_stations, 26))
+
+    def construct():
+        return get_beta(travel_times), get_R(travel_times / 0.75, travel_times / 1.215)
+
+    beta, R = benchmark(construct)
+    assert beta.shape == (26, number_of_stations, number_of_stations)
+    assert R.shape == (26, number_of_stations, number_of_stations)
+
+
+def test_compact_beta_and_R():
+    travel_times = np.array(
+        [[0, 5, 10, 15, 20], [5, 0, 5, 10, 15], [10, 5, 0, 5, 10], [15, 10, 5, 0, 5]]
+    )
+    beta = objective.get_beta(travel_times)
+    R = objective.get_R(travel_times, travel_times * 0.7)
+    compact_beta = objective.get_beta(travel_times, dtype=bool)
+    compact_R = objective.get_R(travel_times, travel_times * 0.7, dtype=bool)
+
+    assert compact_beta.dtype == bool
+    assert compact_R.dtype == bool
+    assert compact_beta.nbytes * 8 == beta.nbytes
+    assert np.array_equal(compact_beta, beta)
+    assert np.array_equal(compact_R, R)
+
+    packed_beta = objective.pack_preferences(beta)
+    assert packed_beta["shape"] == (5, 4, 4)
+    assert packed_beta["bits"].shape == (5, 4, 1)
+    assert np.array_equal(objective.get_preference_array(packed_beta), beta)
+    assert objective.get_preference_array(compact_beta).dtype == np.uint8
+    assert objective.get_preference_array(beta) is beta
+
+
+def test_closer_busy_vectors_with_compact_beta_and_R():
+    """
+    This confirms the "all closer busy" functions of the power and log engines
+    give the same values with beta and R stored as floats, booleans or bits.
+    """
+    travel_times = np.array(
+        [[0, 5, 10, 15, 20], [5, 0, 5, 10, 15], [10, 5, 0, 5, 10], [15, 10, 5, 0, 5]]
+    )
+    beta = objective.get_beta(travel_times)
+    R = objective.get_R(travel_times, travel_times * 0.7)
+    utilisations = np.array([0.2, 0.5, 0.0, 1.0])
+    allocation = np.array([1, 2, 3, 0])
+    for closer_busy_engine in ("power", "log"):
+        for function, preferences in zip(
+            objective.CLOSER_BUSY_ENGINES[closer_busy_engine], (beta, R, R)
+        ):
+            expected = function(utilisations, allocation, preferences)
+            for compact_preferences in (
+                preferences.astype(bool),
+                preferences.astype(np.uint8),
+                objective.pack_preferences(preferences),
+            ):
+                assert np.allclose(
+                    function(utilisations, allocation, compact_preferences),
+                    expected,
+                    rtol=0,
+                    atol=1e-12,
+                )
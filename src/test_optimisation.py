@@ -1,7 +1,10 @@
+import concurrent.futures
 import objective
 import optimisation
 import utilisation
 import numpy as np
+import pickle
+import pytest
 import random
 
 
@@ -265,6 +268,162 @@ def test_repeat_mutation():
         assert np.allclose(allocations[repeat], allocations_repeat[repeat])
 
 
+def test_move_vehicle_of_same_type_batch():
+    population = np.array(
+        [[[0, 1, 5, 1], [3, 9, 0, 0]]] * 500 + [[[0, 0, 0, 2], [0, 0, 0, 0]]]
+    )
+    rows = np.ones(len(population), dtype=bool)
+    rows[:100] = False
+
+    np.random.seed(1)
+    resulting_population = optimisation.move_vehicle_of_same_type_batch(
+        population=population, vehicle_type=0, max_allocation=5, rows=rows
+    )
+
+    assert resulting_population.dtype.type is np.int64
+    assert np.array_equal(resulting_population[:100], population[:100])
+    assert np.array_equal(resulting_population[:, 1], population[:, 1])
+    changes = resulting_population[100:500, 0] - population[100:500, 0]
+    assert np.all(np.abs(changes).sum(axis=1) == 2)
+    assert np.all(changes.sum(axis=1) == 0)
+    # Vehicles only leave locations that have one and never join the location
+    # at the maximum, and every possible move is made.
+    assert set(map(tuple, changes)) == {
+        (0, -1, 0, 1),
+        (0, 1, 0, -1),
+        (0, 0, -1, 1),
+        (1, -1, 0, 0),
+        (1, 0, -1, 0),
+        (1, 0, 0, -1),
+        (0, 1, -1, 0),
+    }
+    assert resulting_population[500, 0].sum() == 2
+
+
+def test_switch_vehicles_batch():
+    population = np.array(
+        [[[0, 1, 5, 1], [3, 9, 0, 0]]] * 200 + [[[0, 0, 0, 0], [5, 5, 5, 5]]]
+    )
+    rows = np.ones(len(population), dtype=bool)
+
+    np.random.seed(1)
+    resulting_population = optimisation.switch_primary_to_secondary_batch(
+        population=population, max_allocation=5, rows=rows
+    )
+    assert np.all(resulting_population[:200, 0].sum(axis=1) == 6)
+    assert np.all(resulting_population[:200, 1].sum(axis=1) == 15)
+    assert np.all(resulting_population[:200, 1, [0, 2, 3]] <= 5)
+    assert np.all(resulting_population[:200, 1, 1] == 9)
+    assert np.all(resulting_population >= 0)
+    # Without a primary vehicle or room for the secondary vehicles nothing is
+    # switched.
+    assert np.array_equal(resulting_population[200], population[200])
+
+    resulting_population = optimisation.switch_secondary_to_primary_batch(
+        population=population, max_allocation=5, rows=rows
+    )
+    assert np.all(
+        resulting_population[:, 0].sum(axis=1) == population[:, 0].sum(axis=1) + 1
+    )
+    assert np.all(
+        resulting_population[:, 1].sum(axis=1) == population[:, 1].sum(axis=1) - 3
+    )
+    assert np.all(resulting_population[:200, 0, 2] == 5)
+    assert np.all(resulting_population >= 0)
+
+
+def test_repeat_mutation_batch():
+    np.random.seed(0)
+    population = optimisation.create_initial_population(
+        number_of_locations=67,
+        number_of_primary_vehicles=20,
+        number_of_secondary_vehicles=21,
+        max_primary=4,
+        max_secondary=4,
+        population_size=200,
+    )
+    times_to_repeat = np.arange(200) % 4
+
+    for mutation_function in (
+        optimisation.mutate_full_batch,
+        optimisation.mutate_retain_vehicle_numbers_batch,
+    ):
+        mutated_population = optimisation.repeat_mutation_batch(
+            mutation_function=mutation_function,
+            times_to_repeat=times_to_repeat,
+            population=population,
+            max_primary=4,
+            max_secondary=4,
+        )
+        assert mutated_population.shape == population.shape
+        assert mutated_population.dtype.type is np.int64
+        assert np.all(mutated_population >= 0)
+        assert np.all(mutated_population <= 4)
+        vehicle_numbers = mutated_population.sum(axis=2)
+        assert np.all(vehicle_numbers[:, 0] * 3 + vehicle_numbers[:, 1] == 81)
+        if mutation_function is optimisation.mutate_retain_vehicle_numbers_batch:
+            assert np.all(vehicle_numbers == [20, 21])
+        assert np.array_equal(
+            mutated_population[times_to_repeat == 0],
+            population[times_to_repeat == 0],
+        )
+        changes = np.abs(mutated_population - population).sum(axis=(1, 2))
+        assert np.all(changes[times_to_repeat == 1] > 0)
+        assert np.all(changes <= times_to_repeat * 4)
+
+
+def test_mutations_with_generator():
+    """
+    Mutating with generators seeded alike gives the same allocations, and
+    leaves the global numpy random state unchanged.
+    """
+    primary_allocation = np.array([1, 0, 2, 3, 0, 1])
+    secondary_allocation = np.array([0, 2, 0, 1, 3, 0])
+    population = np.array([[primary_allocation, secondary_allocation]] * 4)
+    global_state = np.random.get_state()[1].copy()
+    runs = []
+    for _ in range(2):
+        allocations = [
+            optimisation.repeat_mutation(
+                mutation_function=optimisation.mutate_full,
+                times_to_repeat=5,
+                primary_allocation=primary_allocation,
+                secondary_allocation=secondary_allocation,
+                max_primary=3,
+                max_secondary=3,
+                rng=rng,
+            )
+            for rng in optimisation.get_generators(seed=0, number_of_generators=3)
+        ]
+        batch_population = optimisation.repeat_mutation_batch(
+            mutation_function=optimisation.mutate_full_batch,
+            times_to_repeat=5,
+            population=population,
+            max_primary=3,
+            max_secondary=3,
+            rng=np.random.default_rng(1),
+        )
+        runs.append((np.array(allocations), batch_population))
+
+    assert np.array_equal(runs[0][0], runs[1][0])
+    assert np.array_equal(runs[0][1], runs[1][1])
+    assert not np.array_equal(runs[0][0][0], runs[0][0][1])
+    assert np.array_equal(np.random.get_state()[1], global_state)
+
+
+def test_get_seed_sequence():
+    seed_sequence = np.random.SeedSequence(0)
+    assert optimisation.get_seed_sequence(seed_sequence) is seed_sequence
+    assert optimisation.get_seed_sequence(0).entropy == 0
+    assert np.array_equal(
+        optimisation.get_seed_sequence(np.random.default_rng(1)).generate_state(4),
+        optimisation.get_seed_sequence(np.random.default_rng(1)).generate_state(4),
+    )
+    first, second = optimisation.spawn_generators(seed_sequence, 2)
+    assert first.random() != second.random()
+    assert seed_sequence.n_children_spawned == 2
+
+
 def test_create_initial_population():
     number_of_locations = 6
     population_size = 15
@@ -421,6 +580,351 @@ def test_rank_population():
         previous_objective_value = next_objective_value
 
 
+def test_rank_population_batched():
+    # Read in data
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta = objective.get_beta(travel_times=raw_travel_times)
+    primary_vehicle_travel_times = raw_travel_times / 0.75
+    secondary_vehicle_travel_times = raw_travel_times / 1.215
+    R = objective.get_R(
+        primary_vehicle_travel_times=primary_vehicle_travel_times,
+        secondary_vehicle_travel_times=secondary_vehicle_travel_times,
+    )
+    survival_functions = (
+        lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
+        lambda t: np.heaviside(15 - t, 1),
+        lambda t: np.heaviside(60 - t, 1),
+    )
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    vehicle_locations, pickup_locations = tuple(map(range, raw_travel_times.shape))
+
+    weights_single_vehicle = np.array([0, 0, 1])
+    weights_multiple_vehicles = np.array([1, 1, 0])
+
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_vehicle_travel_times, secondary_vehicle_travel_times
+    )
+
+    # Utilisations and allocations for resource level 61
+    given_utilisations_primary_61 = np.genfromtxt(
+        "./test_data/primary_utilisations_61.csv", delimiter=","
+    )
+    given_utilisations_secondary_61 = np.genfromtxt(
+        "./test_data/secondary_utilisations_61.csv", delimiter=","
+    )
+    allocation_61 = np.genfromtxt(
+        "./test_data/allocation_61.csv", delimiter=","
+    ).astype(np.int64)
+
+    # Create population
+    random.seed(0)
+    population = np.array(
+        [
+            [
+                random.sample(list(allocation_61[:67]), 67),
+                random.sample(list(allocation_61[67:]), 67),
+            ]
+            for entry in range(10)
+        ]
+    )
+    assert population.shape == (10, 2, 67)
+
+    ranked_population, objective_values = optimisation.rank_population(
+        population=population,
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.given_utilisations,
+        num_workers=3,
+        batched=True,
+        given_utilisations_primary=given_utilisations_primary_61,
+        given_utilisations_secondary=given_utilisations_secondary_61,
+    )
+
+    assert ranked_population.shape == (10, 2, 67)
+    assert np.all(objective_values[:-1] >= objective_values[1:])
+    previous_objective_value = float("inf")
+    for allocation in ranked_population:
+        next_objective_value = objective.get_objective(
+            demand_rates=demand_rates,
+            primary_survivals=primary_survivals,
+            secondary_survivals=secondary_survivals,
+            weights_single_vehicle=weights_single_vehicle,
+            weights_multiple_vehicles=weights_multiple_vehicles,
+            beta=beta,
+            R=R,
+            vehicle_station_utilisation_function=utilisation.given_utilisations,
+            allocation_primary=allocation[0],
+            allocation_secondary=allocation[1],
+            given_utilisations_primary=given_utilisations_primary_61,
+            given_utilisations_secondary=given_utilisations_secondary_61,
+        )
+        assert previous_objective_value >= next_objective_value
+        previous_objective_value = next_objective_value
+
+
+def test_rank_population_with_processes_and_shared_cache():
+    # Read in data
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    primary_vehicle_travel_times = raw_travel_times / 0.75
+    secondary_vehicle_travel_times = raw_travel_times / 1.215
+    survival_functions = (
+        lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
+        lambda t: np.heaviside(15 - t, 1),
+        lambda t: np.heaviside(60 - t, 1),
+    )
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_vehicle_travel_times, secondary_vehicle_travel_times
+    )
+    np.random.seed(0)
+    population = optimisation.create_initial_population(
+        number_of_locations=67,
+        number_of_primary_vehicles=67,
+        number_of_secondary_vehicles=67,
+        max_primary=3,
+        max_secondary=3,
+        population_size=6,
+    )
+    arguments = dict(
+        population=population,
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=np.array([0, 0, 1]),
+        weights_multiple_vehicles=np.array([1, 1, 0]),
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.solve_utilisations_batch,
+        num_workers=2,
+        service_rate_primary=1 / (4.5 * 60),
+        service_rate_secondary=1 / (3.5 * 60),
+    )
+    expected_population, expected_objective_values = optimisation.rank_population(
+        **arguments
+    )
+
+    with objective.ObjectiveCacheManager() as manager:
+        cache = objective.SharedObjectiveCache(manager)
+        solver_infos = {False: [], True: []}
+        for batched in (False, True):
+            ranked_population, objective_values = optimisation.rank_population(
+                cache=cache,
+                batched=batched,
+                scheduler="processes",
+                solver_infos=solver_infos[batched],
+                vectorised_utilisation_function=batched,
+                **arguments,
+            )
+            assert np.array_equal(ranked_population, expected_population)
+            assert np.allclose(objective_values, expected_objective_values)
+
+        # The values computed by the worker processes of the first ranking
+        # are found by the second.
+        assert len(cache) == 6
+        assert cache.misses == 6
+        assert cache.hits == 6
+        # The solver information comes back from the worker processes.
+        assert all(info["evaluations"] > 0 for info in solver_infos[False])
+        assert solver_infos[True] == [{}] * 6
+
+
+def test_rank_population_with_executors_and_shared_arrays():
+    # Read in data
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    primary_vehicle_travel_times = raw_travel_times / 0.75
+    secondary_vehicle_travel_times = raw_travel_times / 1.215
+    survival_functions = (
+        lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
+        lambda t: np.heaviside(15 - t, 1),
+        lambda t: np.heaviside(60 - t, 1),
+    )
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_vehicle_travel_times, secondary_vehicle_travel_times
+    )
+    scenario_arguments = dict(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=np.array([0, 0, 1]),
+        weights_multiple_vehicles=np.array([1, 1, 0]),
+        beta=objective.pack_preferences(beta),
+        R=R,
+    )
+    population = optimisation.create_initial_population(
+        number_of_locations=67,
+        number_of_primary_vehicles=67,
+        number_of_secondary_vehicles=67,
+        max_primary=3,
+        max_secondary=3,
+        population_size=6,
+        rng=np.random.default_rng(0),
+    )
+    arguments = dict(
+        population=population,
+        vehicle_station_utilisation_function=utilisation.constant_utilisation,
+        num_workers=2,
+        utilisation_rate_primary=0.7,
+        utilisation_rate_secondary=0.4,
+    )
+    expected_population, expected_objective_values = optimisation.rank_population(
+        scheduler="serial", **scenario_arguments, **arguments
+    )
+
+    with optimisation.SharedArrays(
+        scenario=objective.Scenario(**scenario_arguments), **scenario_arguments
+    ) as shared_arrays:
+        # Only the names of the shared memory blocks are pickled.
+        assert len(pickle.dumps(shared_arrays.arrays)) < 0.01 * len(
+            pickle.dumps(
+                dict(
+                    scenario=objective.Scenario(**scenario_arguments),
+                    **scenario_arguments,
+                )
+            )
+        )
+        for name, value in scenario_arguments.items():
+            if isinstance(value, np.ndarray):
+                assert np.array_equal(
+                    optimisation.get_attached(shared_arrays.arrays[name]), value
+                )
+        for scheduler in (
+            "serial",
+            "processes",
+            concurrent.futures.ThreadPoolExecutor(max_workers=2),
+            concurrent.futures.ProcessPoolExecutor(max_workers=2),
+        ):
+            for batched in (False, True):
+                ranked_population, objective_values = optimisation.rank_population(
+                    scheduler=scheduler,
+                    batched=batched,
+                    **shared_arrays.arrays,
+                    **arguments,
+                )
+                assert np.array_equal(ranked_population, expected_population)
+                assert np.allclose(objective_values, expected_objective_values)
+            if isinstance(scheduler, concurrent.futures.Executor):
+                scheduler.shutdown()
+    assert shared_arrays.shared_memories == []
+
+
+def test_evaluation_context_with_chunk_sizes(tmp_path):
+    # Read in data
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    primary_vehicle_travel_times = raw_travel_times / 0.75
+    secondary_vehicle_travel_times = raw_travel_times / 1.215
+    survival_functions = (
+        lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
+        lambda t: np.heaviside(15 - t, 1),
+        lambda t: np.heaviside(60 - t, 1),
+    )
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_vehicle_travel_times, secondary_vehicle_travel_times
+    )
+    population = optimisation.create_initial_population(
+        number_of_locations=67,
+        number_of_primary_vehicles=20,
+        number_of_secondary_vehicles=20,
+        max_primary=3,
+        max_secondary=3,
+        population_size=10,
+        rng=np.random.default_rng(0),
+    )
+    arguments = dict(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=np.array([0, 0, 1]),
+        weights_multiple_vehicles=np.array([1, 1, 0]),
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.constant_utilisation,
+        num_workers=2,
+        utilisation_rate_primary=0.7,
+        utilisation_rate_secondary=0.4,
+    )
+    expected_population, expected_objective_values = optimisation.rank_population(
+        population=population, scheduler="serial", **arguments
+    )
+
+    thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    for scheduler in ("serial", "threads", thread_pool):
+        for batched in (False, True):
+            for chunk_size in (None, 1, 3, 10):
+                context = optimisation.EvaluationContext(
+                    scheduler=scheduler,
+                    batched=batched,
+                    chunk_size=chunk_size,
+                    **arguments,
+                )
+                timings = []
+                solver_infos = []
+                for _ in range(2):
+                    ranked_population, objective_values = context.rank(
+                        population, solver_infos=solver_infos, timings=timings
+                    )
+                    assert np.array_equal(ranked_population, expected_population)
+                    assert np.allclose(objective_values, expected_objective_values)
+                assert len(solver_infos) == 20
+                assert len(timings) == 2
+                assert all(
+                    0 <= overhead <= wall_time for wall_time, overhead in timings
+                )
+    thread_pool.shutdown()
+
+    assert [
+        len(chunk)
+        for chunk in optimisation.EvaluationContext(
+            chunk_size=3, **arguments
+        ).get_chunks(10)
+    ] == [3, 3, 3, 1]
+    assert [
+        len(chunk)
+        for chunk in optimisation.EvaluationContext(
+            batched=True, **arguments
+        ).get_chunks(5)
+    ] == [3, 2]
+    assert len(optimisation.EvaluationContext(**arguments).get_chunks(10)) == 10
+
+    # An archive is read once per chunk.
+    with objective.ObjectiveArchive(tmp_path / "objectives.sqlite", "") as archive:
+        reads = []
+        get_many = archive.get_many
+
+        def counted_get_many(keys):
+            reads.append(len(keys))
+            return get_many(keys)
+
+        archive.get_many = counted_get_many
+        context = optimisation.EvaluationContext(
+            scheduler="serial", chunk_size=3, cache=archive, **arguments
+        )
+        for _ in range(2):
+            ranked_population, objective_values = context.rank(population)
+            assert np.array_equal(ranked_population, expected_population)
+            assert np.allclose(objective_values, expected_objective_values)
+        assert reads == [3, 3, 3, 1] * 2
+        assert archive.misses == 10
+        assert archive.hits == 10
+
+
 def test_optimise(benchmark):
     # Read in data
     raw_travel_times = np.genfromtxt(
@@ -489,3 +993,622 @@ def test_optimise(benchmark):
     assert sum(best_secondary) == num_vehicles
     assert objective_by_iteration.shape == (num_iters, pop_size)
     assert np.all(best_over_time[:-1] <= best_over_time[1:])
+
+
+def test_optimise_with_warm_start():
+    # Read in data
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    primary_vehicle_travel_times = raw_travel_times / 0.75
+    secondary_vehicle_travel_times = raw_travel_times / 1.215
+    survival_functions = (
+        lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
+        lambda t: np.heaviside(15 - t, 1),
+        lambda t: np.heaviside(60 - t, 1),
+    )
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+
+    weights_single_vehicle = np.array([0, 0, 1])
+    weights_multiple_vehicles = np.array([1, 1, 0])
+
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_vehicle_travel_times, secondary_vehicle_travel_times
+    )
+
+    mean_evaluations = {}
+    for warm_start in (False, True):
+        run_statistics = {}
+        best_primary, best_secondary, objective_by_iteration = optimisation.optimise(
+            number_of_locations=67,
+            number_of_primary_vehicles=67,
+            number_of_secondary_vehicles=67,
+            max_primary=3,
+            max_secondary=3,
+            population_size=6,
+            keep_size=2,
+            number_of_iterations=3,
+            mutation_function=optimisation.mutate_retain_vehicle_numbers,
+            initial_number_of_mutatation_repetitions=1,
+            cooling_rate=1,
+            demand_rates=demand_rates,
+            primary_survivals=primary_survivals,
+            secondary_survivals=secondary_survivals,
+            weights_single_vehicle=weights_single_vehicle,
+            weights_multiple_vehicles=weights_multiple_vehicles,
+            beta=beta,
+            R=R,
+            vehicle_station_utilisation_function=utilisation.solve_utilisations,
+            seed=0,
+            num_workers=2,
+            warm_start=warm_start,
+            run_statistics=run_statistics,
+            service_rate_primary=1 / (4.5 * 60),
+            service_rate_secondary=1 / (3.5 * 60),
+            use_jacobian=True,
+        )
+        assert objective_by_iteration.shape == (3, 6)
+        mean_evaluations[warm_start] = run_statistics
+
+    assert mean_evaluations[False]["warm_start_solves"] == 0
+    assert mean_evaluations[True]["warm_start_solves"] > 0
+    # Only the initial population is solved from cold, including the
+    # children of parents kept for more than one generation.
+    assert mean_evaluations[True]["cold_start_solves"] == 6
+    assert (
+        mean_evaluations[True]["mean_warm_start_evaluations"]
+        < mean_evaluations[False]["mean_cold_start_evaluations"]
+    )
+
+
+def test_optimise_with_batched_solver_and_primary_cache():
+    # Read in data
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    primary_vehicle_travel_times = raw_travel_times / 0.75
+    secondary_vehicle_travel_times = raw_travel_times / 1.215
+    survival_functions = (
+        lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
+        lambda t: np.heaviside(15 - t, 1),
+        lambda t: np.heaviside(60 - t, 1),
+    )
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+
+    weights_single_vehicle = np.array([0, 0, 1])
+    weights_multiple_vehicles = np.array([1, 1, 0])
+
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_vehicle_travel_times, secondary_vehicle_travel_times
+    )
+
+    run_statistics = {}
+    primary_cache = {}
+    best_primary, best_secondary, objective_by_iteration = optimisation.optimise(
+        number_of_locations=67,
+        number_of_primary_vehicles=67,
+        number_of_secondary_vehicles=67,
+        max_primary=3,
+        max_secondary=3,
+        population_size=10,
+        keep_size=3,
+        number_of_iterations=5,
+        mutation_function=optimisation.mutate_retain_vehicle_numbers,
+        initial_number_of_mutatation_repetitions=1,
+        cooling_rate=1,
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.solve_utilisations_batch,
+        seed=0,
+        num_workers=2,
+        batched=True,
+        run_statistics=run_statistics,
+        vectorised_utilisation_function=True,
+        primary_cache=primary_cache,
+        cache=objective.ObjectiveCache(maximum_size=8),
+        service_rate_primary=1 / (4.5 * 60),
+        service_rate_secondary=1 / (3.5 * 60),
+    )
+    best_over_time = objective_by_iteration.max(axis=1)
+
+    assert objective_by_iteration.shape == (5, 10)
+    assert np.all(best_over_time[:-1] <= best_over_time[1:])
+    assert run_statistics["primary_cache_hits"] > 0
+    assert (
+        run_statistics["primary_cache_hits"] + run_statistics["primary_cache_misses"]
+        == run_statistics["cold_start_solves"]
+    )
+    assert 0 < len(primary_cache) <= run_statistics["primary_cache_misses"]
+    assert 0 < run_statistics["primary_cache_hit_rate"] < 1
+    assert run_statistics["objective_cache_size"] == 8
+    assert run_statistics["objective_cache_evictions"] > 0
+    # Only the children of every generation are looked up, as the values of the
+    # kept population are carried forward.
+    assert (
+        run_statistics["objective_cache_hits"]
+        + run_statistics["objective_cache_misses"]
+        == 10 + 5 * 7
+    )
+    assert run_statistics["skipped_evaluations"] == 5 * 3
+
+
+def test_rank_population_incrementally_with_copied_states():
+    # Read in data
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    primary_vehicle_travel_times = raw_travel_times / 0.75
+    secondary_vehicle_travel_times = raw_travel_times / 1.215
+    survival_functions = (
+        lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
+        lambda t: np.heaviside(15 - t, 1),
+        lambda t: np.heaviside(60 - t, 1),
+    )
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_vehicle_travel_times, secondary_vehicle_travel_times
+    )
+    scenario = objective.Scenario(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=np.array([0, 0, 1]),
+        weights_multiple_vehicles=np.array([1, 1, 0]),
+        beta=beta,
+        R=R,
+        service_rate_primary=1 / (4.5 * 60),
+        service_rate_secondary=1 / (3.5 * 60),
+    )
+    population = optimisation.create_initial_population(
+        number_of_locations=67,
+        number_of_primary_vehicles=67,
+        number_of_secondary_vehicles=67,
+        max_primary=3,
+        max_secondary=3,
+        population_size=2,
+        rng=np.random.default_rng(0),
+    )
+    arguments = dict(
+        scenario=scenario,
+        vehicle_station_utilisation_function=utilisation.solve_utilisations,
+        num_workers=2,
+        scheduler="serial",
+    )
+    solver_infos = []
+    (
+        ranked_population,
+        objective_values,
+        states,
+    ) = optimisation.rank_population_incrementally(
+        population=population, solver_infos=solver_infos, **arguments
+    )
+    assert all(solver_info["evaluations"] > 0 for solver_info in solver_infos)
+
+    # The states come back from process based workers as copies, which are
+    # still recognised as unchanged parents so their solves are not counted
+    # again.
+    copied_states = pickle.loads(pickle.dumps(states))
+    solver_infos = []
+    _, unchanged_values, _ = optimisation.rank_population_incrementally(
+        population=ranked_population,
+        parent_states=copied_states,
+        solver_infos=solver_infos,
+        **arguments,
+    )
+    assert np.array_equal(unchanged_values, objective_values)
+    assert solver_infos == [{}, {}]
+
+    with pytest.raises(ValueError):
+        optimisation.optimise(
+            number_of_locations=67,
+            number_of_primary_vehicles=67,
+            number_of_secondary_vehicles=67,
+            max_primary=3,
+            max_secondary=3,
+            population_size=2,
+            keep_size=1,
+            number_of_iterations=1,
+            mutation_function=optimisation.mutate_retain_vehicle_numbers,
+            initial_number_of_mutatation_repetitions=1,
+            cooling_rate=1,
+            demand_rates=demand_rates,
+            primary_survivals=primary_survivals,
+            secondary_survivals=secondary_survivals,
+            weights_single_vehicle=np.array([0, 0, 1]),
+            weights_multiple_vehicles=np.array([1, 1, 0]),
+            beta=beta,
+            R=R,
+            vehicle_station_utilisation_function=utilisation.constant_utilisation,
+            seed=0,
+            num_workers=2,
+            incremental=True,
+            scheduler="processes",
+        )
+
+
+def test_optimise_incrementally():
+    # Read in data
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    primary_vehicle_travel_times = raw_travel_times / 0.75
+    secondary_vehicle_travel_times = raw_travel_times / 1.215
+    survival_functions = (
+        lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
+        lambda t: np.heaviside(15 - t, 1),
+        lambda t: np.heaviside(60 - t, 1),
+    )
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+
+    weights_single_vehicle = np.array([0, 0, 1])
+    weights_multiple_vehicles = np.array([1, 1, 0])
+
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_vehicle_travel_times, secondary_vehicle_travel_times
+    )
+
+    objectives_by_iteration = []
+    for incremental in (False, True):
+        run_statistics = {}
+        best_primary, best_secondary, objective_by_iteration = optimisation.optimise(
+            number_of_locations=67,
+            number_of_primary_vehicles=20,
+            number_of_secondary_vehicles=20,
+            max_primary=4,
+            max_secondary=4,
+            population_size=10,
+            keep_size=3,
+            number_of_iterations=10,
+            mutation_function=optimisation.mutate_retain_vehicle_numbers,
+            initial_number_of_mutatation_repetitions=6,
+            cooling_rate=1,
+            demand_rates=demand_rates,
+            primary_survivals=primary_survivals,
+            secondary_survivals=secondary_survivals,
+            weights_single_vehicle=weights_single_vehicle,
+            weights_multiple_vehicles=weights_multiple_vehicles,
+            beta=beta,
+            R=R,
+            vehicle_station_utilisation_function=utilisation.constant_utilisation,
+            seed=0,
+            num_workers=2,
+            incremental=incremental,
+            run_statistics=run_statistics,
+            utilisation_rate_primary=0.7,
+            utilisation_rate_secondary=0.4,
+        )
+        objectives_by_iteration.append(objective_by_iteration)
+        assert (
+            0
+            <= run_statistics["scheduler_overhead_fraction"]
+            <= run_statistics["max_scheduler_overhead_fraction"]
+            <= 1
+        )
+
+    assert sum(best_primary) == 20
+    assert sum(best_secondary) == 20
+    assert np.allclose(*objectives_by_iteration, rtol=1e-12)
+    assert run_statistics["objective_cache_size"] > 0
+
+
+def test_optimise_with_reduced_precision():
+    # Read in data
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    primary_vehicle_travel_times = raw_travel_times / 0.75
+    secondary_vehicle_travel_times = raw_travel_times / 1.215
+    survival_functions = (
+        lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
+        lambda t: np.heaviside(15 - t, 1),
+        lambda t: np.heaviside(60 - t, 1),
+    )
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+
+    weights_single_vehicle = np.array([0, 0, 1])
+    weights_multiple_vehicles = np.array([1, 1, 0])
+
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_vehicle_travel_times, secondary_vehicle_travel_times
+    )
+
+    arguments = dict(
+        number_of_locations=67,
+        number_of_primary_vehicles=20,
+        number_of_secondary_vehicles=20,
+        max_primary=4,
+        max_secondary=4,
+        population_size=10,
+        keep_size=3,
+        number_of_iterations=10,
+        mutation_function=optimisation.mutate_retain_vehicle_numbers,
+        initial_number_of_mutatation_repetitions=6,
+        cooling_rate=1,
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.constant_utilisation,
+        seed=0,
+        num_workers=2,
+        utilisation_rate_primary=0.7,
+        utilisation_rate_secondary=0.4,
+    )
+    cache = objective.ObjectiveCache()
+    run_statistics = {}
+    best_primary, best_secondary, objective_by_iteration = optimisation.optimise(
+        dtype=np.float32, cache=cache, run_statistics=run_statistics, **arguments
+    )
+    (
+        expected_best_primary,
+        expected_best_secondary,
+        expected_objective_by_iteration,
+    ) = optimisation.optimise(**arguments)
+
+    assert np.array_equal(best_primary, expected_best_primary)
+    assert np.array_equal(best_secondary, expected_best_secondary)
+    assert np.allclose(
+        objective_by_iteration, expected_objective_by_iteration, rtol=1e-5
+    )
+    assert (
+        0
+        <= run_statistics["reduced_precision_error"]
+        < 1e-5 * np.max(expected_objective_by_iteration)
+    )
+    # The given cache only holds the values of the final float64 ranking.
+    best_value = objective.get_objective(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.constant_utilisation,
+        allocation_primary=best_primary,
+        allocation_secondary=best_secondary,
+        utilisation_rate_primary=0.7,
+        utilisation_rate_secondary=0.4,
+    )
+    assert len(cache) == 10
+    assert cache[objective.get_cache_key(cache, best_primary, best_secondary)] == (
+        best_value
+    )
+
+    with pytest.raises(ValueError):
+        optimisation.optimise(dtype=np.float32, incremental=True, **arguments)
+
+
+def test_optimise_with_vectorised_mutation():
+    # Read in data
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    primary_vehicle_travel_times = raw_travel_times / 0.75
+    secondary_vehicle_travel_times = raw_travel_times / 1.215
+    survival_functions = (
+        lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
+        lambda t: np.heaviside(15 - t, 1),
+        lambda t: np.heaviside(60 - t, 1),
+    )
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+
+    weights_single_vehicle = np.array([0, 0, 1])
+    weights_multiple_vehicles = np.array([1, 1, 0])
+
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_vehicle_travel_times, secondary_vehicle_travel_times
+    )
+    arguments = dict(
+        number_of_locations=67,
+        number_of_primary_vehicles=20,
+        number_of_secondary_vehicles=21,
+        max_primary=4,
+        max_secondary=4,
+        population_size=20,
+        keep_size=5,
+        number_of_iterations=20,
+        initial_number_of_mutatation_repetitions=6,
+        cooling_rate=1,
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.constant_utilisation,
+        seed=0,
+        num_workers=2,
+        utilisation_rate_primary=0.7,
+        utilisation_rate_secondary=0.4,
+    )
+    for mutation_function in (
+        optimisation.mutate_retain_vehicle_numbers,
+        optimisation.mutate_full,
+    ):
+        best_primary, best_secondary, objective_by_iteration = optimisation.optimise(
+            mutation_function=mutation_function, vectorised_mutation=True, **arguments
+        )
+        best_over_time = objective_by_iteration.max(axis=1)
+
+        assert max(best_primary) <= 4
+        assert max(best_secondary) <= 4
+        assert sum(best_primary) * 3 + sum(best_secondary) == 81
+        assert objective_by_iteration.shape == (20, 20)
+        assert np.all(best_over_time[:-1] <= best_over_time[1:])
+
+    with pytest.raises(ValueError):
+        optimisation.optimise(
+            mutation_function=lambda **kwargs: None,
+            vectorised_mutation=True,
+            **arguments,
+        )
+
+
+def test_optimise_is_reproducible_with_any_number_of_workers():
+    """
+    The results of a seed do not depend on the number of workers or on
+    whether the seed is given as an int or a SeedSequence, and those of
+    Generators seeded alike do not depend on the number of workers.
+    """
+    # Read in data
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    primary_vehicle_travel_times = raw_travel_times / 0.75
+    secondary_vehicle_travel_times = raw_travel_times / 1.215
+    survival_functions = (
+        lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
+        lambda t: np.heaviside(15 - t, 1),
+        lambda t: np.heaviside(60 - t, 1),
+    )
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+
+    weights_single_vehicle = np.array([0, 0, 1])
+    weights_multiple_vehicles = np.array([1, 1, 0])
+
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_vehicle_travel_times, secondary_vehicle_travel_times
+    )
+    arguments = dict(
+        number_of_locations=67,
+        number_of_primary_vehicles=20,
+        number_of_secondary_vehicles=21,
+        max_primary=4,
+        max_secondary=4,
+        population_size=12,
+        keep_size=4,
+        number_of_iterations=8,
+        mutation_function=optimisation.mutate_full,
+        initial_number_of_mutatation_repetitions=3,
+        cooling_rate=1,
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.constant_utilisation,
+        utilisation_rate_primary=0.7,
+        utilisation_rate_secondary=0.4,
+    )
+    results = [
+        optimisation.optimise(seed=seed, num_workers=num_workers, **arguments)
+        for seed, num_workers in (
+            (0, 1),
+            (0, 4),
+            (np.random.SeedSequence(0), 2),
+            (np.random.default_rng(0), 3),
+            (np.random.default_rng(0), 1),
+        )
+    ]
+
+    for index, expected_index in ((1, 0), (2, 0), (4, 3)):
+        best_primary, best_secondary, objective_by_iteration = results[index]
+        assert np.array_equal(best_primary, results[expected_index][0])
+        assert np.array_equal(best_secondary, results[expected_index][1])
+        assert np.array_equal(objective_by_iteration, results[expected_index][2])
+
+    best_primary, _, objective_by_iteration = optimisation.optimise(
+        seed=1, num_workers=1, **arguments
+    )
+    assert not np.array_equal(objective_by_iteration, results[0][2])
+
+
+def test_optimise_only_evaluates_children():
+    """
+    The values of the kept population are carried forward, so every generation
+    after the first only looks up the values of its children.
+    """
+    # Read in data
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    primary_vehicle_travel_times = raw_travel_times / 0.75
+    secondary_vehicle_travel_times = raw_travel_times / 1.215
+    survival_functions = (
+        lambda t: 1 / (1 + np.exp(0.26 + 0.139 * t)),
+        lambda t: np.heaviside(15 - t, 1),
+        lambda t: np.heaviside(60 - t, 1),
+    )
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+
+    weights_single_vehicle = np.array([0, 0, 1])
+    weights_multiple_vehicles = np.array([1, 1, 0])
+
+    primary_survivals, secondary_survivals = objective.get_survival_time_vectors(
+        survival_functions, primary_vehicle_travel_times, secondary_vehicle_travel_times
+    )
+    for incremental in (False, True):
+        cache = objective.ObjectiveCache()
+        run_statistics = {}
+        best_primary, best_secondary, objective_by_iteration = optimisation.optimise(
+            number_of_locations=67,
+            number_of_primary_vehicles=20,
+            number_of_secondary_vehicles=20,
+            max_primary=4,
+            max_secondary=4,
+            population_size=10,
+            keep_size=3,
+            number_of_iterations=6,
+            mutation_function=optimisation.mutate_retain_vehicle_numbers,
+            initial_number_of_mutatation_repetitions=3,
+            cooling_rate=1,
+            demand_rates=demand_rates,
+            primary_survivals=primary_survivals,
+            secondary_survivals=secondary_survivals,
+            weights_single_vehicle=weights_single_vehicle,
+            weights_multiple_vehicles=weights_multiple_vehicles,
+            beta=beta,
+            R=R,
+            vehicle_station_utilisation_function=utilisation.constant_utilisation,
+            seed=0,
+            num_workers=2,
+            cache=cache,
+            incremental=incremental,
+            run_statistics=run_statistics,
+            utilisation_rate_primary=0.7,
+            utilisation_rate_secondary=0.4,
+        )
+        best_over_time = objective_by_iteration.max(axis=1)
+
+        assert run_statistics["skipped_evaluations"] == 6 * 3
+        assert np.all(best_over_time[:-1] <= best_over_time[1:])
+        assert np.all(np.diff(objective_by_iteration, axis=1) <= 0)
+        assert np.isclose(
+            objective.get_objective(
+                allocation_primary=best_primary,
+                allocation_secondary=best_secondary,
+                demand_rates=demand_rates,
+                primary_survivals=primary_survivals,
+                secondary_survivals=secondary_survivals,
+                weights_single_vehicle=weights_single_vehicle,
+                weights_multiple_vehicles=weights_multiple_vehicles,
+                beta=beta,
+                R=R,
+                vehicle_station_utilisation_function=utilisation.constant_utilisation,
+                utilisation_rate_primary=0.7,
+                utilisation_rate_secondary=0.4,
+            ),
+            max(cache.values.values()),
+        )
+        if not incremental:
+            assert cache.hits + cache.misses == 10 + 6 * 7
@@ -1,6 +1,8 @@
+import pickle
 import types
 import numpy as np
 import objective
+import optimisation
 import utilisation
 
 ## Time units in minutes
@@ -319,3 +321,793 @@ def test_A1_survivals():
     )
     survival_in_days = expected_A1_survivals * 1440
     assert np.isclose(survival_in_days, 0.23000257753819806)
+
+
+def test_evaluation():
+    """
+    Tests that the evaluation of an allocation with a resource level of 61
+    gives the objective function value and the A1 survivals from a single
+    call to the utilisation function, that its breakdowns by patient class
+    and by pickup location sum to the objective function value, and that the
+    survivals of every class do not depend on the weights.
+    """
+    calls = []
+
+    def counted_given_utilisations(**kwargs):
+        calls.append(kwargs)
+        return utilisation.given_utilisations(**kwargs)
+
+    evaluation = objective.get_evaluation(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=counted_given_utilisations,
+        allocation_primary=allocation_61[:67],
+        allocation_secondary=allocation_61[67:],
+        by_pickup=True,
+        given_utilisations_primary=given_utilisations_primary_61,
+        given_utilisations_secondary=given_utilisations_secondary_61,
+    )
+    assert len(calls) == 1
+    assert np.isclose(evaluation["objective"] * 1440, 232.2921043699148)
+    assert np.isclose(evaluation["A1_survival"] * 1440, 0.23000257753819806)
+    assert evaluation["class_objectives"].shape == (len(demand_rates),)
+    assert np.isclose(evaluation["class_objectives"].sum(), evaluation["objective"])
+    assert np.isclose(evaluation["class_survivals"][0], evaluation["A1_survival"])
+    assert np.allclose(evaluation["class_survivals"], evaluation["class_objectives"])
+    assert evaluation["pickup_objectives"].shape == (len(demand_rates[0]),)
+    assert np.isclose(evaluation["pickup_objectives"].sum(), evaluation["objective"])
+    assert np.all(evaluation["pickup_objectives"][demand_rates.sum(axis=0) == 0] == 0)
+    assert np.allclose(evaluation["utilisations"][0], given_utilisations_primary_61)
+
+    scenario = objective.Scenario(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+    )
+    for breakdown in (True, False):
+        scenario_evaluation = objective.get_evaluation(
+            scenario=scenario,
+            vehicle_station_utilisation_function=utilisation.given_utilisations,
+            allocation_primary=allocation_61[:67],
+            allocation_secondary=allocation_61[67:],
+            breakdown=breakdown,
+            given_utilisations_primary=given_utilisations_primary_61,
+            given_utilisations_secondary=given_utilisations_secondary_61,
+        )
+        assert np.isclose(scenario_evaluation["objective"], evaluation["objective"])
+        assert ("class_objectives" in scenario_evaluation) == breakdown
+        assert "pickup_objectives" not in scenario_evaluation
+
+    # The survivals of a class do not depend on its weight.
+    reweighted_evaluation = objective.get_evaluation(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=np.array([0, 0, 3]),
+        weights_multiple_vehicles=np.array([0, 2, 0]),
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.given_utilisations,
+        allocation_primary=allocation_61[:67],
+        allocation_secondary=allocation_61[67:],
+        given_utilisations_primary=given_utilisations_primary_61,
+        given_utilisations_secondary=given_utilisations_secondary_61,
+    )
+    assert reweighted_evaluation["class_objectives"][0] == 0
+    assert np.allclose(
+        reweighted_evaluation["class_objectives"],
+        [0, 2, 3] * evaluation["class_survivals"],
+    )
+    assert np.allclose(
+        reweighted_evaluation["class_survivals"], evaluation["class_survivals"]
+    )
+
+
+def test_log_engine_matches_power_engine():
+    """
+    Tests that the log-space engine gives the same objective function values
+    and A1 survivals as the power engine, to within 1e-12, for all resource
+    levels.
+    """
+    for allocation, given_utilisations_primary, given_utilisations_secondary in (
+        (allocation_61, given_utilisations_primary_61, given_utilisations_secondary_61),
+        (allocation_68, given_utilisations_primary_68, given_utilisations_secondary_68),
+        (allocation_75, given_utilisations_primary_75, given_utilisations_secondary_75),
+        (allocation_82, given_utilisations_primary_82, given_utilisations_secondary_82),
+        (allocation_89, given_utilisations_primary_89, given_utilisations_secondary_89),
+        (allocation_96, given_utilisations_primary_96, given_utilisations_secondary_96),
+    ):
+        for function in (objective.get_objective, objective.get_survival_A1_only):
+            values = [
+                function(
+                    demand_rates=demand_rates,
+                    primary_survivals=primary_survivals,
+                    secondary_survivals=secondary_survivals,
+                    weights_single_vehicle=weights_single_vehicle,
+                    weights_multiple_vehicles=weights_multiple_vehicles,
+                    beta=beta,
+                    R=R,
+                    vehicle_station_utilisation_function=utilisation.given_utilisations,
+                    allocation_primary=allocation[:67],
+                    allocation_secondary=allocation[67:],
+                    closer_busy_engine=closer_busy_engine,
+                    given_utilisations_primary=given_utilisations_primary,
+                    given_utilisations_secondary=given_utilisations_secondary,
+                )
+                for closer_busy_engine in ("power", "log")
+            ]
+            assert abs(values[0] - values[1]) <= 1e-12
+
+
+def test_objective_batch_matches_objective():
+    """
+    Tests that scoring all resource levels as one population gives the same
+    values as scoring them one at a time.
+    """
+    population = np.array(
+        [
+            [allocation[:67], allocation[67:]]
+            for allocation in (
+                allocation_61,
+                allocation_68,
+                allocation_75,
+                allocation_82,
+                allocation_89,
+                allocation_96,
+            )
+        ]
+    )
+    objective_values = objective.get_objective_batch(
+        population=population,
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.constant_utilisation,
+        utilisation_rate_primary=0.4,
+        utilisation_rate_secondary=0.7,
+    )
+    expected_objective_values = [
+        objective.get_objective(
+            demand_rates=demand_rates,
+            primary_survivals=primary_survivals,
+            secondary_survivals=secondary_survivals,
+            weights_single_vehicle=weights_single_vehicle,
+            weights_multiple_vehicles=weights_multiple_vehicles,
+            beta=beta,
+            R=R,
+            vehicle_station_utilisation_function=utilisation.constant_utilisation,
+            allocation_primary=allocation_primary,
+            allocation_secondary=allocation_secondary,
+            utilisation_rate_primary=0.4,
+            utilisation_rate_secondary=0.7,
+        )
+        for allocation_primary, allocation_secondary in population
+    ]
+    assert np.allclose(objective_values, expected_objective_values, rtol=0, atol=1e-12)
+    assert np.isclose(objective_values[-1] * 1440, 255.08170500308506)
+
+
+def test_objective_batch_with_vectorised_utilisation_function():
+    """
+    Tests that solving the utilisations of all resource levels at once gives
+    the same objective values as solving them one at a time.
+    """
+    population = np.array(
+        [
+            [allocation[:67], allocation[67:]]
+            for allocation in (
+                allocation_61,
+                allocation_68,
+                allocation_75,
+                allocation_82,
+                allocation_89,
+                allocation_96,
+            )
+        ]
+    )
+    service_rate_primary = 1 / (4.5 * 60)
+    service_rate_secondary = 1 / (3.5 * 60)
+    objective_values = objective.get_objective_batch(
+        population=population,
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.solve_utilisations_batch,
+        vectorised_utilisation_function=True,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+    )
+    expected_objective_values = [
+        objective.get_objective(
+            demand_rates=demand_rates,
+            primary_survivals=primary_survivals,
+            secondary_survivals=secondary_survivals,
+            weights_single_vehicle=weights_single_vehicle,
+            weights_multiple_vehicles=weights_multiple_vehicles,
+            beta=beta,
+            R=R,
+            vehicle_station_utilisation_function=utilisation.solve_utilisations,
+            allocation_primary=allocation_primary,
+            allocation_secondary=allocation_secondary,
+            service_rate_primary=service_rate_primary,
+            service_rate_secondary=service_rate_secondary,
+            use_jacobian=True,
+        )
+        for allocation_primary, allocation_secondary in population
+    ]
+    assert np.allclose(objective_values, expected_objective_values, rtol=1e-7)
+
+
+def test_sorted_engine_matches_power_engine():
+    """
+    Tests that the sorted neighbour engine, which does not use beta or R, gives
+    the same objective function values and A1 survivals as the power engine to
+    within 1e-12.
+    """
+    neighbour_index = objective.get_neighbour_index(
+        travel_times=raw_travel_times,
+        primary_vehicle_travel_times=primary_vehicle_travel_times,
+        secondary_vehicle_travel_times=secondary_vehicle_travel_times,
+    )
+    for allocation, given_utilisations_primary, given_utilisations_secondary in (
+        (allocation_61, given_utilisations_primary_61, given_utilisations_secondary_61),
+        (allocation_96, given_utilisations_primary_96, given_utilisations_secondary_96),
+    ):
+        for function in (objective.get_objective, objective.get_survival_A1_only):
+            expected_value = function(
+                demand_rates=demand_rates,
+                primary_survivals=primary_survivals,
+                secondary_survivals=secondary_survivals,
+                weights_single_vehicle=weights_single_vehicle,
+                weights_multiple_vehicles=weights_multiple_vehicles,
+                beta=beta,
+                R=R,
+                vehicle_station_utilisation_function=utilisation.given_utilisations,
+                allocation_primary=allocation[:67],
+                allocation_secondary=allocation[67:],
+                given_utilisations_primary=given_utilisations_primary,
+                given_utilisations_secondary=given_utilisations_secondary,
+            )
+            value = function(
+                demand_rates=demand_rates,
+                primary_survivals=primary_survivals,
+                secondary_survivals=secondary_survivals,
+                weights_single_vehicle=weights_single_vehicle,
+                weights_multiple_vehicles=weights_multiple_vehicles,
+                beta=None,
+                R=None,
+                vehicle_station_utilisation_function=utilisation.given_utilisations,
+                allocation_primary=allocation[:67],
+                allocation_secondary=allocation[67:],
+                closer_busy_engine="sorted",
+                neighbour_index=neighbour_index,
+                given_utilisations_primary=given_utilisations_primary,
+                given_utilisations_secondary=given_utilisations_secondary,
+            )
+            assert abs(value - expected_value) <= 1e-12
+
+
+def test_objective_function_with_compact_beta_and_R():
+    """
+    Tests the value of the objective function when using an allocation with a
+    resource level of 61 with beta and R stored as booleans and as bits.
+    """
+    for compact_beta, compact_R in (
+        (beta.astype(bool), R.astype(bool)),
+        (objective.pack_preferences(beta), objective.pack_preferences(R)),
+    ):
+        for closer_busy_engine in ("power", "log"):
+            g = objective.get_objective(
+                demand_rates=demand_rates,
+                primary_survivals=primary_survivals,
+                secondary_survivals=secondary_survivals,
+                weights_single_vehicle=weights_single_vehicle,
+                weights_multiple_vehicles=weights_multiple_vehicles,
+                beta=compact_beta,
+                R=compact_R,
+                vehicle_station_utilisation_function=utilisation.given_utilisations,
+                allocation_primary=allocation_61[:67],
+                allocation_secondary=allocation_61[67:],
+                closer_busy_engine=closer_busy_engine,
+                given_utilisations_primary=given_utilisations_primary_61,
+                given_utilisations_secondary=given_utilisations_secondary_61,
+            )
+            objective_in_days = g * 1440
+            assert np.isclose(objective_in_days, 232.2921043699148)
+
+
+def test_objective_function_with_scenario():
+    """
+    Tests that passing the data as a `Scenario`, including after it has been
+    pickled as it would be for a process based worker, gives the same
+    objective function values and utilisations as passing the separate arrays.
+    """
+    service_rate_primary = 1 / (4.5 * 60)
+    service_rate_secondary = 1 / (3.5 * 60)
+    scenario = objective.Scenario(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=objective.pack_preferences(beta),
+        R=objective.pack_preferences(R),
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+    )
+    unpickled_scenario = pickle.loads(pickle.dumps(scenario))
+    assert unpickled_scenario.get_fingerprint() == scenario.get_fingerprint()
+
+    for scenario in (scenario, unpickled_scenario):
+        g = objective.get_objective(
+            scenario=scenario,
+            vehicle_station_utilisation_function=utilisation.given_utilisations,
+            allocation_primary=allocation_61[:67],
+            allocation_secondary=allocation_61[67:],
+            given_utilisations_primary=given_utilisations_primary_61,
+            given_utilisations_secondary=given_utilisations_secondary_61,
+        )
+        assert np.isclose(g * 1440, 232.2921043699148)
+
+        utilisations = utilisation.solve_utilisations(
+            allocation_primary=allocation_96[:67],
+            allocation_secondary=allocation_96[67:],
+            scenario=scenario,
+            use_jacobian=True,
+        )
+        expected_utilisations = utilisation.solve_utilisations(
+            allocation_primary=allocation_96[:67],
+            allocation_secondary=allocation_96[67:],
+            beta=beta,
+            R=R,
+            demand_rates=demand_rates,
+            service_rate_primary=service_rate_primary,
+            service_rate_secondary=service_rate_secondary,
+            use_jacobian=True,
+        )
+        for vehicle_utilisations, expected_vehicle_utilisations in zip(
+            utilisations, expected_utilisations
+        ):
+            assert np.allclose(vehicle_utilisations, expected_vehicle_utilisations)
+
+    population = np.array(
+        [
+            [allocation[:67], allocation[67:]]
+            for allocation in (allocation_61, allocation_82, allocation_96)
+        ]
+    )
+    objective_values = objective.get_objective_batch(
+        population=population,
+        scenario=scenario,
+        vehicle_station_utilisation_function=utilisation.solve_utilisations_batch,
+        vectorised_utilisation_function=True,
+    )
+    expected_objective_values = objective.get_objective_batch(
+        population=population,
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        vehicle_station_utilisation_function=utilisation.solve_utilisations_batch,
+        vectorised_utilisation_function=True,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+    )
+    assert np.allclose(objective_values, expected_objective_values)
+
+
+def test_scenario_fingerprint():
+    """
+    Tests that the fingerprint of a scenario does not depend on how beta and R
+    are stored, but does depend on the neighbour index used in their place by
+    the "sorted" engine and on the overall utilisation limit.
+    """
+    scenario_arguments = dict(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+    )
+    fingerprints = {
+        objective.Scenario(
+            beta=get_preferences(beta), R=get_preferences(R), **scenario_arguments
+        ).get_fingerprint()
+        for get_preferences in (
+            lambda preferences: preferences,
+            lambda preferences: preferences.astype(bool),
+            objective.pack_preferences,
+        )
+    }
+    assert len(fingerprints) == 1
+
+    scenario = objective.Scenario(beta=beta, R=R, **scenario_arguments)
+    assert scenario.get_fingerprint() != scenario.get_fingerprint(
+        overall_utilisation_limit=0.95
+    )
+
+    sorted_fingerprints = set()
+    for travel_times in (raw_travel_times, raw_travel_times[::-1]):
+        scenario = objective.Scenario(
+            beta=None,
+            R=None,
+            closer_busy_engine="sorted",
+            neighbour_index=objective.get_neighbour_index(
+                travel_times=travel_times,
+                primary_vehicle_travel_times=travel_times / 0.75,
+                secondary_vehicle_travel_times=travel_times / 1.215,
+            ),
+            **scenario_arguments,
+        )
+        sorted_fingerprints.add(scenario.get_fingerprint())
+    assert len(sorted_fingerprints) == 2
+
+
+def test_scenario_sparsity():
+    """
+    Tests that the A1 class only has demand at 92 pickup locations and that
+    restricting every class to its active pickup locations gives the same
+    weighted survivals as summing over every pickup location.
+    """
+    scenario = objective.Scenario(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+    )
+    assert [len(pickups) for pickups in scenario.active_pickups] == [92, 261, 261]
+    assert np.array_equal(
+        scenario.active_pickups[0], np.flatnonzero(demand_rates[0] > 0)
+    )
+    assert np.allclose(
+        scenario.primary_single_survivals,
+        np.einsum(
+            "kp,kpa->pa",
+            weights_single_vehicle[:, None] * demand_rates,
+            primary_survivals,
+        ),
+        rtol=1e-12,
+    )
+    assert np.allclose(
+        scenario.secondary_multiple_survivals,
+        np.einsum(
+            "kp,kpa->pa",
+            weights_multiple_vehicles[:, None] * demand_rates,
+            secondary_survivals,
+        ),
+        rtol=1e-12,
+    )
+    statistics = scenario.get_sparsity_statistics()
+    assert statistics["class_0_active_pickups"] == 92
+    assert statistics["psi_dense_elements"] == 5 * 261 * 67
+    assert statistics["psi_sparse_elements"] == (261 + 2 * 92 + 2 * 261) * 67
+    assert statistics["psi_bytes_saved"] == 2 * (261 - 92) * 67 * 8
+
+
+def test_objective_function_with_no_secondary_vehicles():
+    """
+    Tests that the single fleet evaluation used when there are no secondary
+    vehicles gives the same objective function values as the full formulation
+    with its secondary terms.
+    """
+    allocation_primary = allocation_61[:67]
+    allocation_secondary = np.zeros(67, dtype=np.int64)
+    utilisations_primary = given_utilisations_primary_61
+    utilisations_secondary = given_utilisations_secondary_61
+
+    primary_is_not_busy = objective.get_is_not_busy_vector(
+        utilisations_primary, allocation_primary
+    )
+    secondary_is_not_busy = objective.get_is_not_busy_vector(
+        utilisations_secondary, allocation_secondary
+    )
+    all_closer_busy_primary = objective.get_all_same_closer_busy_vector(
+        utilisations_primary, allocation_primary, beta
+    )
+    psi = objective.get_psi(
+        primary_survivals, primary_is_not_busy, all_closer_busy_primary
+    )
+    psi_tilde = objective.get_psi_tilde(
+        primary_survivals,
+        secondary_survivals,
+        primary_is_not_busy,
+        secondary_is_not_busy,
+        all_closer_busy_primary,
+        objective.get_all_same_closer_busy_vector(
+            utilisations_secondary, allocation_secondary, beta
+        ),
+        objective.get_all_secondary_closer_busy_vector(
+            utilisations_secondary, allocation_secondary, R
+        ),
+        objective.get_all_primary_closer_busy_vector(
+            utilisations_primary, allocation_primary, R
+        ),
+    )
+    expected_g = (
+        ((psi.T * weights_single_vehicle) * demand_rates.T).sum(axis=2)
+        + ((psi_tilde.T * weights_multiple_vehicles) * demand_rates.T).sum(axis=2)
+    ).sum()
+
+    arguments = dict(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+    )
+    for closer_busy_engine in ("power", "log"):
+        g = objective.get_objective(
+            **arguments,
+            vehicle_station_utilisation_function=utilisation.given_utilisations,
+            allocation_primary=allocation_primary,
+            allocation_secondary=allocation_secondary,
+            closer_busy_engine=closer_busy_engine,
+            given_utilisations_primary=utilisations_primary,
+            given_utilisations_secondary=utilisations_secondary,
+        )
+        assert np.isclose(g, expected_g)
+    g = objective.get_objective(
+        scenario=objective.Scenario(**arguments),
+        vehicle_station_utilisation_function=utilisation.given_utilisations,
+        allocation_primary=allocation_primary,
+        allocation_secondary=allocation_secondary,
+        given_utilisations_primary=utilisations_primary,
+        given_utilisations_secondary=utilisations_secondary,
+    )
+    assert np.isclose(g, expected_g)
+
+    population = np.array(
+        [
+            [allocation_primary, allocation_secondary],
+            [allocation_primary, allocation_61[67:]],
+        ]
+    )
+    objective_values = objective.get_objective_batch(
+        population=population,
+        **arguments,
+        vehicle_station_utilisation_function=utilisation.given_utilisations,
+        given_utilisations_primary=utilisations_primary,
+        given_utilisations_secondary=utilisations_secondary,
+    )
+    assert np.isclose(objective_values[0], expected_g)
+    assert np.isclose(objective_values[1] * 1440, 232.2921043699148)
+
+
+def test_incremental_objective():
+    """
+    Tests that updating the evaluation of an allocation after chains of 1 to 6
+    moves gives the same objective function values as evaluating the moved
+    allocations from scratch, whether the log sums are updated or recomputed.
+    """
+    scenario = objective.Scenario(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=objective.pack_preferences(beta),
+        R=objective.pack_preferences(R),
+    )
+    utilisations = dict(
+        given_utilisations_primary=given_utilisations_primary_61,
+        given_utilisations_secondary=given_utilisations_secondary_61,
+    )
+    state = objective.IncrementalObjective(
+        scenario=scenario,
+        vehicle_station_utilisation_function=utilisation.given_utilisations,
+        allocation_primary=allocation_61[:67],
+        allocation_secondary=allocation_61[67:],
+        **utilisations,
+    )
+    assert np.isclose(state.value * 1440, 232.2921043699148)
+    assert state.get_updated(allocation_61[:67], allocation_61[67:]) is state
+    other_state = objective.IncrementalObjective(
+        scenario=scenario,
+        vehicle_station_utilisation_function=utilisation.given_utilisations,
+        allocation_primary=allocation_68[:67],
+        allocation_secondary=allocation_68[67:],
+        **utilisations,
+    )
+    assert scenario.get_float_preferences()[0] is scenario.float_preferences[0]
+    assert np.array_equal(scenario.get_float_preferences()[0], beta)
+    assert not hasattr(other_state, "beta")
+    assert pickle.loads(pickle.dumps(state)).scenario.float_preferences is None
+
+    np.random.seed(0)
+    primary_allocation, secondary_allocation = allocation_61[:67], allocation_61[67:]
+    for times_to_repeat in range(1, 7):
+        primary_allocation, secondary_allocation = optimisation.repeat_mutation(
+            mutation_function=optimisation.mutate_retain_vehicle_numbers,
+            times_to_repeat=times_to_repeat,
+            primary_allocation=primary_allocation,
+            secondary_allocation=secondary_allocation,
+            max_primary=5,
+            max_secondary=15,
+        )
+        expected_value = objective.get_objective(
+            scenario=scenario,
+            vehicle_station_utilisation_function=utilisation.given_utilisations,
+            allocation_primary=primary_allocation,
+            allocation_secondary=secondary_allocation,
+            **utilisations,
+        )
+        updated_state = state.get_updated(primary_allocation, secondary_allocation)
+        assert np.isclose(updated_state.value, expected_value, rtol=1e-12)
+        state.maximum_updated_stations = 0
+        recomputed_state = state.get_updated(primary_allocation, secondary_allocation)
+        assert np.isclose(recomputed_state.value, expected_value, rtol=1e-12)
+        state.maximum_updated_stations = 16
+        state = updated_state
+
+
+def test_incremental_objective_with_solved_utilisations():
+    """
+    Tests that the utilisations of an updated allocation are solved starting
+    from the demand rates of the original one.
+    """
+    scenario = objective.Scenario(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta,
+        R=R,
+        service_rate_primary=1 / (4.5 * 60),
+        service_rate_secondary=1 / (3.5 * 60),
+    )
+    state = objective.IncrementalObjective(
+        scenario=scenario,
+        vehicle_station_utilisation_function=utilisation.solve_utilisations,
+        allocation_primary=allocation_82[:67],
+        allocation_secondary=allocation_82[67:],
+        use_jacobian=True,
+    )
+    assert state.solver_info["warm_start"] is False
+
+    np.random.seed(1)
+    primary_allocation, secondary_allocation = optimisation.move_vehicle_of_same_type(
+        allocation_for_moving=allocation_82[:67],
+        allocation_not_for_moving=allocation_82[67:],
+        max_allocation=5,
+    )
+    updated_state = state.get_updated(primary_allocation, secondary_allocation)
+    expected_value = objective.get_objective(
+        scenario=scenario,
+        vehicle_station_utilisation_function=utilisation.solve_utilisations,
+        allocation_primary=primary_allocation,
+        allocation_secondary=secondary_allocation,
+        use_jacobian=True,
+    )
+    assert updated_state.solver_info["warm_start"] is True
+    assert updated_state.solver_info["kept"] == (False, False)
+    assert updated_state.solver_info["evaluations"] < state.solver_info["evaluations"]
+    assert np.isclose(updated_state.value, expected_value)
+
+    # After a move of secondary vehicles the primary demand rates are kept,
+    # so the primary log sums are not recomputed.
+    secondary_allocation, primary_allocation = optimisation.move_vehicle_of_same_type(
+        allocation_for_moving=allocation_82[67:],
+        allocation_not_for_moving=allocation_82[:67],
+        max_allocation=5,
+    )
+    updated_state = state.get_updated(primary_allocation, secondary_allocation)
+    expected_value = objective.get_objective(
+        scenario=scenario,
+        vehicle_station_utilisation_function=utilisation.solve_utilisations,
+        allocation_primary=primary_allocation,
+        allocation_secondary=secondary_allocation,
+        use_jacobian=True,
+    )
+    assert updated_state.solver_info["kept"] == (True, False)
+    assert np.array_equal(updated_state.utilisations[0], state.utilisations[0])
+    for name in ("closer_busy_primary", "primary_closer_than_secondary_busy"):
+        assert updated_state.log_sums[name] is state.log_sums[name]
+    assert np.isclose(updated_state.value, expected_value, rtol=1e-8)
+
+
+def test_reduced_precision_keeps_ranking():
+    """
+    Tests that evaluating the one vehicle neighbours of the allocation of
+    resource level 61 (from `get_marginal_gains`) in float32, with the given
+    utilisations and with utilisations solved in float32, ranks them as in
+    float64, although many of them are within 1e-7 of each other, with
+    marginal gains within 1e-7 of those in float64. Also tests that the
+    utilisations solved in float32 are within 1e-3 of those solved in float64.
+    """
+    scenario = objective.Scenario(
+        demand_rates=demand_rates,
+        primary_survivals=primary_survivals,
+        secondary_survivals=secondary_survivals,
+        weights_single_vehicle=weights_single_vehicle,
+        weights_multiple_vehicles=weights_multiple_vehicles,
+        beta=beta.astype(bool),
+        R=R.astype(bool),
+        service_rate_primary=1 / (4.5 * 60),
+        service_rate_secondary=1 / (3.5 * 60),
+    )
+    moves = ("add_primary", "remove_primary", "add_secondary", "remove_secondary")
+    utilisation_arguments = (
+        dict(
+            vehicle_station_utilisation_function=utilisation.given_utilisations,
+            given_utilisations_primary=given_utilisations_primary_61,
+            given_utilisations_secondary=given_utilisations_secondary_61,
+        ),
+        dict(
+            vehicle_station_utilisation_function=utilisation.solve_utilisations_batch,
+            vectorised_utilisation_function=True,
+        ),
+    )
+    for closer_busy_engine in ("power", "log"):
+        for arguments in utilisation_arguments:
+            marginal_gains = {
+                dtype: objective.get_marginal_gains(
+                    allocation_primary=allocation_61[:67],
+                    allocation_secondary=allocation_61[67:],
+                    scenario=scenario,
+                    closer_busy_engine=closer_busy_engine,
+                    dtype=dtype,
+                    **arguments,
+                )
+                for dtype in (np.float64, np.float32)
+            }
+            gains = {}
+            for dtype, dtype_marginal_gains in marginal_gains.items():
+                gains[dtype] = np.concatenate(
+                    [dtype_marginal_gains[move] for move in moves]
+                )
+                gains[dtype] = gains[dtype][~np.isnan(gains[dtype])]
+            assert len(gains[np.float64]) == 186
+            assert np.min(np.diff(np.sort(gains[np.float64]))) < 1e-7
+            assert np.array_equal(
+                np.argsort(gains[np.float32]), np.argsort(gains[np.float64])
+            )
+            assert np.allclose(gains[np.float32], gains[np.float64], rtol=0, atol=1e-7)
+            assert np.isclose(
+                marginal_gains[np.float32]["objective"],
+                marginal_gains[np.float64]["objective"],
+                rtol=1e-5,
+                atol=0,
+            )
+
+    utilisations = {
+        dtype: utilisation.solve_utilisations(
+            allocation_primary=allocation_96[:67],
+            allocation_secondary=allocation_96[67:],
+            scenario=scenario,
+            use_jacobian=True,
+            dtype=dtype,
+        )
+        for dtype in (np.float64, np.float32)
+    }
+    for vehicle_utilisations, expected_vehicle_utilisations in zip(
+        utilisations[np.float32], utilisations[np.float64]
+    ):
+        assert np.allclose(
+            vehicle_utilisations, expected_vehicle_utilisations, rtol=0, atol=1e-3
+        )
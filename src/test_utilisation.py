@@ -1,6 +1,8 @@
 import utilisation
 import objective
 import numpy as np
+import pytest
+import time
 
 
 def test_constant_utilisation():
@@ -76,6 +78,16 @@ def test_get_lambda_differences_primary():
     assert round(diffs_0.min(), 7) == 0.0000986
     assert round(diffs_0.max(), 7) == 0.0140919
 
+    diffs_precomputed = utilisation.get_lambda_differences_primary(
+        lhs=np.zeros(67),
+        service_rate_primary=service_rate_primary,
+        allocation_primary=allocation_primary,
+        beta=beta,
+        demand_rates=None,
+        pickup_demand_rates=demand_rates.sum(axis=0),
+    )
+    assert np.allclose(diffs_precomputed, diffs_0)
+
 
 def test_get_lambda_differences_secondary():
     ## Time units in minutes
@@ -111,6 +123,19 @@ def test_get_lambda_differences_secondary():
     assert round(diffs_0.min(), 7) == 0.0000397
     assert round(diffs_0.max(), 7) == 0.0072913
 
+    diffs_precomputed = utilisation.get_lambda_differences_secondary(
+        lhs=np.zeros(67),
+        service_rate_secondary=service_rate_secondary,
+        allocation_secondary=allocation_secondary,
+        allocation_primary=allocation_primary,
+        utilisations_primary=primary_utilisations,
+        beta=beta,
+        R=R,
+        demand_rates=None,
+        pickup_demand_rates=demand_rates[:-1].sum(axis=0),
+    )
+    assert np.allclose(diffs_precomputed, diffs_0)
+
 
 def test_solve_utilisations():
     ## Time units in minutes
@@ -191,3 +216,637 @@ def test_solve_utilisations_when_flooding():
     )
     assert np.allclose(primary_utilisations, np.array([0.99 for _ in range(67)]))
     assert np.allclose(secondary_utilisations, np.array([0.99 for _ in range(67)]))
+
+
+def test_solve_utilisations_with_sorted_engine():
+    ## Time units in minutes
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    primary_vehicle_travel_times = raw_travel_times / 0.75
+    secondary_vehicle_travel_times = raw_travel_times / 1.215
+    neighbour_index = objective.get_neighbour_index(
+        travel_times=raw_travel_times,
+        primary_vehicle_travel_times=primary_vehicle_travel_times,
+        secondary_vehicle_travel_times=secondary_vehicle_travel_times,
+    )
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    service_rate_primary = 1 / (4.5 * 60)
+    service_rate_secondary = 1 / (3.5 * 60)
+    allocation_primary = np.ones(67)
+    allocation_secondary = np.ones(67)
+
+    primary_utilisations, secondary_utilisations = utilisation.solve_utilisations(
+        allocation_primary=allocation_primary,
+        allocation_secondary=allocation_secondary,
+        beta=None,
+        R=None,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        closer_busy_engine="sorted",
+        neighbour_index=neighbour_index,
+    )
+
+    assert np.isclose(
+        (primary_utilisations * service_rate_primary * allocation_primary).sum() * 1440,
+        262.1546962546663,
+    )
+    assert np.isclose(
+        (secondary_utilisations * service_rate_secondary * allocation_secondary).sum()
+        * 1440,
+        158.21533513661336,
+    )
+
+
+def test_get_lambda_differences_with_compact_beta_and_R():
+    ## Time units in minutes
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    service_rate_primary = 1 / (4.5 * 60)
+    service_rate_secondary = 1 / (3.5 * 60)
+    allocation_primary = np.ones(67)
+    allocation_secondary = np.ones(67)
+    primary_utilisations = np.ones(67) * 0.6
+
+    for compact_beta, compact_R in (
+        (beta, R),
+        (objective.pack_preferences(beta), objective.pack_preferences(R)),
+    ):
+        diffs_primary = utilisation.get_lambda_differences_primary(
+            lhs=np.zeros(67),
+            service_rate_primary=service_rate_primary,
+            allocation_primary=allocation_primary,
+            beta=compact_beta,
+            demand_rates=demand_rates,
+        )
+        diffs_secondary = utilisation.get_lambda_differences_secondary(
+            lhs=np.zeros(67),
+            service_rate_secondary=service_rate_secondary,
+            allocation_secondary=allocation_secondary,
+            allocation_primary=allocation_primary,
+            utilisations_primary=primary_utilisations,
+            beta=compact_beta,
+            R=compact_R,
+            demand_rates=demand_rates,
+        )
+
+        assert round(diffs_primary.sum(), 7) == 0.1823491
+        assert round(diffs_primary.max(), 7) == 0.0140919
+        assert round(diffs_secondary.sum(), 7) == 0.1029984
+        assert round(diffs_secondary.max(), 7) == 0.0072913
+
+
+def test_solve_utilisations_unpacks_preferences_once(monkeypatch):
+    ## Time units in minutes
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    arguments = dict(
+        allocation_primary=np.ones(67),
+        allocation_secondary=np.ones(67),
+        demand_rates=demand_rates,
+        service_rate_primary=1 / (4.5 * 60),
+        service_rate_secondary=1 / (3.5 * 60),
+        use_jacobian=True,
+    )
+    expected_utilisations = utilisation.solve_utilisations(beta=beta, R=R, **arguments)
+
+    unpackbits = np.unpackbits
+    unpacked = []
+
+    def counted_unpackbits(*args, **kwargs):
+        unpacked.append(args)
+        return unpackbits(*args, **kwargs)
+
+    monkeypatch.setattr(np, "unpackbits", counted_unpackbits)
+    utilisations = utilisation.solve_utilisations(
+        beta=objective.pack_preferences(beta),
+        R=objective.pack_preferences(R),
+        **arguments,
+    )
+    # Beta and R are unpacked once each, not by every residual evaluation.
+    assert len(unpacked) == 2
+    for vehicle_utilisations, expected_vehicle_utilisations in zip(
+        utilisations, expected_utilisations
+    ):
+        assert np.array_equal(vehicle_utilisations, expected_vehicle_utilisations)
+
+
+def test_jacobians_match_finite_differences():
+    ## Time units in minutes
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times)
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    service_rate_primary = 1 / (4.5 * 60)
+    service_rate_secondary = 1 / (3.5 * 60)
+    np.random.seed(0)
+    allocation_primary = np.random.randint(0, 3, 67)
+    allocation_secondary = np.random.randint(0, 3, 67)
+    primary_utilisations = np.random.random(67) * 0.8
+    lhs = np.random.random(67) * 0.01
+    lhs[np.where(allocation_primary)[0][:3]] = 0
+
+    for residual, jacobian, args in (
+        (
+            utilisation.get_lambda_differences_primary,
+            utilisation.get_lambda_differences_primary_jacobian,
+            (service_rate_primary, allocation_primary, beta, demand_rates),
+        ),
+        (
+            utilisation.get_lambda_differences_secondary,
+            utilisation.get_lambda_differences_secondary_jacobian,
+            (
+                service_rate_secondary,
+                allocation_secondary,
+                allocation_primary,
+                primary_utilisations,
+                beta,
+                R,
+                demand_rates,
+            ),
+        ),
+    ):
+        step = 1e-9
+        differences = residual(lhs, *args)
+        finite_differences = np.array(
+            [
+                (residual(lhs + step * direction, *args) - differences) / step
+                for direction in np.eye(67)
+            ]
+        ).T
+        analytic = jacobian(lhs, *args)
+        assert analytic.shape == (67, 67)
+        assert np.allclose(analytic, finite_differences, rtol=1e-4, atol=1e-5)
+
+
+def test_solve_utilisations_with_jacobian():
+    ## Time units in minutes
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    service_rate_primary = 1 / (4.5 * 60)
+    service_rate_secondary = 1 / (3.5 * 60)
+    allocation_primary = np.ones(67)
+    allocation_secondary = np.ones(67)
+
+    primary_utilisations, secondary_utilisations = utilisation.solve_utilisations(
+        allocation_primary=allocation_primary,
+        allocation_secondary=allocation_secondary,
+        beta=beta,
+        R=R,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        use_jacobian=True,
+    )
+
+    assert np.isclose(
+        (primary_utilisations * service_rate_primary * allocation_primary).sum() * 1440,
+        262.1546962546663,
+    )
+    assert np.isclose(
+        (secondary_utilisations * service_rate_secondary * allocation_secondary).sum()
+        * 1440,
+        158.21533513661336,
+    )
+
+
+def test_solve_utilisations_with_warm_start():
+    ## Time units in minutes
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    service_rate_primary = 1 / (4.5 * 60)
+    service_rate_secondary = 1 / (3.5 * 60)
+    allocation_primary = np.ones(67)
+    allocation_secondary = np.ones(67)
+
+    cold_solver_info = {}
+    cold_utilisations = utilisation.solve_utilisations(
+        allocation_primary=allocation_primary,
+        allocation_secondary=allocation_secondary,
+        beta=beta,
+        R=R,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        solver_info=cold_solver_info,
+    )
+    assert cold_solver_info["warm_start"] is False
+    assert cold_solver_info["evaluations"] > 0
+    assert [len(lambdas) for lambdas in cold_solver_info["lambdas"]] == [67, 67]
+
+    mutated_allocation_primary = allocation_primary.copy()
+    mutated_allocation_primary[[0, 1]] = [2, 0]
+    mutated_cold_solver_info = {}
+    mutated_cold_utilisations = utilisation.solve_utilisations(
+        allocation_primary=mutated_allocation_primary,
+        allocation_secondary=allocation_secondary,
+        beta=beta,
+        R=R,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        solver_info=mutated_cold_solver_info,
+    )
+    warm_solver_info = {}
+    warm_utilisations = utilisation.solve_utilisations(
+        allocation_primary=mutated_allocation_primary,
+        allocation_secondary=allocation_secondary,
+        beta=beta,
+        R=R,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        starting_lambdas=cold_solver_info["lambdas"],
+        solver_info=warm_solver_info,
+    )
+
+    assert warm_solver_info["warm_start"] is True
+    assert warm_solver_info["evaluations"] < mutated_cold_solver_info["evaluations"]
+    for warm, cold in zip(warm_utilisations, mutated_cold_utilisations):
+        assert np.allclose(warm, cold)
+    assert not np.allclose(cold_utilisations[0], warm_utilisations[0])
+
+    # Demand rates whose residuals are within the tolerance are kept, as are
+    # the primary ones solved for the same primary allocation.
+    kept_solver_info = {}
+    kept_utilisations = utilisation.solve_utilisations(
+        allocation_primary=mutated_allocation_primary,
+        allocation_secondary=allocation_secondary,
+        beta=beta,
+        R=R,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        starting_lambdas=(
+            warm_solver_info["lambdas"][0],
+            cold_solver_info["lambdas"][1],
+        ),
+        residual_tolerance=1e-7,
+        solver_info=kept_solver_info,
+    )
+    assert kept_solver_info["kept"] == (True, False)
+    assert np.array_equal(kept_utilisations[0], warm_utilisations[0])
+    assert np.allclose(kept_utilisations[1], warm_utilisations[1])
+    assert kept_solver_info["evaluations"] < warm_solver_info["evaluations"]
+
+    # Solving the secondary vehicles from the default is not a warm start.
+    half_warm_solver_info = {}
+    utilisation.solve_utilisations(
+        allocation_primary=mutated_allocation_primary,
+        allocation_secondary=allocation_secondary,
+        beta=beta,
+        R=R,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        starting_lambdas=(cold_solver_info["lambdas"][0], None),
+        solver_info=half_warm_solver_info,
+    )
+    assert half_warm_solver_info["warm_start"] is False
+
+
+def test_solve_utilisations_batch():
+    ## Time units in minutes
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    service_rate_primary = 1 / (4.5 * 60)
+    service_rate_secondary = 1 / (3.5 * 60)
+    allocations_primary = np.ones((3, 67))
+    allocations_primary[1, :10] = 0
+    allocations_primary[1, 10:20] = 2
+    allocations_secondary = np.ones((3, 67))
+    allocations_secondary[2, 3:] = 0
+
+    solver_infos = [{} for _ in range(3)]
+    primary_utilisations, secondary_utilisations = utilisation.solve_utilisations_batch(
+        allocation_primary=allocations_primary,
+        allocation_secondary=allocations_secondary,
+        beta=beta,
+        R=R,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        solver_infos=solver_infos,
+    )
+
+    assert primary_utilisations.shape == (3, 67)
+    assert secondary_utilisations.shape == (3, 67)
+    for index in range(3):
+        expected = utilisation.solve_utilisations(
+            allocation_primary=allocations_primary[index],
+            allocation_secondary=allocations_secondary[index],
+            beta=beta,
+            R=R,
+            demand_rates=demand_rates,
+            service_rate_primary=service_rate_primary,
+            service_rate_secondary=service_rate_secondary,
+            use_jacobian=True,
+        )
+        assert np.allclose(primary_utilisations[index], expected[0], atol=1e-7)
+        assert np.allclose(secondary_utilisations[index], expected[1], atol=1e-7)
+        assert solver_infos[index]["warm_start"] is False
+        assert solver_infos[index]["evaluations"] > 0
+        assert solver_infos[index]["resolved"] is False
+
+    # The third member floods its secondary vehicles
+    assert np.allclose(secondary_utilisations[2], 0.99)
+    assert solver_infos[2]["lambdas"][1] is None
+
+    single_solver_info = {}
+    single_utilisations = utilisation.solve_utilisations_batch(
+        allocation_primary=allocations_primary[0],
+        allocation_secondary=allocations_secondary[0],
+        beta=beta,
+        R=R,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        starting_lambdas=solver_infos[0]["lambdas"],
+        solver_info=single_solver_info,
+    )
+    assert single_utilisations[0].shape == (67,)
+    assert np.allclose(single_utilisations[0], primary_utilisations[0])
+    assert np.allclose(single_utilisations[1], secondary_utilisations[0])
+    assert single_solver_info["warm_start"] is True
+
+    half_warm_solver_info = {}
+    utilisation.solve_utilisations_batch(
+        allocation_primary=allocations_primary[0],
+        allocation_secondary=allocations_secondary[0],
+        beta=beta,
+        R=R,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        starting_lambdas=(solver_infos[0]["lambdas"][0], None),
+        solver_info=half_warm_solver_info,
+    )
+    assert half_warm_solver_info["warm_start"] is False
+    assert single_solver_info["evaluations"] < solver_infos[0]["evaluations"]
+
+    # Members still moving after the last step are solved again by fsolve.
+    primary_cache = {}
+    resolved_utilisations = utilisation.solve_utilisations_batch(
+        allocation_primary=allocations_primary,
+        allocation_secondary=allocations_secondary,
+        beta=beta,
+        R=R,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        maximum_iterations=1,
+        solver_infos=solver_infos,
+        primary_cache=primary_cache,
+    )
+    for index in range(3):
+        assert solver_infos[index]["resolved"] is True
+        for vehicle_utilisations, expected_vehicle_utilisations in zip(
+            resolved_utilisations, (primary_utilisations, secondary_utilisations)
+        ):
+            assert np.allclose(
+                vehicle_utilisations[index],
+                expected_vehicle_utilisations[index],
+                atol=1e-7,
+            )
+    assert len(primary_cache) == 2
+
+
+def test_solve_utilisations_with_no_secondary_vehicles():
+    ## Time units in minutes
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    service_rate_primary = 1 / (4.5 * 60)
+    service_rate_secondary = 1 / (3.5 * 60)
+    allocations_primary = np.ones((2, 67))
+    allocations_secondary = np.zeros((2, 67))
+    allocations_secondary[1] = 1
+
+    # No secondary solve is attempted, so there is no division by zero.
+    with np.errstate(divide="raise"):
+        solver_info = {}
+        primary_utilisations, secondary_utilisations = utilisation.solve_utilisations(
+            allocation_primary=allocations_primary[0],
+            allocation_secondary=allocations_secondary[0],
+            beta=beta,
+            R=R,
+            demand_rates=demand_rates,
+            service_rate_primary=service_rate_primary,
+            service_rate_secondary=service_rate_secondary,
+            use_jacobian=True,
+            solver_info=solver_info,
+        )
+        solver_infos = [{}, {}]
+        batch_utilisations = utilisation.solve_utilisations_batch(
+            allocation_primary=allocations_primary,
+            allocation_secondary=allocations_secondary,
+            beta=beta,
+            R=R,
+            demand_rates=demand_rates,
+            service_rate_primary=service_rate_primary,
+            service_rate_secondary=service_rate_secondary,
+            solver_infos=solver_infos,
+        )
+
+    assert np.allclose(secondary_utilisations, 0.99)
+    assert solver_info["lambdas"][1] is None
+    primary_solver_info = {}
+    expected_primary_utilisations = utilisation.solve_utilisations_primary(
+        allocation_primary=allocations_primary[0],
+        beta=beta,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        use_jacobian=True,
+        solver_info=primary_solver_info,
+    )
+    assert np.allclose(primary_utilisations, expected_primary_utilisations)
+    assert solver_info["evaluations"] == primary_solver_info["evaluations"]
+
+    assert np.allclose(batch_utilisations[0][0], primary_utilisations, atol=1e-7)
+    assert np.allclose(batch_utilisations[1][0], 0.99)
+    assert solver_infos[0]["lambdas"][1] is None
+    expected = utilisation.solve_utilisations(
+        allocation_primary=allocations_primary[1],
+        allocation_secondary=allocations_secondary[1],
+        beta=beta,
+        R=R,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        use_jacobian=True,
+    )
+    assert np.allclose(batch_utilisations[0][1], expected[0], atol=1e-7)
+    assert np.allclose(batch_utilisations[1][1], expected[1], atol=1e-7)
+
+
+def test_solve_utilisations_with_primary_cache():
+    ## Time units in minutes
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times, dtype=bool)
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    service_rate_primary = 1 / (4.5 * 60)
+    service_rate_secondary = 1 / (3.5 * 60)
+    allocation_primary = np.ones(67, dtype=np.int64)
+    allocation_secondary = np.ones(67, dtype=np.int64)
+    other_allocation_secondary = np.ones(67, dtype=np.int64)
+    other_allocation_secondary[[0, 1]] = [2, 0]
+
+    primary_cache = {}
+    solver_infos = [{}, {}]
+    for solver_info, secondary in zip(
+        solver_infos, (allocation_secondary, other_allocation_secondary)
+    ):
+        primary_utilisations, secondary_utilisations = utilisation.solve_utilisations(
+            allocation_primary=allocation_primary,
+            allocation_secondary=secondary,
+            beta=beta,
+            R=R,
+            demand_rates=demand_rates,
+            service_rate_primary=service_rate_primary,
+            service_rate_secondary=service_rate_secondary,
+            use_jacobian=True,
+            solver_info=solver_info,
+            primary_cache=primary_cache,
+        )
+
+    assert list(primary_cache) == [objective.get_allocation_key(allocation_primary)]
+    assert [info["primary_cache_hit"] for info in solver_infos] == [False, True]
+    assert solver_infos[1]["evaluations"] < solver_infos[0]["evaluations"]
+
+    expected = utilisation.solve_utilisations(
+        allocation_primary=allocation_primary,
+        allocation_secondary=other_allocation_secondary,
+        beta=beta,
+        R=R,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        use_jacobian=True,
+    )
+    assert np.array_equal(primary_utilisations, expected[0])
+    assert np.array_equal(secondary_utilisations, expected[1])
+
+    batch_solver_infos = [{}, {}]
+    batch_utilisations = utilisation.solve_utilisations_batch(
+        allocation_primary=np.array([allocation_primary, allocation_primary + 1]),
+        allocation_secondary=np.array([allocation_secondary, allocation_secondary]),
+        beta=beta,
+        R=R,
+        demand_rates=demand_rates,
+        service_rate_primary=service_rate_primary,
+        service_rate_secondary=service_rate_secondary,
+        solver_infos=batch_solver_infos,
+        primary_cache=primary_cache,
+    )
+    assert [info["primary_cache_hit"] for info in batch_solver_infos] == [True, False]
+    assert np.array_equal(batch_utilisations[0][0], expected[0])
+    assert len(primary_cache) == 2
+
+    bounded_primary_cache = objective.ObjectiveCache(maximum_size=1)
+    for allocation in (allocation_primary, allocation_primary + 1, allocation_primary):
+        solver_info = {}
+        utilisation.solve_utilisations(
+            allocation_primary=allocation,
+            allocation_secondary=allocation_secondary,
+            beta=beta,
+            R=R,
+            demand_rates=demand_rates,
+            service_rate_primary=service_rate_primary,
+            service_rate_secondary=service_rate_secondary,
+            use_jacobian=True,
+            solver_info=solver_info,
+            primary_cache=bounded_primary_cache,
+        )
+        assert solver_info["primary_cache_hit"] is False
+    assert len(bounded_primary_cache) == 1
+    assert bounded_primary_cache.evictions == 2
+
+    # The cache shared by process based workers is bounded in the same way
+    # and is read for the whole batch at once.
+    with objective.ObjectiveCacheManager() as manager:
+        shared_primary_cache = objective.SharedObjectiveCache(manager, maximum_size=1)
+        utilisation.solve_utilisations_batch(
+            allocation_primary=np.array([allocation_primary, allocation_primary + 1]),
+            allocation_secondary=np.array([allocation_secondary, allocation_secondary]),
+            beta=beta,
+            R=R,
+            demand_rates=demand_rates,
+            service_rate_primary=service_rate_primary,
+            service_rate_secondary=service_rate_secondary,
+            primary_cache=shared_primary_cache,
+        )
+        assert len(shared_primary_cache) == 1
+        assert shared_primary_cache.evictions == 1
+        assert shared_primary_cache.misses == 2
+
+
+@pytest.mark.parametrize("use_jacobian", [False, True])
+def test_benchmark_solve_utilisations(benchmark, monkeypatch, use_jacobian):
+    """
+    Benchmarks solving the utilisations with and without the analytic
+    Jacobian. The number of residual evaluations and the wall time of a single
+    solve are recorded in the benchmark's extra information.
+    """
+    ## Time units in minutes
+    raw_travel_times = np.genfromtxt(
+        "./test_data/travel_times_matrix.csv", delimiter=","
+    )
+    beta, R = objective.get_beta_and_R(raw_travel_times)
+    demand_rates = np.genfromtxt("./test_data/demand.csv", delimiter=",") / 1440
+    service_rate_primary = 1 / (4.5 * 60)
+    service_rate_secondary = 1 / (3.5 * 60)
+
+    residual_evaluations = []
+    for name in ("get_lambda_differences_primary", "get_lambda_differences_secondary"):
+        residual = getattr(utilisation, name)
+
+        def counted_residual(*args, residual=residual):
+            residual_evaluations.append(1)
+            return residual(*args)
+
+        monkeypatch.setattr(utilisation, name, counted_residual)
+
+    def solve():
+        return utilisation.solve_utilisations(
+            allocation_primary=np.ones(67),
+            allocation_secondary=np.ones(67),
+            beta=beta,
+            R=R,
+            demand_rates=demand_rates,
+            service_rate_primary=service_rate_primary,
+            service_rate_secondary=service_rate_secondary,
+            use_jacobian=use_jacobian,
+        )
+
+    start = time.perf_counter()
+    solve()
+    benchmark.extra_info["wall_time"] = time.perf_counter() - start
+    benchmark.extra_info["residual_evaluations"] = len(residual_evaluations)
+    primary_utilisations, secondary_utilisations = benchmark(solve)
+
+    assert len(residual_evaluations) > 0
+    if use_jacobian:
+        assert benchmark.extra_info["residual_evaluations"] < 67
+    else:
+        assert benchmark.extra_info["residual_evaluations"] > 67
@@ -75,7 +75,15 @@ def given_utilisations(
 
 
 def get_lambda_differences_primary(
-    lhs, service_rate_primary, allocation_primary, beta, demand_rates
+    lhs,
+    service_rate_primary,
+    allocation_primary,
+    beta,
+    demand_rates,
+    closer_busy_engine="power",
+    neighbour_index=None,
+    dtype=float,
+    pickup_demand_rates=None,
 ):
     """
     Returns the difference between the LHS and RHS of the primary demand rates
@@ -89,10 +97,22 @@ def get_lambda_differences_primary(
         The service rates of primary vehicles
     allocation_primary : np.array
         The number of primary vehicles at every station
-    beta : np.array
-        A three dimensional array denoting which vehicles are preferred.
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `objective.pack_preferences`.
     demand_rates : np.array
         The demand rates of given patient classes from given pickup locations.
+    closer_busy_engine : str
+        The engine used to compute the "all closer busy" probabilities, a key
+        of `objective.CLOSER_BUSY_ENGINES`.
+    neighbour_index : dict
+        The sorted neighbour index, required by the "sorted" engine.
+    dtype : type
+        The precision of the right hand side.
+    pickup_demand_rates : np.array
+        The demand rates of all classes at every pickup location, for example
+        `objective.Scenario.primary_pickup_demand_rates`. If None, they are
+        summed from `demand_rates`.
 
     Returns
     -------
@@ -103,12 +123,19 @@ def get_lambda_differences_primary(
         allocation_primary,
         out=np.zeros_like(lhs),
         where=allocation_primary != 0,
+    ).astype(dtype, copy=False)
+    allocation_primary = np.asarray(allocation_primary, dtype=dtype)
+    get_all_same_closer_busy = objective.CLOSER_BUSY_ENGINES[closer_busy_engine][0]
+    same_type_preferences, _ = objective.get_closer_busy_preferences(
+        closer_busy_engine, beta, None, neighbour_index, dtype=dtype
     )
-    all_closer = objective.get_all_same_closer_busy_vector(
-        utilisations, allocation_primary, beta
+    all_closer = get_all_same_closer_busy(
+        utilisations, allocation_primary, same_type_preferences
     )
     not_busy = objective.get_is_not_busy_vector(utilisations, allocation_primary)
-    rhs = (demand_rates.sum(axis=0) * (not_busy * all_closer.T).T).sum(axis=1)
+    if pickup_demand_rates is None:
+        pickup_demand_rates = demand_rates.sum(axis=0)
+    rhs = (pickup_demand_rates * (not_busy * all_closer.T).T).sum(axis=1)
     return rhs - lhs
 
 
@@ -121,6 +148,10 @@ def get_lambda_differences_secondary(
     beta,
     R,
     demand_rates,
+    closer_busy_engine="power",
+    neighbour_index=None,
+    dtype=float,
+    pickup_demand_rates=None,
 ):
     """
     Returns the difference between the LHS and RHS of the secondary demand rates relationship equation
@@ -137,12 +168,25 @@ def get_lambda_differences_secondary(
         The number of secondary vehicles at every station
     utilisations_primary : np.array
         The utilisation rates of primary vehicles
-    beta : np.array
-        A three dimensional array denoting which vehicles are preferred.
-    R : np.array
-        A three dimensional array denoting which primary vehicles are preferred.
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `objective.pack_preferences`.
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `objective.pack_preferences`.
     demand_rates : np.array
         The demand rates of given patient classes from given pickup locations.
+    closer_busy_engine : str
+        The engine used to compute the "all closer busy" probabilities, a key
+        of `objective.CLOSER_BUSY_ENGINES`.
+    neighbour_index : dict
+        The sorted neighbour index, required by the "sorted" engine.
+    dtype : type
+        The precision of the right hand side.
+    pickup_demand_rates : np.array
+        The demand rates of all classes but the last at every pickup location,
+        for example `objective.Scenario.secondary_pickup_demand_rates`. If
+        None, they are summed from `demand_rates`.
 
     Returns
     -------
@@ -153,26 +197,337 @@ def get_lambda_differences_secondary(
         allocation_secondary,
         out=np.zeros_like(lhs),
         where=allocation_secondary != 0,
+    ).astype(dtype, copy=False)
+    allocation_secondary = np.asarray(allocation_secondary, dtype=dtype)
+    allocation_primary = np.asarray(allocation_primary, dtype=dtype)
+    utilisations_primary = np.asarray(utilisations_primary, dtype=dtype)
+    (
+        get_all_same_closer_busy,
+        get_all_primary_closer_busy,
+        _,
+    ) = objective.CLOSER_BUSY_ENGINES[closer_busy_engine]
+    (
+        same_type_preferences,
+        mixed_type_preferences,
+    ) = objective.get_closer_busy_preferences(
+        closer_busy_engine, beta, R, neighbour_index, dtype=dtype
     )
-    all_closer = objective.get_all_same_closer_busy_vector(
-        utilisations, allocation_secondary, beta
+    all_closer = get_all_same_closer_busy(
+        utilisations, allocation_secondary, same_type_preferences
     )
     not_busy = objective.get_is_not_busy_vector(utilisations, allocation_secondary)
-    all_primary_closer = objective.get_all_primary_closer_busy_vector(
-        utilisations_primary, allocation_primary, R
+    all_primary_closer = get_all_primary_closer_busy(
+        utilisations_primary, allocation_primary, mixed_type_preferences
+    )
+    if pickup_demand_rates is None:
+        pickup_demand_rates = demand_rates[:-1].sum(axis=0)
+    rhs = (pickup_demand_rates * (not_busy * all_closer.T * all_primary_closer).T).sum(
+        axis=1
     )
-    rhs = (
-        demand_rates[:-1].sum(axis=0) * (not_busy * all_closer.T * all_primary_closer).T
-    ).sum(axis=1)
     return rhs - lhs
 
 
+def get_closer_busy_rhs_derivatives(
+    utilisations, allocation, beta, weights, dtype=float
+):
+    """
+    Returns the derivatives, with respect to the utilisations, of right hand
+    sides of the form
+
+        rhs[a] = sum_p weights[p][a] * (1 - u[a] ** n[a]) * all_closer[a][p]
+
+    where `all_closer` is given by `objective.get_all_same_closer_busy_vector`.
+    The derivative of `all_closer[a][p]` with respect to `u[b]` uses the
+    product of the factors of every other station, obtained from cumulative
+    products, so that no division by a utilisation is needed.
+
+    Parameters
+    ----------
+    utilisations : np.array
+        The utilisation of vehicles at every station
+    allocation : np.array
+        The number of vehicles at every station
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `objective.pack_preferences`.
+    weights : np.array
+        The weight of every pickup location for every station, `weights[p][a]`.
+    dtype : type
+        The precision of the products of powers.
+
+    Returns
+    -------
+    np.array
+        Returns a matrix:
+          + `derivatives[a][b]` the derivative of `rhs[a]` with respect to
+            `u[b]`.
+    """
+    beta = objective.get_preference_array(beta, dtype)
+    utilisations = np.asarray(utilisations, dtype=dtype)
+    allocation = np.asarray(allocation, dtype=dtype)
+    exponents = np.multiply(beta.transpose(0, 2, 1), allocation)
+    powers = np.power(utilisations, exponents)
+
+    ones = np.ones(powers.shape[:2] + (1,), dtype=powers.dtype)
+    products_before = np.concatenate(
+        [ones, np.cumprod(powers[:, :, :-1], axis=2)], axis=2
+    )
+    products_after = np.concatenate(
+        [np.cumprod(powers[:, :, :0:-1], axis=2)[:, :, ::-1], ones], axis=2
+    )
+    all_closer = products_before[:, :, -1] * powers[:, :, -1]
+    power_derivatives = exponents * np.power(utilisations, np.maximum(exponents - 1, 0))
+
+    not_busy = objective.get_is_not_busy_vector(utilisations, allocation)
+    derivatives = not_busy[:, None] * np.einsum(
+        "pa,pab->ab", weights, power_derivatives * products_before * products_after
+    )
+    not_busy_derivatives = -allocation * np.power(
+        utilisations, np.maximum(allocation - 1, 0)
+    )
+    derivatives[np.diag_indices_from(derivatives)] += not_busy_derivatives * (
+        weights * all_closer
+    ).sum(axis=0)
+    return derivatives
+
+
+def get_lambda_differences_primary_jacobian(
+    lhs,
+    service_rate_primary,
+    allocation_primary,
+    beta,
+    demand_rates,
+    closer_busy_engine="power",
+    neighbour_index=None,
+    dtype=float,
+    pickup_demand_rates=None,
+):
+    """
+    Returns the Jacobian of `get_lambda_differences_primary` with respect to
+    the left hand side.
+
+    The arguments are those of `get_lambda_differences_primary` so that this
+    can be passed to `scipy.optimize.fsolve` as `fprime`. The Jacobian uses
+    beta whatever the engine.
+
+    Parameters
+    ----------
+    lhs : np.array
+        The left hand side of the primary demand rate relationship equation.
+    service_rate_primary : float
+        The service rates of primary vehicles
+    allocation_primary : np.array
+        The number of primary vehicles at every station
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `objective.pack_preferences`.
+    demand_rates : np.array
+        The demand rates of given patient classes from given pickup locations.
+    closer_busy_engine : str
+        The engine used by the residual, unused.
+    neighbour_index : dict
+        The sorted neighbour index used by the residual, unused.
+    dtype : type
+        The precision of the derivatives of the right hand side.
+    pickup_demand_rates : np.array
+        The demand rates of all classes at every pickup location, for example
+        `objective.Scenario.primary_pickup_demand_rates`. If None, they are
+        summed from `demand_rates`.
+
+    Returns
+    -------
+    np.array
+    """
+    allocation_primary = np.asarray(allocation_primary)
+    utilisations = np.divide(
+        lhs / service_rate_primary,
+        allocation_primary,
+        out=np.zeros_like(lhs),
+        where=allocation_primary != 0,
+    )
+    utilisation_derivatives = np.divide(
+        1 / service_rate_primary,
+        allocation_primary,
+        out=np.zeros_like(lhs),
+        where=allocation_primary != 0,
+    )
+    if pickup_demand_rates is None:
+        pickup_demand_rates = demand_rates.sum(axis=0)
+    weights = np.broadcast_to(
+        pickup_demand_rates[:, None], (len(pickup_demand_rates), len(lhs))
+    )
+    derivatives = get_closer_busy_rhs_derivatives(
+        utilisations, allocation_primary, beta, weights, dtype=dtype
+    )
+    return derivatives * utilisation_derivatives - np.eye(len(lhs))
+
+
+def get_lambda_differences_secondary_jacobian(
+    lhs,
+    service_rate_secondary,
+    allocation_secondary,
+    allocation_primary,
+    utilisations_primary,
+    beta,
+    R,
+    demand_rates,
+    closer_busy_engine="power",
+    neighbour_index=None,
+    dtype=float,
+    pickup_demand_rates=None,
+):
+    """
+    Returns the Jacobian of `get_lambda_differences_secondary` with respect to
+    the left hand side.
+
+    The arguments are those of `get_lambda_differences_secondary` so that this
+    can be passed to `scipy.optimize.fsolve` as `fprime`. The Jacobian uses
+    beta whatever the engine, the engine is only used for the (constant)
+    probabilities of primary vehicles being busy.
+
+    Parameters
+    ----------
+    lhs : np.array
+        The left hand side of the secondary demand rate relationship equation.
+    service_rate_secondary : float
+        The service rates of secondary vehicles
+    allocation_secondary : np.array
+        The number of secondary vehicles at every station
+    allocation_primary : np.array
+        The number of primary vehicles at every station
+    utilisations_primary : np.array
+        The utilisation rates of primary vehicles
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `objective.pack_preferences`.
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `objective.pack_preferences`.
+    demand_rates : np.array
+        The demand rates of given patient classes from given pickup locations.
+    closer_busy_engine : str
+        The engine used to compute the probabilities of all closer primary
+        vehicles being busy, a key of `objective.CLOSER_BUSY_ENGINES`.
+    neighbour_index : dict
+        The sorted neighbour index, required by the "sorted" engine.
+    dtype : type
+        The precision of the derivatives of the right hand side.
+    pickup_demand_rates : np.array
+        The demand rates of all classes but the last at every pickup location,
+        for example `objective.Scenario.secondary_pickup_demand_rates`. If
+        None, they are summed from `demand_rates`.
+
+    Returns
+    -------
+    np.array
+    """
+    allocation_secondary = np.asarray(allocation_secondary)
+    utilisations = np.divide(
+        lhs / service_rate_secondary,
+        allocation_secondary,
+        out=np.zeros_like(lhs),
+        where=allocation_secondary != 0,
+    )
+    utilisation_derivatives = np.divide(
+        1 / service_rate_secondary,
+        allocation_secondary,
+        out=np.zeros_like(lhs),
+        where=allocation_secondary != 0,
+    )
+    get_all_primary_closer_busy = objective.CLOSER_BUSY_ENGINES[closer_busy_engine][1]
+    _, mixed_type_preferences = objective.get_closer_busy_preferences(
+        closer_busy_engine, beta, R, neighbour_index
+    )
+    all_primary_closer = get_all_primary_closer_busy(
+        utilisations_primary, allocation_primary, mixed_type_preferences
+    )
+    if pickup_demand_rates is None:
+        pickup_demand_rates = demand_rates[:-1].sum(axis=0)
+    weights = pickup_demand_rates[:, None] * all_primary_closer
+    derivatives = get_closer_busy_rhs_derivatives(
+        utilisations, allocation_secondary, beta, weights, dtype=dtype
+    )
+    return derivatives * utilisation_derivatives - np.eye(len(lhs))
+
+
+def get_step_tolerance(tolerance, dtype):
+    """
+    Returns the relative step size at which a solve with residuals computed in
+    the given precision has converged: the given tolerance, but at least the
+    square root of the machine precision of that precision (which for float64
+    is the default tolerance of `scipy.optimize.fsolve`), as smaller steps
+    are lost in the rounding of the residuals.
+
+    Parameters
+    ----------
+    tolerance : float
+        The relative step size at which the solve has converged.
+    dtype : type
+        The precision of the residuals.
+
+    Returns
+    -------
+    float
+    """
+    return max(tolerance, float(np.sqrt(np.finfo(dtype).eps)))
+
+
+def get_kept_lambdas(
+    get_lambda_differences,
+    starting_lambdas,
+    arguments,
+    residual_tolerance,
+    total_demand,
+):
+    """
+    Returns the starting demand rates if they can be kept without solving, as
+    none of their residuals is above `residual_tolerance` times the total
+    demand, and the number of residual evaluations this took.
+
+    Parameters
+    ----------
+    get_lambda_differences : callable
+        The residual function, `get_lambda_differences_primary` or
+        `get_lambda_differences_secondary`.
+    starting_lambdas : np.array
+        The demand rates at every station to start the solver from, or None.
+    arguments : tuple
+        The remaining arguments of the residual function.
+    residual_tolerance : float
+        The largest residual kept, as a fraction of the total demand. If None
+        the starting demand rates are never kept.
+    total_demand : float
+        The total demand rate the residuals are relative to.
+
+    Returns
+    -------
+    tuple
+        Returns the starting demand rates, or None if they are not kept, and
+        the number of residual evaluations.
+    """
+    if starting_lambdas is None or residual_tolerance is None:
+        return None, 0
+    starting_lambdas = np.asarray(starting_lambdas, dtype=float)
+    residuals = get_lambda_differences(starting_lambdas, *arguments)
+    if np.max(np.abs(residuals)) <= residual_tolerance * total_demand:
+        return starting_lambdas, 1
+    return None, 1
+
+
 def solve_utilisations_primary(
     allocation_primary,
     beta,
     demand_rates,
     service_rate_primary,
     overall_utilisation_limit=0.99,
+    closer_busy_engine="power",
+    neighbour_index=None,
+    use_jacobian=False,
+    starting_lambdas=None,
+    solver_info=None,
+    dtype=float,
+    pickup_demand_rates=None,
+    residual_tolerance=None,
     **kwargs
 ):
     """
@@ -182,8 +537,9 @@ def solve_utilisations_primary(
     ----------
     allocation_primary : np.array
         The number of primary vehicles at every station
-    beta : np.array
-        A three dimensional array denoting which vehicles are preferred.
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `objective.pack_preferences`.
     demand_rates : np.array
         The demand rates of given patient classes from given pickup locations.
     service_rate_primary : np.array
@@ -191,6 +547,35 @@ def solve_utilisations_primary(
     overall_utilisation_limit : float
         A default limit for the utilisation which is used if the theoretic
         utilisation is above 1.
+    closer_busy_engine : str
+        The engine used to compute the "all closer busy" probabilities, a key
+        of `objective.CLOSER_BUSY_ENGINES`.
+    neighbour_index : dict
+        The sorted neighbour index, required by the "sorted" engine.
+    use_jacobian : bool
+        Whether to give the solver the analytic Jacobian of the residuals
+        instead of letting it estimate the Jacobian by finite differences.
+        This requires beta.
+    starting_lambdas : np.array
+        The demand rates at every station to start the solver from, for
+        example those solved for a similar allocation. If None the total demand
+        is split evenly between the stations.
+    solver_info : dict
+        If given, the solved demand rates are written to it as "lambdas", the
+        number of residual evaluations as "evaluations" and whether the
+        starting demand rates were kept without solving as "kept".
+    dtype : type
+        The precision of the residuals. For np.float32 the step tolerance and
+        the finite difference step of the solver are those of float32.
+    pickup_demand_rates : np.array
+        The demand rates of all classes at every pickup location, for example
+        `objective.Scenario.primary_pickup_demand_rates`. If None, they are
+        summed from `demand_rates` once for the solve.
+    residual_tolerance : float
+        If given with starting demand rates, they are kept without solving if
+        none of their residuals is above this fraction of the total demand,
+        for example if they were solved for an allocation with the same
+        primary vehicles.
     **kwargs : keyword arguments
         remaining keyword arguments that could be passed to this function from
         the optimisation algorithm
@@ -206,14 +591,48 @@ def solve_utilisations_primary(
     ):
         return np.array([overall_utilisation_limit for _ in allocation_primary])
 
-    starting_lambdas = np.array(
-        [total_demand / len(allocation_primary) for _ in allocation_primary]
+    if starting_lambdas is None:
+        starting_lambdas = np.array(
+            [total_demand / len(allocation_primary) for _ in allocation_primary]
+        )
+    if pickup_demand_rates is None:
+        pickup_demand_rates = demand_rates.sum(axis=0)
+    # Bit packed preferences are unpacked once for the solve rather than by
+    # every evaluation of the residuals.
+    beta = objective.get_preference_array(beta)
+    arguments = (
+        service_rate_primary,
+        allocation_primary,
+        beta,
+        demand_rates,
+        closer_busy_engine,
+        neighbour_index,
+        dtype,
+        pickup_demand_rates,
     )
-    final_lambdas = scipy.optimize.fsolve(
+    final_lambdas, evaluations = get_kept_lambdas(
         get_lambda_differences_primary,
         starting_lambdas,
-        args=(service_rate_primary, allocation_primary, beta, demand_rates),
+        arguments,
+        residual_tolerance,
+        total_demand,
     )
+    kept = final_lambdas is not None
+    if not kept:
+        final_lambdas, infodict, _, _ = scipy.optimize.fsolve(
+            get_lambda_differences_primary,
+            starting_lambdas,
+            fprime=get_lambda_differences_primary_jacobian if use_jacobian else None,
+            args=arguments,
+            full_output=True,
+            xtol=get_step_tolerance(1.49012e-08, dtype),
+            epsfcn=np.finfo(dtype).eps,
+        )
+        evaluations += infodict["nfev"]
+    if solver_info is not None:
+        solver_info["lambdas"] = final_lambdas
+        solver_info["evaluations"] = evaluations
+        solver_info["kept"] = kept
     utilisations = np.divide(
         final_lambdas,
         allocation_primary * service_rate_primary,
@@ -232,6 +651,14 @@ def solve_utilisations_secondary(
     demand_rates,
     service_rate_secondary,
     overall_utilisation_limit=0.99,
+    closer_busy_engine="power",
+    neighbour_index=None,
+    use_jacobian=False,
+    starting_lambdas=None,
+    solver_info=None,
+    dtype=float,
+    pickup_demand_rates=None,
+    residual_tolerance=None,
     **kwargs
 ):
     """
@@ -245,10 +672,12 @@ def solve_utilisations_secondary(
         The number of secondary vehicles at every station
     utilisations_primary : np.array
         The utilisation rates of primary vehicles
-    beta : np.array
-        A three dimensional array denoting which vehicles are preferred.
-    R : np.array
-        A three dimensional array denoting which primary vehicles are preferred.
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `objective.pack_preferences`.
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `objective.pack_preferences`.
     demand_rates : np.array
         The demand rates of given patient classes from given pickup locations.
     service_rate_secondary : np.array
@@ -256,6 +685,34 @@ def solve_utilisations_secondary(
     overall_utilisation_limit : float
         A default limit for the utilisation which is used if the theoretic
         utilisation is above 1.
+    closer_busy_engine : str
+        The engine used to compute the "all closer busy" probabilities, a key
+        of `objective.CLOSER_BUSY_ENGINES`.
+    neighbour_index : dict
+        The sorted neighbour index, required by the "sorted" engine.
+    use_jacobian : bool
+        Whether to give the solver the analytic Jacobian of the residuals
+        instead of letting it estimate the Jacobian by finite differences.
+        This requires beta.
+    starting_lambdas : np.array
+        The demand rates at every station to start the solver from, for
+        example those solved for a similar allocation. If None the total demand
+        is split evenly between the stations.
+    solver_info : dict
+        If given, the solved demand rates are written to it as "lambdas", the
+        number of residual evaluations as "evaluations" and whether the
+        starting demand rates were kept without solving as "kept".
+    dtype : type
+        The precision of the residuals. For np.float32 the step tolerance and
+        the finite difference step of the solver are those of float32.
+    pickup_demand_rates : np.array
+        The demand rates of all classes but the last at every pickup location,
+        for example `objective.Scenario.secondary_pickup_demand_rates`. If
+        None, they are summed from `demand_rates` once for the solve.
+    residual_tolerance : float
+        If given with starting demand rates, they are kept without solving if
+        none of their residuals is above this fraction of the total demand,
+        as in `solve_utilisations_primary`.
     **kwargs : keyword arguments
         remaining keyword arguments that could be passed to this function from
         the optimisation algorithm
@@ -264,6 +721,10 @@ def solve_utilisations_secondary(
     -------
     np.array
     """
+    # With no secondary vehicles there is nothing to solve: the limit is used
+    # as it would be for an overloaded fleet.
+    if not np.any(allocation_secondary):
+        return np.array([overall_utilisation_limit for _ in allocation_secondary])
     total_demand = demand_rates[:-1].sum()
     if (
         total_demand / (service_rate_secondary * sum(allocation_secondary))
@@ -271,22 +732,52 @@ def solve_utilisations_secondary(
     ):
         return np.array([overall_utilisation_limit for _ in allocation_primary])
 
-    starting_lambdas = np.array(
-        [total_demand / len(allocation_secondary) for _ in allocation_secondary]
+    if starting_lambdas is None:
+        starting_lambdas = np.array(
+            [total_demand / len(allocation_secondary) for _ in allocation_secondary]
+        )
+    if pickup_demand_rates is None:
+        pickup_demand_rates = demand_rates[:-1].sum(axis=0)
+    # Bit packed preferences are unpacked once for the solve rather than by
+    # every evaluation of the residuals.
+    beta = objective.get_preference_array(beta)
+    R = objective.get_preference_array(R)
+    arguments = (
+        service_rate_secondary,
+        allocation_secondary,
+        allocation_primary,
+        utilisations_primary,
+        beta,
+        R,
+        demand_rates,
+        closer_busy_engine,
+        neighbour_index,
+        dtype,
+        pickup_demand_rates,
     )
-    final_lambdas = scipy.optimize.fsolve(
+    final_lambdas, evaluations = get_kept_lambdas(
         get_lambda_differences_secondary,
         starting_lambdas,
-        args=(
-            service_rate_secondary,
-            allocation_secondary,
-            allocation_primary,
-            utilisations_primary,
-            beta,
-            R,
-            demand_rates,
-        ),
+        arguments,
+        residual_tolerance,
+        total_demand,
     )
+    kept = final_lambdas is not None
+    if not kept:
+        final_lambdas, infodict, _, _ = scipy.optimize.fsolve(
+            get_lambda_differences_secondary,
+            starting_lambdas,
+            fprime=get_lambda_differences_secondary_jacobian if use_jacobian else None,
+            args=arguments,
+            full_output=True,
+            xtol=get_step_tolerance(1.49012e-08, dtype),
+            epsfcn=np.finfo(dtype).eps,
+        )
+        evaluations += infodict["nfev"]
+    if solver_info is not None:
+        solver_info["lambdas"] = final_lambdas
+        solver_info["evaluations"] = evaluations
+        solver_info["kept"] = kept
     utilisations = np.divide(
         final_lambdas,
         allocation_secondary * service_rate_secondary,
@@ -299,12 +790,17 @@ def solve_utilisations_secondary(
 def solve_utilisations(
     allocation_primary,
     allocation_secondary,
-    beta,
-    R,
-    demand_rates,
-    service_rate_primary,
-    service_rate_secondary,
+    beta=None,
+    R=None,
+    demand_rates=None,
+    service_rate_primary=None,
+    service_rate_secondary=None,
     overall_utilisation_limit=0.99,
+    starting_lambdas=None,
+    solver_info=None,
+    primary_cache=None,
+    scenario=None,
+    dtype=float,
     **kwargs
 ):
     """
@@ -312,16 +808,23 @@ def solve_utilisations(
     scipy.optimize.fsolve) to find utilisations by finding roots of the
     demand-utilisation relationships.
 
+    The primary utilisations only depend on the primary allocation, so if a
+    `primary_cache` is given they are looked up in it (keyed by
+    `objective.get_allocation_key` of the primary allocation) before being
+    solved, and stored in it after.
+
     Parameters
     ----------
     allocation_primary : np.array
         The number of primary vehicles at every station
     allocation_secondary : np.array
         The number of secondary vehicles at every station
-    beta : np.array
-        A three dimensional array denoting which vehicles are preferred.
-    R : np.array
-        A three dimensional array denoting which primary vehicles are preferred.
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `objective.pack_preferences`.
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `objective.pack_preferences`.
     demand_rates : np.array
         The demand rates of given patient classes from given pickup locations.
     service_rate_primary : np.array
@@ -331,9 +834,42 @@ def solve_utilisations(
     overall_utilisation_limit : float
         A default limit for the utilisation which is used if the theoretic
         utilisation is above 1.
+    starting_lambdas : tuple
+        The primary and secondary demand rates at every station to start the
+        solvers from, for example those solved for a similar allocation. If
+        None (or either of them is None) the total demand is split evenly
+        between the stations.
+    solver_info : dict
+        If given, the solved primary and secondary demand rates are written to
+        it as "lambdas" and the total number of residual evaluations as
+        "evaluations", and whether every solver that was run started from
+        given demand rates as "warm_start" (so a vehicle type solved from the
+        default after its starting demand rates were None makes it False).
+        Whether the starting demand rates of each vehicle type
+        were kept without solving (see `residual_tolerance`) is written as
+        "kept". The demand rates are None for a vehicle type whose
+        solver was not run because the utilisation was above the limit. If a
+        `primary_cache` is given, whether the primary utilisations were found
+        in it is written as "primary_cache_hit".
+    primary_cache : dict or objective.ObjectiveCache
+        A dictionary mapping keys of primary allocations to their primary
+        utilisations and demand rates, read with its `get` method. Use an
+        `objective.ObjectiveCache` with a `maximum_size` to hold only the most
+        recently used, or with process based workers an
+        `objective.SharedObjectiveCache`, which is bounded in the same way.
+    scenario : objective.Scenario
+        If given, the scenario whose beta, R, demand rates and service rates
+        are used in place of the separate arguments, and whose pickup demand
+        rates are passed to the residuals.
+    dtype : type
+        The precision of the residuals, as in `solve_utilisations_primary`.
+        The primary utilisations found in a `primary_cache` are used whatever
+        the precision they were solved in.
     **kwargs : keyword arguments
-        remaining keyword arguments that could be passed to this function from
-        the optimisation algorithm
+        remaining keyword arguments passed to `solve_utilisations_primary` and
+        `solve_utilisations_secondary`, such as `residual_tolerance` to keep
+        the starting demand rates of a vehicle type whose residuals are within
+        it without solving.
 
     Returns
     -------
@@ -342,14 +878,51 @@ def solve_utilisations(
          + a vector the solved utilisations for primary vehicles
          + a vector the solved utilisations for secondary vehicles
     """
-    primary_utilisations = solve_utilisations_primary(
-        allocation_primary=allocation_primary,
-        beta=beta,
-        demand_rates=demand_rates,
-        service_rate_primary=service_rate_primary,
-        overall_utilisation_limit=overall_utilisation_limit,
-        **kwargs
+    primary_pickup_demand_rates = None
+    secondary_pickup_demand_rates = None
+    if scenario is not None:
+        beta = scenario.beta
+        R = scenario.R
+        demand_rates = scenario.demand_rates
+        primary_pickup_demand_rates = scenario.primary_pickup_demand_rates
+        secondary_pickup_demand_rates = scenario.secondary_pickup_demand_rates
+        if service_rate_primary is None:
+            service_rate_primary = scenario.service_rate_primary
+        if service_rate_secondary is None:
+            service_rate_secondary = scenario.service_rate_secondary
+    # Unpacked once for both solves.
+    beta = objective.get_preference_array(beta)
+    R = objective.get_preference_array(R)
+    starting_lambdas_primary, starting_lambdas_secondary = (
+        (None, None) if starting_lambdas is None else starting_lambdas
     )
+    primary_solver_info = {}
+    secondary_solver_info = {}
+    cached_primary = None
+    if primary_cache is not None:
+        primary_key = objective.get_allocation_key(allocation_primary)
+        cached_primary = primary_cache.get(primary_key)
+    primary_cache_hit = cached_primary is not None
+    if primary_cache_hit:
+        primary_utilisations, primary_solver_info["lambdas"] = cached_primary
+    else:
+        primary_utilisations = solve_utilisations_primary(
+            allocation_primary=allocation_primary,
+            beta=beta,
+            demand_rates=demand_rates,
+            service_rate_primary=service_rate_primary,
+            overall_utilisation_limit=overall_utilisation_limit,
+            starting_lambdas=starting_lambdas_primary,
+            solver_info=primary_solver_info,
+            dtype=dtype,
+            pickup_demand_rates=primary_pickup_demand_rates,
+            **kwargs
+        )
+        if primary_cache is not None:
+            primary_cache[primary_key] = (
+                primary_utilisations,
+                primary_solver_info.get("lambdas"),
+            )
     secondary_utilisations = solve_utilisations_secondary(
         allocation_secondary=allocation_secondary,
         allocation_primary=allocation_primary,
@@ -359,6 +932,572 @@ def solve_utilisations(
         demand_rates=demand_rates,
         service_rate_secondary=service_rate_secondary,
         overall_utilisation_limit=overall_utilisation_limit,
+        starting_lambdas=starting_lambdas_secondary,
+        solver_info=secondary_solver_info,
+        dtype=dtype,
+        pickup_demand_rates=secondary_pickup_demand_rates,
         **kwargs
     )
+    if solver_info is not None:
+        solver_info["warm_start"] = starting_lambdas is not None and all(
+            start is not None
+            for start, vehicle_solver_info in (
+                (starting_lambdas_primary, primary_solver_info),
+                (starting_lambdas_secondary, secondary_solver_info),
+            )
+            if "evaluations" in vehicle_solver_info
+        )
+        solver_info["lambdas"] = (
+            primary_solver_info.get("lambdas"),
+            secondary_solver_info.get("lambdas"),
+        )
+        solver_info["evaluations"] = primary_solver_info.get(
+            "evaluations", 0
+        ) + secondary_solver_info.get("evaluations", 0)
+        solver_info["kept"] = (
+            primary_solver_info.get("kept", False),
+            secondary_solver_info.get("kept", False),
+        )
+        if primary_cache is not None:
+            solver_info["primary_cache_hit"] = primary_cache_hit
+    return primary_utilisations, secondary_utilisations
+
+
+def get_lambda_differences_batch(
+    lambdas, service_rate, allocations, preferences, weights
+):
+    """
+    Returns the differences between the LHS and RHS of the demand rates
+    relationship equations of a batch of allocations, and their Jacobians.
+
+    For every member n of the batch the right hand side is
+
+        rhs[n][a] = (1 - u[n][a] ** allocations[n][a])
+                    * sum_p weights[n][p][a] * all_closer[n][p][a]
+
+    with `u[n][a] = lambdas[n][a] / (service_rate * allocations[n][a])` and
+    `all_closer` the probability of all preferred vehicles of the same type
+    being busy, computed in log space as in
+    `objective.get_all_same_closer_busy_vector_log`. With the primary weights
+    these are the residuals of `get_lambda_differences_primary` and with the
+    secondary weights (which include the probability of all closer primary
+    vehicles being busy) those of `get_lambda_differences_secondary`.
+
+    The derivative of `all_closer[n][p][a]` with respect to `u[n][b]` is taken
+    as `all_closer[n][p][a] * allocations[n][b] * preferences[p][b][a] /
+    u[n][b]`, and as 0 for a utilisation of exactly 0.
+
+    Parameters
+    ----------
+    lambdas : np.array
+        The (N, number_of_locations) demand rates at every station.
+    service_rate : float
+        The service rate of the vehicles.
+    allocations : np.array
+        The (N, number_of_locations) number of vehicles at every station.
+    preferences : np.array
+        A three dimensional array denoting which vehicles are preferred,
+        `beta`, as given by `objective.get_preference_array`.
+    weights : np.array
+        The (N, number_of_pickups, number_of_locations) weight of every pickup
+        location for every station.
+
+    Returns
+    -------
+    tuple
+        Returns two arrays:
+          + `differences[n][a]` the RHS minus the LHS;
+          + `jacobians[n][a][b]` the derivative of `differences[n][a]` with
+            respect to `lambdas[n][b]`.
+    """
+    utilisation_derivatives = np.divide(
+        1 / service_rate,
+        allocations,
+        out=np.zeros_like(lambdas),
+        where=allocations != 0,
+    )
+    utilisations = lambdas * utilisation_derivatives
+    log_terms, zero_terms, negative_terms = objective.get_log_utilisation_terms(
+        utilisations, allocations
+    )
+    all_closer = objective.get_product_from_log_sums(
+        *(
+            np.tensordot(terms, preferences, axes=([1], [1]))
+            for terms in (log_terms, zero_terms, negative_terms)
+        )
+    )
+    weighted_closer = weights * all_closer
+    closer_sums = weighted_closer.sum(axis=1)
+    not_busy = objective.get_is_not_busy_vector(utilisations, allocations)
+    differences = not_busy * closer_sums - lambdas
+
+    # preferred_sums[n][a][b] = sum_p weighted_closer[n][p][a] * preferences[p][b][a]
+    preferred_sums = np.matmul(
+        weighted_closer.transpose(2, 0, 1), preferences.transpose(2, 0, 1)
+    ).transpose(1, 0, 2)
+    power_derivatives = np.divide(
+        allocations,
+        utilisations,
+        out=np.zeros_like(utilisations),
+        where=utilisations != 0,
+    )
+    jacobians = not_busy[:, :, None] * preferred_sums * power_derivatives[:, None, :]
+    diagonal = np.arange(lambdas.shape[1])
+    jacobians[:, diagonal, diagonal] -= (
+        allocations * np.power(utilisations, np.maximum(allocations - 1, 0))
+    ) * closer_sums
+    jacobians *= utilisation_derivatives[:, None, :]
+    jacobians[:, diagonal, diagonal] -= 1
+    return differences, jacobians
+
+
+def solve_lambdas_batch(
+    starting_lambdas,
+    service_rate,
+    allocations,
+    preferences,
+    weights,
+    tolerance=1.49012e-08,
+    maximum_iterations=100,
+    dtype=float,
+):
+    """
+    Solves the demand rates relationship equations of a batch of allocations
+    with Newton's method, all members taking their steps together.
+
+    Every step solves the stacked linear systems of the members that have not
+    yet converged. A member is frozen once its step is smaller than
+    `tolerance` relative to its demand rates (the stopping rule of
+    `scipy.optimize.fsolve`). The steps are not damped, so a member can still
+    be moving after `maximum_iterations` steps; it is then returned as it is
+    and flagged as not converged.
+
+    Parameters
+    ----------
+    starting_lambdas : np.array
+        The (N, number_of_locations) demand rates to start from.
+    service_rate : float
+        The service rate of the vehicles.
+    allocations : np.array
+        The (N, number_of_locations) number of vehicles at every station.
+    preferences : np.array
+        A three dimensional array denoting which vehicles are preferred,
+        `beta`, as given by `objective.get_preference_array`.
+    weights : np.array
+        The (N, number_of_pickups, number_of_locations) weight of every pickup
+        location for every station.
+    tolerance : float
+        The relative step size at which a member has converged.
+    maximum_iterations : int
+        The maximum number of Newton steps.
+    dtype : type
+        The precision of the iteration. The tolerance is raised to that of
+        `get_step_tolerance` for it.
+
+    Returns
+    -------
+    tuple
+        Returns three arrays:
+          + the solved (N, number_of_locations) demand rates;
+          + the number of residual evaluations of every member;
+          + whether every member converged.
+    """
+    tolerance = get_step_tolerance(tolerance, dtype)
+    lambdas = np.array(starting_lambdas, dtype=dtype)
+    allocations = np.asarray(allocations, dtype=dtype)
+    weights = np.asarray(weights, dtype=dtype)
+    evaluations = np.zeros(len(lambdas), dtype=int)
+    active = np.ones(len(lambdas), dtype=bool)
+    for _ in range(maximum_iterations):
+        if not active.any():
+            break
+        differences, jacobians = get_lambda_differences_batch(
+            lambdas[active],
+            service_rate,
+            allocations[active],
+            preferences,
+            weights[active],
+        )
+        evaluations[active] += 1
+        steps = np.linalg.solve(jacobians, -differences[:, :, None])[:, :, 0]
+        lambdas[active] += steps
+        converged = np.linalg.norm(steps, axis=1) <= tolerance * np.linalg.norm(
+            lambdas[active], axis=1
+        )
+        active[np.where(active)[0][converged]] = False
+    return lambdas, evaluations, ~active
+
+
+def solve_vehicle_utilisations_batch(
+    allocations,
+    service_rate,
+    total_demand,
+    beta,
+    weights,
+    starting_lambdas,
+    overall_utilisation_limit=0.99,
+    tolerance=1.49012e-08,
+    maximum_iterations=100,
+    dtype=float,
+):
+    """
+    Finds the utilisations of one type of vehicle for a batch of allocations.
+
+    Members whose theoretic utilisation is above `overall_utilisation_limit`
+    are given that utilisation and are not solved.
+
+    Parameters
+    ----------
+    allocations : np.array
+        The (N, number_of_locations) number of vehicles at every station.
+    service_rate : float
+        The service rate of the vehicles.
+    total_demand : float
+        The total demand rate for the vehicles.
+    beta : np.array
+        A three dimensional array denoting which vehicles are preferred, as
+        given by `objective.get_preference_array`.
+    weights : np.array
+        The (N, number_of_pickups, number_of_locations) weight of every pickup
+        location for every station.
+    starting_lambdas : list
+        The demand rates to start every member from, None to split the total
+        demand evenly between the stations.
+    overall_utilisation_limit : float
+        A default limit for the utilisation which is used if the theoretic
+        utilisation is above 1.
+    tolerance : float
+        The relative step size at which the solve of a member has converged.
+    maximum_iterations : int
+        The maximum number of Newton steps.
+    dtype : type
+        The precision of the iteration, as in `solve_lambdas_batch`.
+
+    Returns
+    -------
+    tuple
+        Returns:
+          + the (N, number_of_locations) utilisations;
+          + a list of the solved demand rates of every member (None if it was
+            not solved);
+          + the number of residual evaluations of every member;
+          + whether the solve of every member converged (True if it was not
+            solved).
+    """
+    utilisations = np.full(allocations.shape, overall_utilisation_limit)
+    solved_lambdas = [None for _ in allocations]
+    evaluations = np.zeros(len(allocations), dtype=int)
+    converged = np.ones(len(allocations), dtype=bool)
+    to_solve = (
+        total_demand / (service_rate * allocations.sum(axis=1))
+        <= overall_utilisation_limit
+    )
+    if not to_solve.any():
+        return utilisations, solved_lambdas, evaluations, converged
+
+    indices = np.where(to_solve)[0]
+    final_lambdas, evaluations[to_solve], converged[to_solve] = solve_lambdas_batch(
+        np.array(
+            [
+                np.full(allocations.shape[1], total_demand / allocations.shape[1])
+                if starting_lambdas[index] is None
+                else starting_lambdas[index]
+                for index in indices
+            ],
+            dtype=float,
+        ),
+        service_rate,
+        allocations[to_solve],
+        beta,
+        weights[to_solve],
+        tolerance=tolerance,
+        maximum_iterations=maximum_iterations,
+        dtype=dtype,
+    )
+    utilisations[to_solve] = np.divide(
+        final_lambdas,
+        allocations[to_solve] * service_rate,
+        out=np.zeros_like(final_lambdas),
+        where=allocations[to_solve] != 0,
+    )
+    for index, lambdas in zip(indices, final_lambdas):
+        solved_lambdas[index] = lambdas
+    return utilisations, solved_lambdas, evaluations, converged
+
+
+def solve_utilisations_batch(
+    allocation_primary,
+    allocation_secondary,
+    beta=None,
+    R=None,
+    demand_rates=None,
+    service_rate_primary=None,
+    service_rate_secondary=None,
+    overall_utilisation_limit=0.99,
+    tolerance=1.49012e-08,
+    maximum_iterations=100,
+    starting_lambdas=None,
+    solver_infos=None,
+    solver_info=None,
+    primary_cache=None,
+    scenario=None,
+    dtype=float,
+    **kwargs
+):
+    """
+    Finds the utilisations of a whole population of allocations at once by
+    solving the demand-utilisation relationships of all of them with a single
+    vectorised Newton iteration (`solve_lambdas_batch`), first for primary and
+    then for secondary vehicles. The Newton steps are not damped, so the
+    members that have not converged after `maximum_iterations` steps are
+    solved again, one at a time, by `solve_utilisations_primary` or
+    `solve_utilisations_secondary`.
+
+    Given one dimensional allocations this behaves as `solve_utilisations`.
+    Given two dimensional allocations (one row per member of the population)
+    it returns two dimensional utilisations, and can be used with
+    `objective.get_objective_batch(..., vectorised_utilisation_function=True)`.
+
+    Parameters
+    ----------
+    allocation_primary : np.array
+        The number of primary vehicles at every station, for every member.
+    allocation_secondary : np.array
+        The number of secondary vehicles at every station, for every member.
+    beta : np.array or dict
+        A three dimensional array denoting which vehicles are preferred, of
+        any type or bit packed by `objective.pack_preferences`.
+    R : np.array or dict
+        A three dimensional array denoting which primary vehicles are preferred,
+        of any type or bit packed by `objective.pack_preferences`.
+    demand_rates : np.array
+        The demand rates of given patient classes from given pickup locations.
+    service_rate_primary : np.array
+        The service rates of primary vehicles
+    service_rate_secondary : np.array
+        The service rates of primary vehicles
+    overall_utilisation_limit : float
+        A default limit for the utilisation which is used if the theoretic
+        utilisation is above 1.
+    tolerance : float
+        The relative step size at which the solve of a member has converged.
+    maximum_iterations : int
+        The maximum number of Newton steps.
+    starting_lambdas : list
+        The primary and secondary demand rates to start the solves of every
+        member from, as in `solve_utilisations`. For one dimensional
+        allocations this is a single pair.
+    solver_infos : list
+        If given, a dictionary for every member that is filled as the
+        `solver_info` of `solve_utilisations`, and with whether either Newton
+        solve was still moving after `maximum_iterations` steps, and so was
+        solved again with `scipy.optimize.fsolve`, as "resolved". The
+        evaluations include those of that solve.
+    solver_info : dict
+        The dictionary to fill for one dimensional allocations.
+    primary_cache : dict or objective.ObjectiveCache
+        A dictionary mapping keys of primary allocations to their primary
+        utilisations and demand rates, as in `solve_utilisations`. Only the
+        members not found in it have their primary utilisations solved. A cache
+        with a `get_many` method (such as an `objective.SharedObjectiveCache`)
+        is read for all the members with a single call.
+    scenario : objective.Scenario
+        If given, the scenario whose beta, R, demand rates and service rates
+        are used in place of the separate arguments, and whose pickup demand
+        rates weight the solves.
+    dtype : type
+        The precision of the Newton iterations, as in `solve_lambdas_batch`.
+    **kwargs : keyword arguments
+        remaining keyword arguments that could be passed to this function from
+        the optimisation algorithm
+
+    Returns
+    -------
+    tuple
+        Returns two arrays:
+         + the solved utilisations for primary vehicles
+         + the solved utilisations for secondary vehicles
+    """
+    if scenario is not None:
+        beta = scenario.beta
+        R = scenario.R
+        demand_rates = scenario.demand_rates
+        if service_rate_primary is None:
+            service_rate_primary = scenario.service_rate_primary
+        if service_rate_secondary is None:
+            service_rate_secondary = scenario.service_rate_secondary
+        primary_pickup_demand_rates = scenario.primary_pickup_demand_rates
+        secondary_pickup_demand_rates = scenario.secondary_pickup_demand_rates
+    else:
+        primary_pickup_demand_rates = demand_rates.sum(axis=0)
+        secondary_pickup_demand_rates = demand_rates[:-1].sum(axis=0)
+    is_single = np.ndim(allocation_primary) == 1
+    if is_single:
+        allocation_primary = [allocation_primary]
+        allocation_secondary = [allocation_secondary]
+        starting_lambdas = None if starting_lambdas is None else [starting_lambdas]
+        solver_infos = None if solver_info is None else [solver_info]
+    allocations_primary = np.asarray(allocation_primary, dtype=float)
+    allocations_secondary = np.asarray(allocation_secondary, dtype=float)
+    if starting_lambdas is None:
+        starting_lambdas = [None for _ in allocations_primary]
+    starting_lambdas = [
+        (None, None) if pair is None else pair for pair in starting_lambdas
+    ]
+    beta = objective.get_preference_array(beta, dtype)
+    R = objective.get_preference_array(R, dtype)
+
+    primary_cache_hits = np.zeros(len(allocations_primary), dtype=bool)
+    if primary_cache is not None:
+        primary_keys = [
+            objective.get_allocation_key(allocation)
+            for allocation in allocations_primary
+        ]
+        if hasattr(primary_cache, "get_many"):
+            cached_primaries = primary_cache.get_many(primary_keys)
+        else:
+            cached_primaries = [primary_cache.get(key) for key in primary_keys]
+        primary_cache_hits = np.array(
+            [cached is not None for cached in cached_primaries]
+        )
+    to_solve = ~primary_cache_hits
+    primary_utilisations = np.zeros(allocations_primary.shape)
+    primary_lambdas = [None for _ in allocations_primary]
+    primary_evaluations = np.zeros(len(allocations_primary), dtype=int)
+    primary_converged = np.ones(len(allocations_primary), dtype=bool)
+    for index in np.where(primary_cache_hits)[0]:
+        primary_utilisations[index], primary_lambdas[index] = cached_primaries[index]
+    if to_solve.any():
+        primary_weights = np.broadcast_to(
+            primary_pickup_demand_rates[None, :, None],
+            (to_solve.sum(), beta.shape[0], beta.shape[2]),
+        )
+        (
+            primary_utilisations[to_solve],
+            solved_lambdas,
+            primary_evaluations[to_solve],
+            primary_converged[to_solve],
+        ) = solve_vehicle_utilisations_batch(
+            allocations=allocations_primary[to_solve],
+            service_rate=service_rate_primary,
+            total_demand=primary_pickup_demand_rates.sum(),
+            beta=beta,
+            weights=primary_weights,
+            starting_lambdas=[
+                starting_lambdas[index][0] for index in np.where(to_solve)[0]
+            ],
+            overall_utilisation_limit=overall_utilisation_limit,
+            tolerance=tolerance,
+            maximum_iterations=maximum_iterations,
+            dtype=dtype,
+        )
+        for index, lambdas in zip(np.where(to_solve)[0], solved_lambdas):
+            primary_lambdas[index] = lambdas
+        # Members still moving after `maximum_iterations` Newton steps are
+        # solved again by fsolve, from their starting demand rates.
+        for index in np.where(~primary_converged)[0]:
+            resolved_info = {}
+            primary_utilisations[index] = solve_utilisations_primary(
+                allocation_primary=allocations_primary[index],
+                beta=beta,
+                demand_rates=demand_rates,
+                service_rate_primary=service_rate_primary,
+                overall_utilisation_limit=overall_utilisation_limit,
+                starting_lambdas=starting_lambdas[index][0],
+                solver_info=resolved_info,
+                dtype=dtype,
+                pickup_demand_rates=primary_pickup_demand_rates,
+            )
+            primary_lambdas[index] = resolved_info["lambdas"]
+            primary_evaluations[index] += resolved_info["evaluations"]
+        if primary_cache is not None:
+            for index in np.where(to_solve)[0]:
+                primary_cache[primary_keys[index]] = (
+                    primary_utilisations[index].copy(),
+                    primary_lambdas[index],
+                )
+
+    # Only the members with secondary vehicles have their secondary
+    # utilisations solved, the others are given the limit.
+    has_secondary = allocations_secondary.any(axis=1)
+    secondary_utilisations = np.full(
+        allocations_secondary.shape, overall_utilisation_limit
+    )
+    secondary_lambdas = [None for _ in allocations_secondary]
+    secondary_evaluations = np.zeros(len(allocations_secondary), dtype=int)
+    secondary_converged = np.ones(len(allocations_secondary), dtype=bool)
+    if has_secondary.any():
+        primary_terms = objective.get_log_utilisation_terms(
+            primary_utilisations[has_secondary].astype(dtype),
+            allocations_primary[has_secondary],
+        )
+        all_primary_closer = objective.get_product_from_log_sums(
+            *(np.tensordot(terms, R, axes=([1], [1])) for terms in primary_terms)
+        )
+        secondary_weights = (
+            secondary_pickup_demand_rates[None, :, None] * all_primary_closer
+        )
+        (
+            secondary_utilisations[has_secondary],
+            solved_lambdas,
+            secondary_evaluations[has_secondary],
+            secondary_converged[has_secondary],
+        ) = solve_vehicle_utilisations_batch(
+            allocations=allocations_secondary[has_secondary],
+            service_rate=service_rate_secondary,
+            total_demand=secondary_pickup_demand_rates.sum(),
+            beta=beta,
+            weights=secondary_weights,
+            starting_lambdas=[
+                starting_lambdas[index][1] for index in np.where(has_secondary)[0]
+            ],
+            overall_utilisation_limit=overall_utilisation_limit,
+            tolerance=tolerance,
+            maximum_iterations=maximum_iterations,
+            dtype=dtype,
+        )
+        for index, lambdas in zip(np.where(has_secondary)[0], solved_lambdas):
+            secondary_lambdas[index] = lambdas
+        for index in np.where(~secondary_converged)[0]:
+            resolved_info = {}
+            secondary_utilisations[index] = solve_utilisations_secondary(
+                allocation_secondary=allocations_secondary[index],
+                allocation_primary=allocations_primary[index],
+                utilisations_primary=primary_utilisations[index],
+                beta=beta,
+                R=R,
+                demand_rates=demand_rates,
+                service_rate_secondary=service_rate_secondary,
+                overall_utilisation_limit=overall_utilisation_limit,
+                starting_lambdas=starting_lambdas[index][1],
+                solver_info=resolved_info,
+                dtype=dtype,
+                pickup_demand_rates=secondary_pickup_demand_rates,
+            )
+            secondary_lambdas[index] = resolved_info["lambdas"]
+            secondary_evaluations[index] += resolved_info["evaluations"]
+
+    if solver_infos is not None:
+        for index, info in enumerate(solver_infos):
+            if info is not None:
+                starts = starting_lambdas[index]
+                info["warm_start"] = any(start is not None for start in starts) and all(
+                    start is not None
+                    for start, evaluations in zip(
+                        starts,
+                        (primary_evaluations[index], secondary_evaluations[index]),
+                    )
+                    if evaluations > 0
+                )
+                info["lambdas"] = (primary_lambdas[index], secondary_lambdas[index])
+                info["evaluations"] = int(
+                    primary_evaluations[index] + secondary_evaluations[index]
+                )
+                info["resolved"] = not (
+                    primary_converged[index] and secondary_converged[index]
+                )
+                if primary_cache is not None:
+                    info["primary_cache_hit"] = bool(primary_cache_hits[index])
+    if is_single:
+        return primary_utilisations[0], secondary_utilisations[0]
     return primary_utilisations, secondary_utilisations